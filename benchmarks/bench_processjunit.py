@@ -0,0 +1,32 @@
+from synthetic import DRIVER_MODULE
+from processjunit import ProcessJUnit
+
+
+def test_merge_part_results(benchmark, record_peak_memory, synthetic_xunit):
+    xunit_file, ignore_set = synthetic_xunit
+    junit = ProcessJUnit(xunit_file, ignore_set)
+
+    benchmark.pedantic(junit._merge_part_results, kwargs={"driver_module": DRIVER_MODULE}, rounds=3)
+    record_peak_memory(junit._merge_part_results, driver_module=DRIVER_MODULE)
+
+
+def test_analysis(benchmark, record_peak_memory, synthetic_xunit):
+    xunit_file, ignore_set = synthetic_xunit
+    ProcessJUnit(xunit_file, ignore_set)._merge_part_results(driver_module=DRIVER_MODULE)
+
+    def setup():
+        return (ProcessJUnit(xunit_file, ignore_set),), {}
+
+    benchmark.pedantic(ProcessJUnit._analysis, setup=setup, rounds=3)
+    record_peak_memory(ProcessJUnit(xunit_file, ignore_set)._analysis)
+
+
+def test_save_after_analysis(benchmark, record_peak_memory, synthetic_xunit):
+    xunit_file, ignore_set = synthetic_xunit
+    kwargs = dict(driver_version="v1.18.1", protocol=4, gocql_driver_type="scylla", driver_module=DRIVER_MODULE)
+
+    def setup():
+        return (ProcessJUnit(xunit_file, ignore_set),), kwargs
+
+    benchmark.pedantic(ProcessJUnit.save_after_analysis, setup=setup, rounds=3)
+    record_peak_memory(ProcessJUnit(xunit_file, ignore_set).save_after_analysis, **kwargs)
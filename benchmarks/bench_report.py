@@ -0,0 +1,13 @@
+import pytest
+
+from email_sender import render_report
+from synthetic import synthetic_report_results
+
+
+@pytest.mark.parametrize("versions", [2, 20, 200])
+def test_render_report(benchmark, record_peak_memory, versions):
+    report = dict(results=synthetic_report_results(versions), scylla_version="2026.2.0-0.20260101",
+                  build_url="N/A", build_id="N/A", job_name="N/A", status="SUCCESS")
+
+    benchmark(render_report, report)
+    record_peak_memory(render_report, report)
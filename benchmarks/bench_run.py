@@ -0,0 +1,18 @@
+import pytest
+
+from run import Run
+
+
+def _runner(tag: str, protocol: str = "4") -> Run:
+    return Run(gocql_driver_git=".", driver_type="scylla", tag=tag, tests=["integration"],
+               scylla_version="release:2026.2.0", protocol=protocol)
+
+
+@pytest.mark.parametrize("tag", ["v1.18.1", "v1.12.0", "master"])
+def test_version_folder(benchmark, tag):
+    benchmark(lambda: _runner(tag).version_folder)
+
+
+@pytest.mark.parametrize("protocol", ["3", "4"])
+def test_ignore_tests_loading(benchmark, protocol):
+    benchmark(lambda: _runner("v1.18.1", protocol).ignore_tests)
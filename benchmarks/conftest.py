@@ -0,0 +1,37 @@
+import sys
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from synthetic import TESTCASE_COUNTS, synthetic_ignore_set, write_go_junit_report
+
+
+@pytest.fixture(scope="session", params=TESTCASE_COUNTS, ids=lambda count: f"{count}_testcases")
+def synthetic_xunit(request, tmp_path_factory):
+    """Two part files (one per test tag) as produced by Run.run, and the final xunit file path."""
+    testcases = request.param
+    directory = tmp_path_factory.mktemp(f"xunit_{testcases}")
+    xunit_file = directory / "xunit.scylla.v4.v1.18.1.xml"
+    for idx in range(2):
+        write_go_junit_report(directory / f"{xunit_file.name}_part_{idx}", testcases // 2, seed=idx)
+    return xunit_file, synthetic_ignore_set(testcases // 2)
+
+
+@pytest.fixture
+def record_peak_memory(benchmark):
+    """Run the callable once more under tracemalloc and keep the peak in the benchmark JSON."""
+    def _record(func, *args, **kwargs):
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info["peak_memory_bytes"] = peak
+        return peak
+    return _record
@@ -0,0 +1,72 @@
+"""Synthetic inputs for the benchmarks, shaped like the real matrix artifacts."""
+import os
+import random
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+
+DRIVER_MODULE = "github.com/gocql/gocql"
+# Number of testcases per synthetic go-junit-report run, override with e.g. GOCQL_BENCH_TESTCASES=1000,5000
+TESTCASE_COUNTS = [int(count) for count in os.environ.get("GOCQL_BENCH_TESTCASES", "1000,10000,100000").split(",")]
+# Size of the "system-out" of passed and failed testcases
+PASSED_OUTPUT_BYTES = 512
+FAILED_OUTPUT_BYTES = 64 * 1024
+
+
+def _system_out(rng: random.Random, size: int) -> str:
+    line = "    conn_test.go:{}: query returned unexpected row count, retrying with next host policy\n"
+    chunks, written = [], 0
+    while written < size:
+        chunk = line.format(rng.randint(1, 9999))
+        chunks.append(chunk)
+        written += len(chunk)
+    return escape("".join(chunks))
+
+
+def write_go_junit_report(path: Path, testcases: int, seed: int = 0) -> None:
+    """Write a go-junit-report v2 like file: ~2% failures, ~1% skipped, the rest passed."""
+    rng = random.Random(seed)
+    passed_output = _system_out(rng, PASSED_OUTPUT_BYTES)
+    with path.open(mode="w", encoding="utf-8") as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        file.write(f'<testsuites tests="{testcases}">\n')
+        file.write(f'\t<testsuite name="{DRIVER_MODULE}" tests="{testcases}" errors="0" id="0" '
+                   f'time="{testcases * 0.05:.3f}" timestamp="2024-01-01T00:00:00Z">\n')
+        file.write('\t\t<properties><property name="go.version" value="go1.25"></property></properties>\n')
+        for index in range(testcases):
+            name = f"TestSynthetic{index // 10}/case_{index % 10}"
+            file.write(f'\t\t<testcase name="{name}" classname="{DRIVER_MODULE}" time="{rng.random():.3f}">')
+            roll = rng.random()
+            if roll < 0.02:
+                file.write(f'<failure message="Failed" type="">{_system_out(rng, FAILED_OUTPUT_BYTES)}</failure>')
+            elif roll < 0.03:
+                file.write('<skipped message="Skipped"></skipped>')
+            else:
+                file.write(f'<system-out>{passed_output}</system-out>')
+            file.write('</testcase>\n')
+        file.write('\t</testsuite>\n</testsuites>\n')
+
+
+def synthetic_ignore_set(testcases: int) -> dict:
+    rng = random.Random(testcases)
+    names = [f"TestSynthetic{index // 10}/case_{index % 10}" for index in range(testcases)]
+    return {
+        "ignore": rng.sample(names, k=max(1, testcases // 200)),
+        "flaky": rng.sample(names, k=max(1, testcases // 200)),
+        "skip": None,
+    }
+
+
+def synthetic_report_results(versions: int, protocols=(3, 4)) -> dict:
+    """The "results" dict main() passes to create_report(), with a few failed cells."""
+    results = {}
+    for index in range(versions):
+        for protocol in protocols:
+            if index % 7 == 6:
+                results[(f"v1.{index}.0", protocol, "", "release:2026.1.0")] = dict(exception=["Traceback (most recent call last):\n"] * 20)
+                continue
+            results[(f"v1.{index}.0", protocol, "", "release:2026.1.0")] = {
+                "tests": 1200, "errors": 0, "failures": index % 3, "skipped": 4, "xpassed": 1, "xfailed": 0,
+                "passed": 1190 - index % 3, "ignored_in_analysis": 3, "flaky": 2,
+            }
+    return results
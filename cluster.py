@@ -1,29 +1,74 @@
+import json
 import logging
-import socket
+import os
+import threading
 import time
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Callable, Dict, List, Optional, Protocol, Set, Tuple
 
-from ccmlib import scylla_cluster as ccm
+from cluster_watchdog import cql_ping
+from fake_cluster import FakeScyllaCluster
+from ip_prefix import CLUSTER_NODES, IpPrefixLease, acquire_ip_prefix, is_port_bound, release_ip_prefix_lock
+from log_capture import capture_log
+from metrics import MetricsSampler
+from resource_usage import ProcessTreeSampler, pids_with_argument
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Ports that a running Scylla node binds on its listen address.
 _SCYLLA_PORTS = (9042, 9160, 7000, 7001)
-# Number of nodes populated by default.
-_CLUSTER_NODES = 3
 
 
-def _is_port_bound(ip: str, port: int) -> bool:
-    """Return True if something is actively listening on ip:port."""
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.settimeout(0.5)
-        try:
-            s.connect((ip, port))
+class ClusterBackend(Protocol):
+    """The subset of ccmlib's cluster API used by TestCluster."""
+
+    name: str
+    nodes: Dict
+
+    def set_ipprefix(self, ip_prefix: str) -> None: ...
+
+    def set_configuration_options(self, values: Dict) -> None: ...
+
+    def populate(self, nodes: int): ...
+
+    def start(self, wait_for_binary_proto: bool = False): ...
+
+    def stop(self): ...
+
+    def remove(self): ...
+
+
+def _ccm_cluster(path: Path, name: str, cassandra_version: str) -> ClusterBackend:
+    # Imported lazily so the "fake" backend works on hosts without scylla-ccm installed.
+    from ccmlib import scylla_cluster as ccm
+    return ccm.ScyllaCluster(path, name, cassandra_version=cassandra_version)
+
+
+CLUSTER_BACKENDS: Dict[str, Callable[..., ClusterBackend]] = {
+    "ccm": _ccm_cluster,
+    "fake": FakeScyllaCluster,
+}
+
+# Where ccm keeps the downloaded relocatable packages of the Scylla versions
+SCYLLA_REPOSITORY = Path.home() / ".ccm" / "scylla-repository"
+
+
+def scylla_binaries_cached(version: str, backend: str = "ccm") -> Optional[bool]:
+    """Whether ccm already downloaded a Scylla version, None for the backends that don't need its binaries."""
+    if backend != "ccm":
+        return None
+    # "release:2026.1.0" is kept as release/2026.1.0 (or release_2026.1.0 by older ccm versions)
+    for directory in {version.replace(":", os.sep), version.replace(":", "_")}:
+        path = SCYLLA_REPOSITORY / directory
+        if path.is_dir() and any(path.iterdir()):
             return True
-        except OSError:
-            return False
+    return False
+
+
+# Background threads tearing down clusters that are no longer used by the tests.
+_reapers: List[threading.Thread] = []
+_reapers_lock = threading.Lock()
 
 
 def _wait_for_ports_free(ip_prefix: str, timeout: int = 120) -> bool:
@@ -35,14 +80,14 @@ def _wait_for_ports_free(ip_prefix: str, timeout: int = 120) -> bool:
 
     Returns True if all ports are free within *timeout* seconds, False otherwise.
     """
-    node_ips = [f"{ip_prefix}{i + 1}" for i in range(_CLUSTER_NODES)]
+    node_ips = [f"{ip_prefix}{i + 1}" for i in range(CLUSTER_NODES)]
     deadline = time.time() + timeout
     while time.time() < deadline:
         still_bound = [
             (ip, port)
             for ip in node_ips
             for port in _SCYLLA_PORTS
-            if _is_port_bound(ip, port)
+            if is_port_bound(ip, port)
         ]
         if not still_bound:
             return True
@@ -51,56 +96,54 @@ def _wait_for_ports_free(ip_prefix: str, timeout: int = 120) -> bool:
     return False
 
 
-def acquire_ip_prefix() -> Tuple[socket.socket, str]:
-    """Gets a machine-unique IP prefix to support parallel tests.
-
-    Skips any prefix where a Scylla CQL port (9042) is still bound -- this can
-    happen when a previous cluster's processes are stuck in kernel D-state after
-    SIGKILL and have not yet released their ports.
-
-    Returns a tuple of (lock socket, ip prefix).  The caller must close the
-    socket via release_ip_prefix_lock() when the prefix is no longer needed.
-    """
-    logger.info("Getting machine-unique ip prefix to support parallel tests...")
-    for index in range(1, 126):
-        ip_prefix = f'127.0.{index}.'
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        try:
-            sock.bind((f'{ip_prefix}1', 48783))  # arbitrary lock port
-        except OSError:
-            sock.close()
-            continue
-        # Lock port is free, but a zombie Scylla from a previous run might still
-        # hold the CQL port.  Skip this prefix if that's the case.
-        if any(_is_port_bound(f'{ip_prefix}{i + 1}', 9042) for i in range(_CLUSTER_NODES)):
+def _reap_cluster(cluster: ClusterBackend, ip_prefix: str, ip_prefix_lock: IpPrefixLease) -> None:
+    """Remove the cluster, wait for its ports and only then give the IP prefix back."""
+    try:
+        logger.info("Removing test cluster on prefix %s...", ip_prefix)
+        cluster.remove()
+        logger.info("Waiting for Scylla processes to release ports on prefix %s...", ip_prefix)
+        if not _wait_for_ports_free(ip_prefix):
             logger.warning(
-                "IP prefix %s: lock port free but Scylla CQL port 9042 still bound; skipping",
+                "Scylla processes on prefix %s still holding ports after timeout; "
+                "the next cluster will use a different IP prefix.",
                 ip_prefix,
             )
-            sock.close()
-            continue
-        logger.info("Cluster ip prefix acquired: %s", ip_prefix)
-        return sock, ip_prefix
-    raise ValueError("Couldn't acquire ip prefix - looks clusters are not cleared properly")
+        else:
+            logger.info("All Scylla ports on prefix %s are free.", ip_prefix)
+    except Exception:
+        logger.exception("Failed to remove test cluster on prefix %s", ip_prefix)
+    finally:
+        release_ip_prefix_lock(ip_prefix_lock)
 
 
-def release_ip_prefix_lock(sock: socket.socket) -> None:
-    sock.close()
+def join_cluster_reapers(timeout: Optional[float] = None) -> None:
+    """Wait for all the clusters handed off to background teardown to be removed."""
+    with _reapers_lock:
+        reapers = list(_reapers)
+        _reapers.clear()
+    if reapers:
+        logger.info("Waiting for %d test cluster(s) to be removed...", len(reapers))
+    for reaper in reapers:
+        reaper.join(timeout)
 
 
 class TestCluster:
     """Responsible for configuring, starting and stopping cluster for tests"""
 
-    def __init__(self, driver_directory: Path, version: str, configuration: Dict[str, str]) -> None:
+    def __init__(self, driver_directory: Path, version: str, configuration: Dict[str, str],
+                 backend: str = "ccm", metrics_interval: float = 0, metrics_file: Optional[Path] = None,
+                 resource_interval: float = 0) -> None:
         self.cluster_directory = driver_directory / "ccm"
         self.cluster_directory.mkdir(parents=True, exist_ok=True)
         logger.info("Preparing test cluster binaries and configuration...")
+        self._metrics_sampler: Optional[MetricsSampler] = None
+        self._resource_sampler: Optional[ProcessTreeSampler] = None
+        self.configure_sampling(metrics_interval, metrics_file, resource_interval)
         self._ip_prefix_lock, self._ip_prefix = acquire_ip_prefix()
-        self._cluster: ccm.ScyllaCluster = ccm.ScyllaCluster(self.cluster_directory, 'test', cassandra_version=version)
-        # Write CURRENT file so the ccm CLI knows which cluster is active.
-        # ccmlib only writes this via switch_cluster() / `ccm switch`, not during cluster creation.
-        # Without it, `ccm start --wait-for-binary-proto` (called by Go ccm tests) fails with exit status 1.
-        (self.cluster_directory / 'CURRENT').write_text('test\n')
+        # The name is unique per IP prefix, so a new cluster can be populated while the previous one
+        # is still being removed in the background.
+        cluster_name = f"test-{self._ip_prefix.split('.')[2]}"
+        self._cluster = CLUSTER_BACKENDS[backend](self.cluster_directory, cluster_name, cassandra_version=version)
         self._cluster.set_ipprefix(self._ip_prefix)
         cluster_config = {
                 "maintenance_socket": "workdir",
@@ -109,15 +152,31 @@ class TestCluster:
             }
         cluster_config.update(configuration)
         self._cluster.set_configuration_options(cluster_config)
-        self._cluster.populate(3)
+        self._cluster.populate(CLUSTER_NODES)
         logger.info("Cluster prepared")
 
+    def configure_sampling(self, metrics_interval: float = 0, metrics_file: Optional[Path] = None,
+                           resource_interval: float = 0) -> None:
+        """Set the metrics and resource sampling done from the next start()"""
+        self._metrics_interval = metrics_interval
+        self._metrics_file = metrics_file
+        self.metrics_summary: Optional[Dict] = None
+        self._resource_interval = resource_interval
+        self.resource_summary: Optional[Dict] = None
+
+    def make_current(self) -> None:
+        # Write CURRENT file so the ccm CLI knows which cluster is active.
+        # ccmlib only writes this via switch_cluster() / `ccm switch`, not during cluster creation.
+        # Without it, `ccm start --wait-for-binary-proto` (called by Go ccm tests) fails with exit status 1.
+        # Only open_cluster() calls it, for the cluster of a cell: clusters pre-booted meanwhile must not take over.
+        (self.cluster_directory / 'CURRENT').write_text(f'{self._cluster.name}\n')
+
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.remove()
-        release_ip_prefix_lock(self._ip_prefix_lock)
+        self.stop_samplers()
+        self.remove_in_background()
 
     @property
     def ip_addresses(self):
@@ -129,12 +188,58 @@ class TestCluster:
         self._cluster.start(wait_for_binary_proto=True)
         nodes_count = len(self._cluster.nodes)
         logger.info("test cluster started")
-        path = "../gocql-scylla/ccm/test/node1/cql.m"
+        if self._metrics_interval and not self._metrics_sampler:
+            self._metrics_sampler = MetricsSampler(self.ip_addresses.split(","), self._metrics_interval, self._metrics_file)
+            self._metrics_sampler.start()
+        if self._resource_interval and not self._resource_sampler:
+            self._resource_sampler = ProcessTreeSampler(self.node_pids, self._resource_interval)
+            self._resource_sampler.start()
+        path = f"../gocql-scylla/ccm/{self._cluster.name}/node1/cql.m"
         if not Path(path).exists():
             logger.info("Cluster socket file %s is not found", path)
             return f"-rf={nodes_count} -clusterSize={nodes_count} -cluster={self.ip_addresses}"
         else:
-            return f"-rf={nodes_count} -clusterSize={nodes_count} -cluster={self.ip_addresses} -cluster-socket=../gocql-scylla/ccm/test/node1/cql.m"
+            return f"-rf={nodes_count} -clusterSize={nodes_count} -cluster={self.ip_addresses} -cluster-socket={path}"
+
+    def node_pids(self) -> Set[int]:
+        """Pids of the node processes, found by the cluster directory in their command line.
+
+        Looked up on every call, as the ccm-tagged tests restart the nodes through the ccm CLI.
+        """
+        return pids_with_argument(os.path.abspath(self._cluster.get_path()) + os.sep)
+
+    def node_log_files(self) -> Dict[str, Path]:
+        return {node.name: Path(node.get_path()) / "logs" / "system.log" for node in self._cluster.nodes.values()}
+
+    def node_health(self) -> Dict[str, str]:
+        """Problems of the nodes that are down or don't answer CQL requests, by node name."""
+        problems = {}
+        for node in self._cluster.nodes.values():
+            if not node.is_running():
+                problems[node.name] = "process isn't running"
+            elif not cql_ping(node.network_interfaces['binary'][0]):
+                problems[node.name] = "CQL requests aren't answered"
+        return problems
+
+    def capture_node_logs(self, capture_dir: Path) -> None:
+        """Compress the nodes' logs into *capture_dir*, indexed by the tests captured there; call before removing."""
+        for name, log_file in self.node_log_files().items():
+            if log_file.is_file():
+                capture_log(capture_dir, f"{name}.system.log", log_file)
+
+    def stop_samplers(self) -> None:
+        """Stop scraping the nodes' metrics and sampling their processes.
+
+        The aggregates of the samples taken while the cluster was used are left in metrics_summary and resource_summary.
+        """
+        if self._metrics_sampler:
+            self.metrics_summary = self._metrics_sampler.stop()
+            self._metrics_sampler = None
+            logger.info("Cluster metrics: %s", self.metrics_summary)
+        if self._resource_sampler:
+            self.resource_summary = self._resource_sampler.stop()
+            self._resource_sampler = None
+            logger.info("Cluster nodes resource usage: %s", self.resource_summary)
 
     def stop(self):
         logger.info("Stopping test cluster...")
@@ -142,14 +247,107 @@ class TestCluster:
         logger.info("test cluster stopped")
 
     def remove(self):
-        logger.info("Removing test cluster...")
-        self._cluster.remove()
-        logger.info("Waiting for Scylla processes to release ports on prefix %s...", self._ip_prefix)
-        if not _wait_for_ports_free(self._ip_prefix):
-            logger.warning(
-                "Scylla processes on prefix %s still holding ports after timeout; "
-                "the next cluster will use a different IP prefix.",
-                self._ip_prefix,
-            )
-        else:
-            logger.info("All Scylla ports on prefix %s are free.", self._ip_prefix)
+        """Remove the cluster and release its IP prefix, blocking until the ports are free."""
+        _reap_cluster(self._cluster, self._ip_prefix, self._ip_prefix_lock)
+
+    def remove_in_background(self) -> threading.Thread:
+        """Hand the cluster off to a background reaper so the caller can continue on a fresh IP prefix.
+
+        The IP prefix stays locked until the reaper has removed the cluster and its ports are released,
+        so acquire_ip_prefix() skips it in the meantime.  Use join_cluster_reapers() before exiting.
+        """
+        reaper = threading.Thread(
+            target=_reap_cluster,
+            args=(self._cluster, self._ip_prefix, self._ip_prefix_lock),
+            name=f"cluster-reaper-{self._ip_prefix}",
+        )
+        with _reapers_lock:
+            _reapers.append(reaper)
+        reaper.start()
+        return reaper
+
+
+class ClusterPool:
+    """Started, unused clusters kept warm by the matrix daemon, so a cell doesn't wait for its cluster to boot.
+
+    A cluster taken from the pool is replaced in the background by a new one with the same parameters, up to
+    *max_idle* idle or booting clusters.
+    """
+
+    def __init__(self, max_idle: int = 2) -> None:
+        self._max_idle = max_idle
+        self._idle: Dict[Tuple, TestCluster] = {}
+        self._booting: Set[Tuple] = set()
+        self._boot_threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(driver_directory: Path, version: str, configuration: Dict, backend: str) -> Tuple:
+        return str(driver_directory), version, json.dumps(configuration, sort_keys=True), backend
+
+    def take(self, driver_directory: Path, version: str, configuration: Dict, backend: str) -> Optional[TestCluster]:
+        key = self._key(driver_directory, version, configuration, backend)
+        with self._lock:
+            cluster = self._idle.pop(key, None)
+        self.preboot(driver_directory, version, configuration, backend)
+        return cluster
+
+    def preboot(self, driver_directory: Path, version: str, configuration: Dict, backend: str) -> None:
+        key = self._key(driver_directory, version, configuration, backend)
+        with self._lock:
+            if key in self._idle or key in self._booting or len(self._idle) + len(self._booting) >= self._max_idle:
+                return
+            self._booting.add(key)
+            thread = threading.Thread(target=self._boot, args=(key, driver_directory, version, configuration, backend),
+                                      name=f"cluster-preboot-{version}", daemon=True)
+            self._boot_threads = [thread for thread in self._boot_threads if thread.is_alive()] + [thread]
+        thread.start()
+
+    def _boot(self, key: Tuple, driver_directory: Path, version: str, configuration: Dict, backend: str) -> None:
+        cluster = None
+        try:
+            cluster = TestCluster(driver_directory, version, configuration=configuration, backend=backend)
+            cluster.start()
+            logger.info("Pre-booted a test cluster for Scylla '%s'", version)
+        except Exception:
+            logger.exception("Failed to pre-boot a test cluster for Scylla '%s'", version)
+            if cluster:
+                cluster.remove_in_background()
+            cluster = None
+        with self._lock:
+            self._booting.discard(key)
+            # The pool may have been closed meanwhile
+            closed = not self._max_idle
+            if cluster and not closed:
+                self._idle[key] = cluster
+        if cluster and closed:
+            cluster.remove_in_background()
+
+    def close(self) -> None:
+        """Remove the idle clusters, waiting for the ones still booting to remove them too."""
+        with self._lock:
+            clusters = list(self._idle.values())
+            self._idle.clear()
+            self._max_idle = 0
+            boot_threads = list(self._boot_threads)
+        for cluster in clusters:
+            cluster.remove_in_background()
+        for thread in boot_threads:
+            thread.join()
+
+
+# Set by the matrix daemon to reuse pre-booted clusters
+cluster_pool: Optional[ClusterPool] = None
+
+
+def open_cluster(driver_directory: Path, version: str, configuration: Dict[str, str], backend: str = "ccm",
+                 **sampling) -> TestCluster:
+    """A cluster for the tests of a cell: a pre-booted one from cluster_pool if there's one, otherwise a new one."""
+    cluster = cluster_pool.take(driver_directory, version, configuration, backend) if cluster_pool else None
+    if cluster is None:
+        cluster = TestCluster(driver_directory, version, configuration=configuration, backend=backend, **sampling)
+    else:
+        logger.info("Using a pre-booted test cluster")
+        cluster.configure_sampling(**sampling)
+    cluster.make_current()
+    return cluster
@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import psutil
+
+from resource_usage import process_tree
+
+logger = logging.getLogger(__name__)
+
+# OPTIONS request of the CQL native protocol v4, answered with SUPPORTED by a responsive node
+_CQL_OPTIONS_FRAME = struct.pack(">BBhBI", 0x04, 0, 0, 0x05, 0)
+_LOG_TAIL_LINES = 200
+
+
+def cql_ping(ip: str, port: int = 9042, timeout: float = 2.0) -> bool:
+    """Return True if the node answers a CQL OPTIONS request in time; a stalled node still accepts TCP connections."""
+    try:
+        with socket.create_connection((ip, port), timeout=timeout) as sock:
+            sock.sendall(_CQL_OPTIONS_FRAME)
+            return len(sock.recv(9)) > 0
+    except OSError:
+        return False
+
+
+def _is_go_test(pid: int) -> bool:
+    try:
+        args = psutil.Process(pid).cmdline()
+    except psutil.Error:
+        return False
+    return len(args) > 1 and os.path.basename(args[0]) == "go" and args[1] == "test"
+
+
+def _has_exited(process: subprocess.Popen) -> bool:
+    """Whether the process exited, without reaping it: the runner waits for it on another thread."""
+    if process.returncode is not None:
+        return True
+    try:
+        # An exited, not yet reaped child is a zombie
+        return psutil.Process(process.pid).status() in (psutil.STATUS_ZOMBIE, psutil.STATUS_DEAD)
+    except psutil.NoSuchProcess:
+        return True
+
+
+def kill_go_test(shell_pid: int) -> List[int]:
+    """Kill the `go test` processes started by the shell and their test binaries, returns the killed pids.
+
+    The rest of the pipeline is left running, so go-junit-report still writes the report of the partial output.
+    """
+    go_test_pids = [pid for pid in process_tree([shell_pid]) if _is_go_test(pid)]
+    killed = sorted(process_tree(go_test_pids))
+    for pid in killed:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    return killed
+
+
+class ClusterWatchdog(threading.Thread):
+    """Checks the node processes and CQL responsiveness while the tests run.
+
+    When a node fails *failures_threshold* consecutive checks, the tests are aborted right away (instead of waiting
+    for the go test -timeout), a diagnostic bundle is written to *diagnostics_file* and the failure is kept in
+    ``failure`` so the cell is reported as an infrastructure failure rather than a driver one.
+    """
+
+    def __init__(self, cluster, interval: float, diagnostics_file: Path, failures_threshold: int = 3) -> None:
+        super().__init__(name="cluster-watchdog", daemon=True)
+        self._cluster = cluster
+        self._interval = interval
+        self._diagnostics_file = diagnostics_file
+        self._failures_threshold = failures_threshold
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self.failure: Optional[Dict] = None
+
+    def watch(self, process: subprocess.Popen) -> None:
+        """Set the go test pipeline to abort on a node failure."""
+        with self._lock:
+            self._process = process
+
+    def _abort(self) -> None:
+        with self._lock:
+            if not self._process or _has_exited(self._process):
+                return
+            killed = kill_go_test(self._process.pid)
+        if killed:
+            logger.error("Killed the go test processes %s", killed)
+            self.failure["killed_pids"].extend(killed)
+
+    def run(self) -> None:
+        failed_checks = 0
+        while not self._stop_event.wait(self._interval):
+            if self.failure:
+                # Keep aborting until the pipeline exits, go test may not have been started yet at the failure
+                self._abort()
+                continue
+            problems = self._cluster.node_health()
+            failed_checks = failed_checks + 1 if problems else 0
+            if failed_checks < self._failures_threshold:
+                continue
+            logger.error("Cluster node failure detected: %s", problems)
+            self.failure = {"reason": "; ".join(f"{node}: {problem}" for node, problem in problems.items()),
+                            "nodes": problems, "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "killed_pids": []}
+            self._abort()
+            self._write_diagnostics()
+
+    def _write_diagnostics(self) -> None:
+        log_tails = {}
+        for name, log_file in self._cluster.node_log_files().items():
+            try:
+                with log_file.open(errors="replace") as log:
+                    log_tails[name] = log.readlines()[-_LOG_TAIL_LINES:]
+            except OSError as exc:
+                log_tails[name] = [str(exc)]
+        self.failure["diagnostics"] = f"./{self._diagnostics_file.parent.name}/{self._diagnostics_file.name}"
+        try:
+            self._diagnostics_file.parent.mkdir(parents=True, exist_ok=True)
+            self._diagnostics_file.write_text(json.dumps({
+                **self.failure,
+                "node_pids": sorted(self._cluster.node_pids()),
+                "log_tails": log_tails,
+            }, indent=2))
+        except OSError:
+            logger.exception("Failed to write the diagnostics to '%s'", self._diagnostics_file)
+
+    def stop(self) -> Optional[Dict]:
+        self._stop_event.set()
+        self.join()
+        return self.failure
@@ -0,0 +1,201 @@
+"""Runs the external commands of the matrix (git, patch, go, ...) and records what each one cost.
+
+Every command runs in its own process group, which is killed as a whole when the command's timeout expires.  The
+wall time, CPU time and peak RSS of the command and its waited-for descendants, its exit code and the bytes it wrote to
+stdout and stderr are recorded in `telemetry`, from which the runs export their most expensive commands.
+
+With DRY_RUN=true the commands are only logged, and succeed without output.
+"""
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import BinaryIO, Callable, Dict, List, Optional, Sequence, Union
+
+from resource_usage import rusage_summary
+
+logger = logging.getLogger(__name__)
+
+# Output a finished command's descendants may still write, e.g. a daemon keeping the pipes open, isn't waited for longer
+_OUTPUT_GRACE_SECONDS = 10
+
+
+def dry_run() -> bool:
+    return os.getenv('DRY_RUN') == 'true'
+
+
+class CommandTimeout(subprocess.TimeoutExpired):
+    pass
+
+
+@dataclass
+class CommandRecord:
+    command: str
+    exit_code: int
+    wall_seconds: float
+    cpu_seconds: float = 0
+    peak_rss_bytes: int = 0
+    stdout_bytes: int = 0
+    stderr_bytes: int = 0
+    timed_out: bool = False
+    usage: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class CommandResult:
+    record: CommandRecord
+    stdout: Optional[Union[bytes, str]] = None
+    stderr: Optional[Union[bytes, str]] = None
+
+    @property
+    def returncode(self) -> int:
+        return self.record.exit_code
+
+
+class CommandTelemetry:
+    """The records of the commands run by the process, in the order they finished"""
+
+    def __init__(self) -> None:
+        self._records: List[CommandRecord] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: CommandRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    def mark(self) -> int:
+        """Position to get the records of the commands run from now on with since()"""
+        with self._lock:
+            return len(self._records)
+
+    def since(self, mark: int = 0) -> List[CommandRecord]:
+        with self._lock:
+            return self._records[mark:]
+
+
+telemetry = CommandTelemetry()
+
+
+def summarize(records: Sequence[CommandRecord], top: int = 10) -> Dict:
+    """Totals of the commands, and the most expensive ones by wall time"""
+    return {
+        "commands": len(records),
+        "wall_seconds": round(sum(record.wall_seconds for record in records), 3),
+        "cpu_seconds": round(sum(record.cpu_seconds for record in records), 3),
+        "failed": sum(record.exit_code != 0 for record in records),
+        "timed_out": sum(record.timed_out for record in records),
+        "most_expensive": [
+            {key: value for key, value in asdict(record).items() if key != "usage"}
+            for record in sorted(records, key=lambda record: record.wall_seconds, reverse=True)[:top]
+        ],
+    }
+
+
+def format_summary(summary: Dict) -> str:
+    lines = [f"{summary['commands']} commands, {summary['wall_seconds']:.1f}s wall, {summary['cpu_seconds']:.1f}s CPU, "
+             f"{summary['failed']} failed, {summary['timed_out']} timed out"]
+    lines.append(f"{'wall':>9} {'cpu':>9} {'peak rss':>10} {'out':>10} {'err':>10} {'exit':>5}  command")
+    for record in summary["most_expensive"]:
+        command = record["command"] if len(record["command"]) <= 100 else record["command"][:97] + "..."
+        lines.append(f"{record['wall_seconds']:>8.1f}s {record['cpu_seconds']:>8.1f}s "
+                     f"{record['peak_rss_bytes'] // 2 ** 20:>8}MB {record['stdout_bytes']:>10} "
+                     f"{record['stderr_bytes']:>10} {record['exit_code']:>5}  {command}")
+    return "\n".join(lines)
+
+
+def _pump(source: BinaryIO, sink: Optional[BinaryIO], chunks: Optional[List[bytes]], counter: List[int]) -> None:
+    """Count the bytes of a pipe, keeping them in *chunks* or relaying them to *sink*"""
+    with source:
+        for chunk in iter(lambda: source.read1(65536), b""):
+            counter[0] += len(chunk)
+            if chunks is not None:
+                chunks.append(chunk)
+            elif sink:
+                sink.write(chunk)
+                sink.flush()
+
+
+def _kill_group(process: subprocess.Popen) -> None:
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def run_command(command: Union[str, Sequence[str]], *, cwd=None, env: Optional[Dict[str, str]] = None,
+                timeout: Optional[float] = None, check: bool = False, capture_stdout: bool = False,
+                capture_stderr: bool = False, text: bool = False,
+                on_start: Optional[Callable[[subprocess.Popen], None]] = None) -> CommandResult:
+    """
+    Run a command (a string runs in bash) and record it in `telemetry`.
+
+    The output streams not captured are relayed to this process' stdout and stderr.
+    *on_start* is called with the started process, e.g. to let a watchdog abort it.
+
+    :raises CommandTimeout: the command ran longer than *timeout* seconds, its process group is killed.
+    :raises subprocess.CalledProcessError: *check* is set and the command failed.
+    """
+    command_string = command if isinstance(command, str) else " ".join(command)
+    logger.info("Running the command '%s'", command_string)
+    if dry_run():
+        record = CommandRecord(command=command_string, exit_code=0, wall_seconds=0)
+        telemetry.add(record)
+        empty = "" if text else b""
+        return CommandResult(record, empty if capture_stdout else None, empty if capture_stderr else None)
+
+    shell = isinstance(command, str)
+    started = time.monotonic()
+    with subprocess.Popen(command, shell=shell, executable="/bin/bash" if shell else None, cwd=cwd, env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True) as process:
+        outputs = {"stdout": ([] if capture_stdout else None, [0]), "stderr": ([] if capture_stderr else None, [0])}
+        pumps = [
+            threading.Thread(target=_pump, args=(pipe, getattr(sink, "buffer", None), *outputs[name]), daemon=True)
+            for name, pipe, sink in (("stdout", process.stdout, sys.stdout), ("stderr", process.stderr, sys.stderr))
+        ]
+        for pump in pumps:
+            pump.start()
+        timed_out = threading.Event()
+
+        def _expire() -> None:
+            timed_out.set()
+            logger.error("The command '%s' timed out after %ss, killing its process group", command_string, timeout)
+            _kill_group(process)
+
+        timer = threading.Timer(timeout, _expire) if timeout else None
+        try:
+            if timer:
+                timer.start()
+            if on_start:
+                on_start(process)
+            _, status, usage = os.wait4(process.pid, 0)
+        except BaseException:
+            _kill_group(process)
+            raise
+        finally:
+            if timer:
+                timer.cancel()
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if timed_out.is_set():
+            # The rest of the process group may still be running
+            _kill_group(process)
+        for pump in pumps:
+            pump.join(_OUTPUT_GRACE_SECONDS)
+
+    usage_summary = rusage_summary(usage)
+    record = CommandRecord(command=command_string, exit_code=process.returncode,
+                           wall_seconds=round(time.monotonic() - started, 3), cpu_seconds=usage_summary["cpu_seconds"],
+                           peak_rss_bytes=usage_summary["peak_rss_bytes"], stdout_bytes=outputs["stdout"][1][0],
+                           stderr_bytes=outputs["stderr"][1][0], timed_out=timed_out.is_set(), usage=usage_summary)
+    telemetry.add(record)
+    stdout, stderr = (b"".join(chunks) if chunks is not None else None for chunks, _ in outputs.values())
+    if text:
+        stdout, stderr = (data.decode(errors="replace") if data is not None else None for data in (stdout, stderr))
+    if record.timed_out:
+        raise CommandTimeout(command_string, timeout, output=stdout, stderr=stderr)
+    if check and record.exit_code != 0:
+        raise subprocess.CalledProcessError(record.exit_code, command_string, output=stdout, stderr=stderr)
+    return CommandResult(record, stdout, stderr)
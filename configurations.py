@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Any, List, Dict
+from typing import Any, List, Dict, Optional, Tuple
 
 
 @dataclass
@@ -8,9 +8,68 @@ class TestConfiguration:
     test_command_args: str
     cluster_configuration: Dict[str, Any]
     startup_delay_seconds: int = 0
+    # Go benchmarks: the raw output is kept and parsed into ns/op, B/op and allocs/op samples
+    benchmark: bool = False
+    # The tests are run with the Go race detector as set by the RacePolicy
+    race: bool = False
 
 
-integration_tests = TestConfiguration(tags=["integration"], test_command_args='-timeout=10m -race -tags="integration"', cluster_configuration={})
+@dataclass
+class LoadConfiguration:
+    """Sustained read/write workload run through the checked-out driver (load/main.go)"""
+    concurrency: int = 32
+    duration_seconds: int = 60
+    payload_bytes: int = 256
+    read_ratio: float = 0.5
+
+    @property
+    def command_args(self) -> str:
+        return (f"-concurrency={self.concurrency} -duration={self.duration_seconds}s "
+                f"-payload={self.payload_bytes} -read-ratio={self.read_ratio}")
+
+
+COMPRESSORS = ("none", "snappy", "lz4")
+
+
+@dataclass(frozen=True)
+class DriverOptions:
+    """Driver runtime options of the Go tests, each one is a dimension of the matrix"""
+    compressor: str = "snappy"
+    timeout: str = "60s"
+    autowait: str = "2000ms"
+
+    @property
+    def test_args(self) -> str:
+        compressor = "" if self.compressor == "none" else self.compressor
+        return f"-gocql.timeout={self.timeout} -autowait={self.autowait} -compressor={compressor}"
+
+    @property
+    def label(self) -> str:
+        """Name of the options that differ from the defaults (empty for the defaults), e.g. 'compressor-lz4'"""
+        return ".".join(f"{name}-{value}" for name, value in vars(self).items()
+                        if value != self.__dataclass_fields__[name].default)
+
+
+@dataclass(frozen=True)
+class RacePolicy:
+    """Which runs of the race-enabled tags use the Go race detector (-race)
+
+    By default every run does. Otherwise every protocol runs the tests without -race, and the protocols in
+    `protocols` (all of them if None) get an additional -race pass over the tests matching `run` (all if empty).
+    """
+    protocols: Optional[Tuple[int, ...]] = None
+    run: str = ""
+
+    @property
+    def separate_pass(self) -> bool:
+        return self.protocols is not None or bool(self.run)
+
+    def race_pass(self, protocol: int) -> bool:
+        return self.separate_pass and (self.protocols is None or protocol in self.protocols)
+
+
+integration_tests = TestConfiguration(tags=["integration"], test_command_args='-timeout=10m -tags="integration"', cluster_configuration={},
+                                      race=True)
 auth_tests = TestConfiguration(
     tags=["integration"],
     test_command_args='-timeout=5m -tags="integration" -run=TestAuthentication -runauth',
@@ -22,10 +81,17 @@ auth_tests = TestConfiguration(
     },
     startup_delay_seconds=30,
 )
-ccm_tests = TestConfiguration(tags=["ccm"], test_command_args='-timeout=10m -race -tags="ccm"', cluster_configuration={})
+ccm_tests = TestConfiguration(tags=["ccm"], test_command_args='-timeout=10m -tags="ccm"', cluster_configuration={}, race=True)
+bench_tests = TestConfiguration(
+    tags=["integration"],
+    test_command_args='-timeout=60m -tags="integration" -run=\'^$\' -bench=. -benchmem -count=6',
+    cluster_configuration={},
+    benchmark=True,
+)
 
 test_config_map = {
     "integration": integration_tests,
     "auth": auth_tests,
     "ccm": ccm_tests,
+    "bench": bench_tests,
 }
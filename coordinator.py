@@ -0,0 +1,132 @@
+"""Runs the cells of a matrix on worker daemons (daemon.py) and collects their summaries and JUnit files.
+
+Every worker runs one cell at a time; a cell whose worker becomes unreachable is handed to another worker.
+"""
+import http.client
+import json
+import logging
+import queue
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerError(Exception):
+    pass
+
+
+class Worker:
+    """Client of the job API of a worker daemon"""
+
+    def __init__(self, url: str, timeout: float = 60) -> None:
+        self.url = url.rstrip("/")
+        self._timeout = timeout
+
+    def _open(self, method: str, path: str, body: Optional[Dict] = None, timeout: Optional[float] = None):
+        request = urllib.request.Request(f"{self.url}{path}", method=method,
+                                         data=json.dumps(body).encode() if body is not None else None)
+        try:
+            return urllib.request.urlopen(request, timeout=timeout or self._timeout)
+        except urllib.error.HTTPError as exc:
+            # The worker answered, it's the request that failed
+            raise RuntimeError(f"worker {self.url}: {method} {path} failed: {exc.code} {exc.read().decode()}") from exc
+        except (urllib.error.URLError, OSError) as exc:
+            raise WorkerError(f"worker {self.url}: {method} {path} failed: {exc}") from exc
+
+    def _read(self, method: str, path: str, body: Optional[Dict] = None) -> bytes:
+        with self._open(method, path, body) as response:
+            return response.read()
+
+    def submit(self, args: List[str]) -> int:
+        return json.loads(self._read("POST", "/jobs", {"args": args}))["id"]
+
+    def follow_log(self, job_id: int) -> None:
+        """Log the job's log lines until it's done"""
+        try:
+            # No timeout, a single cell can take hours without logging
+            with self._open("GET", f"/jobs/{job_id}/log", timeout=24 * 3600) as response:
+                for line in response:
+                    logger.info("[%s] %s", self.url, line.decode(errors="replace").rstrip("\n"))
+        except (OSError, http.client.HTTPException) as exc:
+            raise WorkerError(f"worker {self.url}: lost the log of job {job_id}: {exc}") from exc
+
+    def job(self, job_id: int) -> Dict:
+        return json.loads(self._read("GET", f"/jobs/{job_id}"))
+
+    def junit(self, job_id: int, name: str) -> bytes:
+        return self._read("GET", f"/jobs/{job_id}/junit/{name}")
+
+
+class Coordinator:
+    """
+    Runs every cell's main.py arguments as a job of one of the workers.
+
+    The JUnit file of a cell is saved under `xunit_dir/<driver version>/`, like a local run does.
+    """
+
+    def __init__(self, workers: List[str], xunit_dir: Path) -> None:
+        self._workers = [Worker(url) for url in workers]
+        self._xunit_dir = xunit_dir
+
+    def run(self, cells: Dict[Tuple, List[str]]) -> Dict[Tuple, Dict]:
+        """
+        :param cells: main.py arguments of every cell, keyed by cell; the first item of a cell is its driver version.
+        :return: per cell, the job's cell result and status, or the error of the cell.
+        """
+        results: Dict[Tuple, Dict] = {}
+        pending: "queue.Queue[Tuple]" = queue.Queue()
+        for cell in cells:
+            pending.put(cell)
+        workers = list(self._workers)
+        lock = threading.Lock()
+
+        def _work(worker: Worker) -> None:
+            while True:
+                try:
+                    cell = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    result = self._run_cell(worker, cell, cells[cell])
+                except WorkerError:
+                    logger.exception("Worker %s is lost, its cell %s is handed to another worker", worker.url, cell)
+                    pending.put(cell)
+                    with lock:
+                        workers.remove(worker)
+                    return
+                except Exception as exc:
+                    logger.exception("Cell %s failed on worker %s", cell, worker.url)
+                    result = dict(status="error", error=str(exc))
+                with lock:
+                    results[cell] = result
+
+        # A cell handed back by a lost worker may be left after the others finished, it gets another round
+        while not pending.empty() and workers:
+            threads = [threading.Thread(target=_work, args=(worker,), name=f"coordinator-{worker.url}")
+                       for worker in list(workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        while not pending.empty():
+            results[pending.get()] = dict(status="error", error="no worker left to run the cell")
+        return results
+
+    def _run_cell(self, worker: Worker, cell: Tuple, args: List[str]) -> Dict:
+        job_id = worker.submit(args)
+        logger.info("Cell %s is job %d of worker %s", cell, job_id, worker.url)
+        worker.follow_log(job_id)
+        job = worker.job(job_id)
+        if job["status"] == "error" or not job["cells"]:
+            return dict(status="error", error=job["error"] or "the job ran no cell")
+        result = dict(job["cells"][0], status=job["status"])
+        if result.get("junit"):
+            junit_file = self._xunit_dir / cell[0] / result["junit"]
+            junit_file.parent.mkdir(parents=True, exist_ok=True)
+            junit_file.write_bytes(worker.junit(job_id, result["junit"]))
+            result["junit_file"] = junit_file
+        return result
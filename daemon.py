@@ -0,0 +1,344 @@
+"""Long-lived matrix daemon running matrix jobs submitted over a local HTTP API.
+
+The daemon keeps what a main.py invocation rebuilds every time warm between jobs: the prepared driver checkouts, Go's
+build and module caches, the result cache and pre-booted idle clusters.  Jobs take the main.py arguments and run one at
+a time (a run changes the working directory of the process).
+
+    python3 daemon.py --socket ~/.ccm/matrix-daemon.sock &
+    curl --unix-socket ~/.ccm/matrix-daemon.sock -d '{"args": ["../gocql-scylla", "--versions", "v1.18.3",
+        "--protocols", "4", "--scylla-version", "release:2026.1.0"]}' http://matrix/jobs
+    curl --unix-socket ~/.ccm/matrix-daemon.sock http://matrix/jobs/1/log        # streamed until the job is done
+    curl --unix-socket ~/.ccm/matrix-daemon.sock http://matrix/jobs/1            # status and per-cell results
+    curl --unix-socket ~/.ccm/matrix-daemon.sock http://matrix/jobs/1/junit/xunit.scylla.v4.v1.18.3.xml
+"""
+import argparse
+import http.server
+import itertools
+import json
+import logging
+import os
+import queue
+import shutil
+import signal
+import socketserver
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cluster
+from cluster import ClusterPool, join_cluster_reapers
+from main import get_arguments, resolve_driver_versions, run_matrix
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = Path.home() / ".ccm" / "matrix-daemon.sock"
+
+
+class Job:
+    """A submitted matrix run, with its log lines and results"""
+
+    def __init__(self, job_id: int, args: List[str], arguments: argparse.Namespace) -> None:
+        self.id = job_id
+        self.args = args
+        self.arguments = arguments
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cells: List[Dict] = []
+        self.junit_files: Dict[str, Path] = {}
+        self.error: Optional[str] = None
+        self.log_lines: List[str] = []
+        self.updated = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("passed", "failed", "error", "cancelled")
+
+    def append_log(self, line: str) -> None:
+        with self.updated:
+            self.log_lines.append(line)
+            self.updated.notify_all()
+
+    def to_json(self) -> Dict:
+        return {
+            "id": self.id, "args": self.args, "status": self.status, "submitted": self.submitted,
+            "started": self.started, "finished": self.finished, "error": self.error, "cells": self.cells,
+            "junit": sorted(self.junit_files),
+        }
+
+
+class _JobLogHandler(logging.Handler):
+    def __init__(self, job: Job) -> None:
+        super().__init__()
+        self._job = job
+        self.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._job.append_log(self.format(record))
+
+
+class MatrixDaemon:
+    def __init__(self, max_idle_clusters: int = 2, gocql_driver_git: Optional[Path] = None,
+                 jobs_dir: Optional[Path] = None) -> None:
+        self._gocql_driver_git = gocql_driver_git
+        # The JUnit files of every job are copied there, the next run of a cell overwrites the ones in xunit/
+        self._jobs_dir = jobs_dir or Path(tempfile.mkdtemp(prefix="matrix-daemon-jobs-"))
+        self._remove_jobs_dir = jobs_dir is None
+        self._stopping = False
+        self._jobs: Dict[int, Job] = {}
+        self._ids = itertools.count(1)
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._working_directory = Path.cwd()
+        self._worker = threading.Thread(target=self._work, name="matrix-daemon-worker", daemon=True)
+        if max_idle_clusters:
+            cluster.cluster_pool = ClusterPool(max_idle=max_idle_clusters)
+
+    def start(self) -> None:
+        self._worker.start()
+
+    def submit(self, args: List[str]) -> Job:
+        """Queue a matrix run of the main.py arguments; raises ValueError for invalid arguments."""
+        try:
+            # The driver tags are looked up when the job runs, in the driver checkout the job uses: the checkout
+            # may be in use by the running job
+            arguments = get_arguments(args, resolve_versions=False)
+        except SystemExit as exc:
+            raise ValueError(f"invalid arguments {args}") from exc
+        if self._gocql_driver_git:
+            # A worker of a coordinator runs the cells in its own driver checkout
+            arguments.gocql_driver_git = self._gocql_driver_git
+        # Runs change the working directory, relative paths are resolved against the daemon's
+        arguments.gocql_driver_git = str(self._working_directory / arguments.gocql_driver_git)
+        with self._lock:
+            if self._stopping:
+                raise ValueError("the daemon is shutting down")
+            job = Job(next(self._ids), args, arguments)
+            self._jobs[job.id] = job
+            logger.info("Queued job %d: %s", job.id, " ".join(args))
+            self._queue.put(job)
+        return job
+
+    def job(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job: Job) -> None:
+        handler = _JobLogHandler(job)
+        logging.getLogger().addHandler(handler)
+        job.status, job.started = "running", time.time()
+        try:
+            resolve_driver_versions(job.arguments)
+            matrix = run_matrix(job.arguments)
+            job.cells = [
+                dict(driver_version=cell[0], protocol=cell[1], options=cell[2], scylla_version=cell[3],
+                     summary=summary, durations=matrix.durations.get(cell), load=matrix.load_results.get(cell),
+                     benchmarks=matrix.benchmark_results.get(cell),
+                     junit=matrix.junit_files[cell].name if cell in matrix.junit_files else None)
+                for cell, summary in matrix.results.items()
+            ]
+            job.junit_files = self._keep_junit_files(job, matrix.junit_files.values())
+            job.status = "failed" if matrix.status else "passed"
+        except Exception as exc:
+            logger.exception("Job %d failed", job.id)
+            job.status, job.error = "error", str(exc)
+        finally:
+            os.chdir(self._working_directory)
+            logging.getLogger().removeHandler(handler)
+            job.finished = time.time()
+            with job.updated:
+                job.updated.notify_all()
+            logger.info("Job %d is %s", job.id, job.status)
+
+    def _keep_junit_files(self, job: Job, junit_files) -> Dict[str, Path]:
+        job_dir = self._jobs_dir / str(job.id)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        kept = {}
+        for junit_file in junit_files:
+            if junit_file.is_file():
+                kept[junit_file.name] = Path(shutil.copy2(junit_file, job_dir / junit_file.name))
+        return kept
+
+    def _cancel(self, job: Job) -> None:
+        job.status, job.finished = "cancelled", time.time()
+        with job.updated:
+            job.updated.notify_all()
+        logger.info("Job %d is cancelled", job.id)
+
+    def shutdown(self) -> None:
+        """Stop after the running job, the queued ones are cancelled."""
+        with self._lock:
+            self._stopping = True
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    self._cancel(job)
+            self._queue.put(None)
+        if self._worker.is_alive():
+            self._worker.join()
+        if cluster.cluster_pool:
+            cluster.cluster_pool.close()
+        join_cluster_reapers()
+        if self._remove_jobs_dir:
+            shutil.rmtree(self._jobs_dir, ignore_errors=True)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    server: "_HTTPServer"
+
+    def _send_json(self, status: int, body) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _job(self, job_id: str) -> Optional[Job]:
+        job = self.server.daemon.job(int(job_id)) if job_id.isdigit() else None
+        if job is None:
+            self._send_json(404, {"error": f"no job '{job_id}'"})
+        return job
+
+    def do_POST(self) -> None:
+        if self.path != "/jobs":
+            self._send_json(404, {"error": f"unknown path '{self.path}'"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            job = self.server.daemon.submit([str(arg) for arg in body["args"]])
+        except (ValueError, KeyError, TypeError) as exc:
+            self._send_json(400, {"error": str(exc)})
+            return
+        self._send_json(201, job.to_json())
+
+    def do_GET(self) -> None:
+        parts = self.path.strip("/").split("/")
+        if parts == ["jobs"]:
+            self._send_json(200, [job.to_json() for job in self.server.daemon.jobs()])
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self._job(parts[1])
+            if job:
+                self._send_json(200, job.to_json())
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "log":
+            job = self._job(parts[1])
+            if job:
+                self._stream_log(job)
+        elif len(parts) == 4 and parts[0] == "jobs" and parts[2] == "junit":
+            job = self._job(parts[1])
+            if job and parts[3] not in job.junit_files:
+                self._send_json(404, {"error": f"no JUnit file '{parts[3]}' in job {job.id}"})
+            elif job:
+                data = job.junit_files[parts[3]].read_bytes()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/xml")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+        else:
+            self._send_json(404, {"error": f"unknown path '{self.path}'"})
+
+    def _stream_log(self, job: Job) -> None:
+        """Send the job's log lines as they come, the response ends with the job"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.end_headers()
+        sent = 0
+        while True:
+            with job.updated:
+                if sent == len(job.log_lines) and not job.done:
+                    job.updated.wait(timeout=1)
+                lines, done = job.log_lines[sent:], job.done
+            if lines:
+                self.wfile.write("".join(f"{line}\n" for line in lines).encode())
+                self.wfile.flush()
+                sent += len(lines)
+            if done and sent == len(job.log_lines):
+                return
+
+    def log_message(self, format, *args) -> None:
+        logger.debug(format, *args)
+
+
+class _HTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    daemon: MatrixDaemon
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    daemon: MatrixDaemon
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects an (address, port) client address
+        return request, ("local", 0)
+
+
+def serve(daemon: MatrixDaemon, socket_path: Optional[Path] = None, port: int = 0,
+          host: str = "127.0.0.1") -> socketserver.BaseServer:
+    """Create the API server of the daemon, on a Unix socket or on a TCP port"""
+    if socket_path:
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        socket_path.unlink(missing_ok=True)
+        server = _UnixHTTPServer(str(socket_path), _Handler)
+    else:
+        server = _HTTPServer((host, port), _Handler)
+    server.daemon = daemon
+    return server
+
+
+def get_arguments_daemon() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--socket', type=Path, default=DEFAULT_SOCKET,
+                        help=f"Unix socket of the job API, default={DEFAULT_SOCKET}")
+    parser.add_argument('--port', type=int, default=0,
+                        help="serve the job API on this TCP port instead of the Unix socket, e.g. as a worker of\n"
+                             "main.py --workers")
+    parser.add_argument('--host', default="127.0.0.1",
+                        help="address the TCP port is bound to, default=127.0.0.1; 0.0.0.0 for remote coordinators")
+    parser.add_argument('--gocql-driver-git', type=Path, default=None,
+                        help="driver checkout the jobs run in, overriding the one of their arguments; each worker on a\n"
+                             "host needs its own checkout")
+    parser.add_argument('--max-idle-clusters', type=int, default=2,
+                        help="pre-booted clusters kept for the next cells (per Scylla version and cluster configuration\n"
+                             "seen), 0 disables them, default=2")
+    return parser.parse_args()
+
+
+def main_daemon(arguments: argparse.Namespace) -> None:
+    daemon = MatrixDaemon(max_idle_clusters=arguments.max_idle_clusters, gocql_driver_git=arguments.gocql_driver_git)
+    server = serve(daemon, socket_path=None if arguments.port else arguments.socket, port=arguments.port,
+                   host=arguments.host)
+    daemon.start()
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    logger.info("Matrix daemon is listening on %s",
+                arguments.socket if not arguments.port else f"{arguments.host}:{arguments.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.shutdown()
+
+
+if __name__ == '__main__':
+    main_daemon(get_arguments_daemon())
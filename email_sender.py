@@ -8,11 +8,12 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from datetime import datetime
 from pathlib import Path
-from subprocess import check_output
 
 import jinja2
 import boto3
 
+from commands import run_command
+
 KEYSTORE_S3_BUCKET = "scylla-qa-keystore"
 
 LOGGER = logging.getLogger(__name__)
@@ -129,11 +130,15 @@ class Email:
         self.conn.quit()
 
 
-def send_mail(recipients, report):
+def render_report(report):
     loader = jinja2.FileSystemLoader(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report_templates'))
     env = jinja2.Environment(loader=loader, autoescape=True, extensions=['jinja2.ext.loopcontrols'])
     template = env.get_template("report.html")
-    html = template.render(report)
+    return template.render(report)
+
+
+def send_mail(recipients, report):
+    html = render_report(report)
     LOGGER.info("Results has been rendered to html")
 
     email_client = Email()
@@ -159,7 +164,8 @@ def get_ci_info():
 
 
 def get_driver_origin_remote(gocql_driver_path):
-    return check_output(["bash", "-c", "git config --get remote.origin.url"], cwd=gocql_driver_path, text=True).strip()
+    return run_command(["git", "config", "--get", "remote.origin.url"], cwd=gocql_driver_path, capture_stdout=True,
+                       text=True, check=True, timeout=60).stdout.strip()
 
 
 def create_report(results, scylla_version, **kwargs):
@@ -0,0 +1,192 @@
+import http.server
+import logging
+import shutil
+import socket
+import socketserver
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# CQL native protocol opcodes
+_OPCODE_ERROR = 0x00
+_OPCODE_STARTUP = 0x01
+_OPCODE_READY = 0x02
+_OPCODE_OPTIONS = 0x05
+_OPCODE_SUPPORTED = 0x06
+_OPCODE_REGISTER = 0x0B
+# CQL error codes
+_ERROR_SERVER = 0x0000
+_ERROR_PROTOCOL = 0x000A
+_HEADER = struct.Struct(">BBhBI")
+_SUPPORTED_PROTOCOLS = (3, 4, 5)
+
+
+def _cql_string(value: str) -> bytes:
+    encoded = value.encode()
+    return struct.pack(">H", len(encoded)) + encoded
+
+
+def _cql_string_multimap(values: Dict[str, List[str]]) -> bytes:
+    body = struct.pack(">H", len(values))
+    for key, items in values.items():
+        body += _cql_string(key) + struct.pack(">H", len(items)) + b"".join(_cql_string(item) for item in items)
+    return body
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    data = b""
+    while len(data) < size:
+        try:
+            chunk = sock.recv(size - len(data))
+        except ConnectionResetError:
+            return None
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+class _CQLHandler(socketserver.BaseRequestHandler):
+    """Speaks just enough of the CQL native protocol for drivers and readiness checks to handshake."""
+
+    def _respond(self, version: int, stream: int, opcode: int, body: bytes) -> None:
+        self.request.sendall(_HEADER.pack(0x80 | version, 0, stream, opcode, len(body)) + body)
+
+    def handle(self) -> None:
+        while True:
+            header = _recv_exact(self.request, _HEADER.size)
+            if header is None:
+                return
+            version, _, stream, opcode, length = _HEADER.unpack(header)
+            if length and _recv_exact(self.request, length) is None:
+                return
+            version &= 0x7F
+            self.server.node.requests_served += 1
+            if version not in _SUPPORTED_PROTOCOLS:
+                message = f"Invalid or unsupported protocol version ({version}); supported versions are (3/v3, 4/v4, 5/v5)"
+                self._respond(max(_SUPPORTED_PROTOCOLS[0], min(version, 4)), stream, _OPCODE_ERROR,
+                              struct.pack(">i", _ERROR_PROTOCOL) + _cql_string(message))
+            elif opcode == _OPCODE_OPTIONS:
+                self._respond(version, stream, _OPCODE_SUPPORTED, _cql_string_multimap(
+                    {"CQL_VERSION": ["3.3.1"], "COMPRESSION": ["snappy", "lz4"]}))
+            elif opcode in (_OPCODE_STARTUP, _OPCODE_REGISTER):
+                self._respond(version, stream, _OPCODE_READY, b"")
+            else:
+                self._respond(version, stream, _OPCODE_ERROR,
+                              struct.pack(">i", _ERROR_SERVER) + _cql_string("fake cluster doesn't execute requests"))
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """Prometheus endpoint exposing the number of CQL requests the fake node answered."""
+
+    def do_GET(self) -> None:
+        body = (f"# TYPE scylla_transport_requests_served counter\n"
+                f'scylla_transport_requests_served{{shard="0"}} {self.server.node.requests_served}\n').encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class _IdleHandler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        pass
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class FakeNode:
+    """A stand-in for a ccm node: listens on the Scylla ports of its IP address."""
+
+    _PORT_HANDLERS = {9042: _CQLHandler, 9160: _IdleHandler, 7000: _IdleHandler, 7001: _IdleHandler,
+                      9180: _MetricsHandler}
+
+    def __init__(self, name: str, ip: str, path: Path) -> None:
+        self.name = name
+        self.address = ip
+        self.network_interfaces = {"storage": (ip, 7000), "binary": (ip, 9042), "thrift": (ip, 9160)}
+        self._path = path
+        self._servers: List[_Server] = []
+        self.requests_served = 0
+        (path / "logs").mkdir(parents=True, exist_ok=True)
+
+    def get_path(self) -> str:
+        return str(self._path)
+
+    def start(self) -> None:
+        for port, handler in self._PORT_HANDLERS.items():
+            server = _Server((self.address, port), handler)
+            server.node = self
+            threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05},
+                             name=f"fake-{self.name}-{port}", daemon=True).start()
+            self._servers.append(server)
+        with (self._path / "logs" / "system.log").open(mode="a") as log:
+            log.write(f"INFO  fake node {self.name} listening for CQL clients on {self.address}:9042\n")
+
+    def stop(self) -> None:
+        servers, self._servers = self._servers, []
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+    def is_live(self) -> bool:
+        return bool(self._servers)
+
+    def is_running(self) -> bool:
+        return self.is_live()
+
+
+class FakeScyllaCluster:
+    """Lightweight local stand-in for ccmlib's ScyllaCluster, starting in milliseconds.
+
+    Implements the subset of the ccm cluster API used by TestCluster, so orchestration (IP prefixes,
+    teardown, scheduling) can be exercised without relocatable Scylla binaries.
+    """
+
+    def __init__(self, path: Path, name: str, cassandra_version: Optional[str] = None) -> None:
+        self.name = name
+        self.version = cassandra_version
+        self._path = Path(path) / name
+        self._path.mkdir(parents=True, exist_ok=True)
+        self._ip_prefix = "127.0.0."
+        self._configuration: Dict = {}
+        self.nodes: Dict[str, FakeNode] = {}
+
+    def get_path(self) -> str:
+        return str(self._path)
+
+    def set_ipprefix(self, ip_prefix: str) -> None:
+        self._ip_prefix = ip_prefix
+
+    def set_configuration_options(self, values: Dict) -> None:
+        self._configuration.update(values)
+
+    def populate(self, nodes: int) -> "FakeScyllaCluster":
+        for index in range(1, nodes + 1):
+            name = f"node{index}"
+            self.nodes[name] = FakeNode(name, f"{self._ip_prefix}{index}", self._path / name)
+        return self
+
+    def start(self, wait_for_binary_proto: bool = False) -> None:
+        for node in self.nodes.values():
+            if not node.is_live():
+                node.start()
+        logger.info("Fake cluster '%s' started on prefix %s", self.name, self._ip_prefix)
+
+    def stop(self) -> None:
+        for node in self.nodes.values():
+            node.stop()
+
+    def remove(self) -> None:
+        self.stop()
+        shutil.rmtree(self._path, ignore_errors=True)
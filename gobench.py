@@ -0,0 +1,99 @@
+import math
+import re
+import statistics
+from functools import lru_cache
+from typing import Dict, List, Sequence
+
+# "BenchmarkSingleConn-8   	   12345	     95123 ns/op	    2040 B/op	      35 allocs/op"
+_BENCHMARK_LINE = re.compile(r"^(Benchmark\S+?)(?:-\d+)?\s+(\d+)\s+(.+)$")
+_MEASUREMENT = re.compile(r"([\d.]+)\s+(\S+)")
+UNITS = ("ns/op", "B/op", "allocs/op")
+# Significance level of the comparisons, as in benchstat
+ALPHA = 0.05
+
+
+def parse_benchmark_output(text: str) -> Dict[str, Dict[str, List[float]]]:
+    """Parse `go test -bench -benchmem -count=N` output into {benchmark: {unit: [sample per run]}}."""
+    results: Dict[str, Dict[str, List[float]]] = {}
+    for line in text.splitlines():
+        match = _BENCHMARK_LINE.match(line.strip())
+        if not match:
+            continue
+        name, _, measurements = match.groups()
+        for value, unit in _MEASUREMENT.findall(measurements):
+            if unit in UNITS:
+                results.setdefault(name, {}).setdefault(unit, []).append(float(value))
+    return results
+
+
+@lru_cache(maxsize=None)
+def _u_distribution(m: int, n: int) -> tuple:
+    """Number of rankings of two samples of sizes m and n yielding each value of the U statistic."""
+    if m == 0 or n == 0:
+        return (1,)
+    without_last_x = _u_distribution(m - 1, n)
+    without_last_y = _u_distribution(m, n - 1)
+    counts = [0] * (m * n + 1)
+    # The largest value belongs to x: it's greater than all the n values of y
+    for u, count in enumerate(without_last_x):
+        counts[u + n] += count
+    for u, count in enumerate(without_last_y):
+        counts[u] += count
+    return tuple(counts)
+
+
+def mann_whitney_p_value(x: Sequence[float], y: Sequence[float]) -> float:
+    """Two-sided p-value of the Mann-Whitney U test, exact for small samples without ties."""
+    m, n = len(x), len(y)
+    if not m or not n:
+        return 1.0
+    u = sum(1.0 if xi > yi else 0.5 if xi == yi else 0.0 for xi in x for yi in y)
+    has_ties = len(set(x) | set(y)) < m + n
+    if not has_ties and m * n <= 400:
+        counts = _u_distribution(m, n)
+        total = sum(counts)
+        lower = sum(counts[:int(u) + 1]) / total
+        upper = sum(counts[int(u):]) / total
+        return min(1.0, 2 * min(lower, upper))
+    # Normal approximation with tie correction
+    values = sorted(list(x) + list(y))
+    ties = sum(values.count(value) ** 3 - values.count(value) for value in set(values))
+    sigma = math.sqrt(m * n / 12 * ((m + n + 1) - ties / ((m + n) * (m + n - 1))))
+    if not sigma:
+        return 1.0
+    z = (abs(u - m * n / 2) - 0.5) / sigma
+    return min(1.0, math.erfc(max(z, 0) / math.sqrt(2)))
+
+
+def compare_benchmarks(baseline: Dict[str, Dict[str, List[float]]],
+                       current: Dict[str, Dict[str, List[float]]]) -> List[Dict]:
+    """Compare the benchmarks found in both results, benchstat style: medians, delta and significance."""
+    rows = []
+    for name in sorted(set(baseline) & set(current)):
+        for unit in UNITS:
+            old, new = baseline[name].get(unit), current[name].get(unit)
+            if not old or not new:
+                continue
+            old_median, new_median = statistics.median(old), statistics.median(new)
+            p_value = mann_whitney_p_value(old, new)
+            delta = (new_median - old_median) / old_median * 100 if old_median else 0.0
+            rows.append({
+                "benchmark": name,
+                "unit": unit,
+                "baseline": old_median,
+                "current": new_median,
+                "delta_percent": round(delta, 2),
+                "p_value": round(p_value, 3),
+                "samples": [len(old), len(new)],
+                "significant": p_value < ALPHA and old_median != new_median,
+            })
+    return rows
+
+
+def format_comparison(rows: List[Dict]) -> str:
+    lines = [f"{'benchmark':<50} {'unit':<10} {'baseline':>14} {'current':>14} {'delta':>10}"]
+    for row in rows:
+        delta = f"{row['delta_percent']:+.2f}%" if row["significant"] else "~"
+        lines.append(f"{row['benchmark']:<50} {row['unit']:<10} {row['baseline']:>14.2f} {row['current']:>14.2f} "
+                     f"{delta:>10} (p={row['p_value']:.3f} n={row['samples'][0]}+{row['samples'][1]})")
+    return "\n".join(lines)
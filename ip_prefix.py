@@ -0,0 +1,167 @@
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import socket
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Shared by all the matrix processes running on the host; ~/.ccm is also mounted into the docker runs.
+LEASE_DIR = Path(os.environ.get("GOCQL_MATRIX_LEASE_DIR", Path.home() / ".ccm" / "ip-prefix-leases"))
+# Prefixes 127.0.1. .. 127.0.125. are handed out.
+_PREFIX_COUNT = 125
+# Number of nodes of the matrix clusters; their CQL ports are checked before a prefix is handed out.
+CLUSTER_NODES = 3
+
+
+def is_port_bound(ip: str, port: int) -> bool:
+    """Return True if something is actively listening on ip:port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(0.5)
+        try:
+            s.connect((ip, port))
+            return True
+        except OSError:
+            return False
+
+
+class IpPrefixLease:
+    """A leased IP prefix; the lease is held as long as the lease file stays locked."""
+
+    def __init__(self, allocator: "IpPrefixAllocator", index: int, lease_file) -> None:
+        self.index = index
+        self._allocator = allocator
+        self._lease_file = lease_file
+
+    @property
+    def ip_prefix(self) -> str:
+        return f"127.0.{self.index}."
+
+    @property
+    def released(self) -> bool:
+        return self._lease_file is None
+
+    def release(self) -> None:
+        if self._lease_file is None:
+            return
+        # Unlocked first: once the prefix is back on the free list, the next acquire() must be able to lock it
+        self._lease_file.close()
+        self._lease_file = None
+        self._allocator.release(self)
+
+
+class IpPrefixAllocator:
+    """Hands out machine-unique IP prefixes to concurrent matrix processes.
+
+    The pool state (a FIFO of free prefixes and the PID owning each lease) lives in a JSON file guarded by
+    an exclusive flock on ``allocator.lock``, so an allocation is a pop from the free list instead of
+    probing every prefix.  Every lease additionally keeps ``prefix-<N>.lease`` flocked for its lifetime;
+    the kernel drops that lock when the owner dies, which is how leases of dead owners are reclaimed.
+    """
+
+    def __init__(self, lease_dir: Path = LEASE_DIR, size: int = _PREFIX_COUNT) -> None:
+        self._lease_dir = Path(lease_dir)
+        self._size = size
+        self._state_file = self._lease_dir / "leases.json"
+
+    @contextlib.contextmanager
+    def _locked_state(self) -> Iterator[Dict]:
+        self._lease_dir.mkdir(parents=True, exist_ok=True)
+        with (self._lease_dir / "allocator.lock").open(mode="a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                state = self._read_state()
+                yield state
+                tmp_file = self._state_file.with_suffix(f".{os.getpid()}.tmp")
+                tmp_file.write_text(json.dumps(state))
+                os.replace(tmp_file, self._state_file)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_state(self) -> Dict:
+        try:
+            state = json.loads(self._state_file.read_text())
+        except (FileNotFoundError, ValueError):
+            return {"free": list(range(1, self._size + 1)), "leases": {}}
+        return state
+
+    def _lease_file_path(self, index: int) -> Path:
+        return self._lease_dir / f"prefix-{index}.lease"
+
+    def _try_lock(self, index: int):
+        lease_file = self._lease_file_path(index).open(mode="a+")
+        try:
+            fcntl.flock(lease_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lease_file.close()
+            return None
+        return lease_file
+
+    def _reclaim_dead_leases(self, state: Dict) -> None:
+        for index, pid in list(state["leases"].items()):
+            lease_file = self._try_lock(int(index))
+            if lease_file is None:
+                continue
+            lease_file.close()
+            logger.warning("Reclaiming IP prefix 127.0.%s. from dead owner (pid %s)", index, pid)
+            del state["leases"][index]
+            state["free"].append(int(index))
+
+    def acquire(self) -> IpPrefixLease:
+        with self._locked_state() as state:
+            if not state["free"]:
+                self._reclaim_dead_leases(state)
+            # Every free prefix is tried at most once; prefixes which can't be used go to the tail.
+            for _ in range(len(state["free"])):
+                index = state["free"].pop(0)
+                ip_prefix = f"127.0.{index}."
+                # A zombie Scylla from a previous run might still hold the CQL port.
+                if any(is_port_bound(f"{ip_prefix}{i + 1}", 9042) for i in range(CLUSTER_NODES)):
+                    logger.warning("IP prefix %s: Scylla CQL port 9042 still bound; skipping", ip_prefix)
+                    state["free"].append(index)
+                    continue
+                lease_file = self._try_lock(index)
+                if lease_file is None:
+                    # Locked by a process the state file doesn't know about (e.g. the state was wiped).
+                    state["leases"][str(index)] = None
+                    continue
+                lease_file.seek(0)
+                lease_file.truncate()
+                lease_file.write(f"{os.getpid()}\n")
+                lease_file.flush()
+                state["leases"][str(index)] = os.getpid()
+                return IpPrefixLease(self, index, lease_file)
+        raise ValueError("Couldn't acquire ip prefix - looks clusters are not cleared properly")
+
+    def release(self, lease: IpPrefixLease) -> None:
+        with self._locked_state() as state:
+            state["leases"].pop(str(lease.index), None)
+            if lease.index not in state["free"]:
+                state["free"].append(lease.index)
+
+    def owner(self, index: int) -> Optional[int]:
+        """Return the PID recorded for a leased prefix, or None if it's free."""
+        with self._locked_state() as state:
+            return state["leases"].get(str(index))
+
+
+_allocator = IpPrefixAllocator()
+
+
+def acquire_ip_prefix() -> Tuple[IpPrefixLease, str]:
+    """Gets a machine-unique IP prefix to support parallel tests.
+
+    Returns a tuple of (lease, ip prefix).  The caller must release the lease via release_ip_prefix_lock()
+    when the prefix is no longer needed.
+    """
+    logger.info("Getting machine-unique ip prefix to support parallel tests...")
+    lease = _allocator.acquire()
+    logger.info("Cluster ip prefix acquired: %s", lease.ip_prefix)
+    return lease, lease.ip_prefix
+
+
+def release_ip_prefix_lock(lease: IpPrefixLease) -> None:
+    lease.release()
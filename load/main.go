@@ -0,0 +1,218 @@
+// Sustained read/write workload run by the matrix through the checked-out gocql driver.
+//
+// Run.run copies this file into the driver repository (the gocql import is rewritten to the module from go.mod)
+// and runs it with `go run`.  The result is printed as one JSON line on stdout.
+package main
+
+import (
+	"encoding/json"
+	"errors"
+	"flag"
+	"fmt"
+	"math/bits"
+	"math/rand"
+	"os"
+	"strings"
+	"sync"
+	"sync/atomic"
+	"time"
+
+	gocql "github.com/gocql/gocql"
+)
+
+// HDR-style log-linear histogram of latencies in nanoseconds: every power of two is split into
+// 1<<subBucketBits linear sub-buckets, so the relative error of a recorded value is below 1%.
+const subBucketBits = 7
+
+type histogram struct {
+	counts []uint64
+}
+
+func newHistogram() *histogram {
+	return &histogram{counts: make([]uint64, 64<<subBucketBits)}
+}
+
+func bucketIndex(value int64) int {
+	if value < 1<<subBucketBits {
+		return int(value)
+	}
+	msb := bits.Len64(uint64(value)) - 1
+	shift := msb - subBucketBits
+	return (shift+1)<<subBucketBits + int(value>>shift) - 1<<subBucketBits
+}
+
+// bucketUpperBound returns the highest value recorded into the bucket.
+func bucketUpperBound(index int) int64 {
+	block := index >> subBucketBits
+	if block == 0 {
+		return int64(index)
+	}
+	shift := block - 1
+	mantissa := int64(index&(1<<subBucketBits-1)) + 1<<subBucketBits
+	return (mantissa+1)<<shift - 1
+}
+
+func (h *histogram) record(value time.Duration) {
+	if value < 0 {
+		value = 0
+	}
+	h.counts[bucketIndex(int64(value))]++
+}
+
+func (h *histogram) merge(other *histogram) {
+	for i, count := range other.counts {
+		h.counts[i] += count
+	}
+}
+
+func (h *histogram) total() uint64 {
+	var total uint64
+	for _, count := range h.counts {
+		total += count
+	}
+	return total
+}
+
+func (h *histogram) percentile(p float64) int64 {
+	total := h.total()
+	if total == 0 {
+		return 0
+	}
+	target := uint64(p / 100 * float64(total))
+	if target == 0 {
+		target = 1
+	}
+	var seen uint64
+	for i, count := range h.counts {
+		seen += count
+		if seen >= target {
+			return bucketUpperBound(i)
+		}
+	}
+	return bucketUpperBound(len(h.counts) - 1)
+}
+
+// buckets returns the non-empty buckets as [upper bound ns, count] pairs.
+func (h *histogram) buckets() [][2]int64 {
+	var result [][2]int64
+	for i, count := range h.counts {
+		if count > 0 {
+			result = append(result, [2]int64{bucketUpperBound(i), int64(count)})
+		}
+	}
+	return result
+}
+
+type result struct {
+	Operations      uint64             `json:"operations"`
+	Reads           uint64             `json:"reads"`
+	Writes          uint64             `json:"writes"`
+	Errors          uint64             `json:"errors"`
+	DurationSeconds float64            `json:"duration_seconds"`
+	OpsPerSecond    float64            `json:"ops_per_second"`
+	LatencyUs       map[string]float64 `json:"latency_us"`
+	Histogram       [][2]int64         `json:"histogram_ns"`
+	FirstError      string             `json:"first_error,omitempty"`
+}
+
+func main() {
+	hosts := flag.String("hosts", "127.0.0.1", "comma separated cluster addresses")
+	proto := flag.Int("proto", 4, "native protocol version")
+	concurrency := flag.Int("concurrency", 32, "number of concurrent workers")
+	duration := flag.Duration("duration", time.Minute, "duration of the measured workload")
+	payload := flag.Int("payload", 256, "size of the written values in bytes")
+	readRatio := flag.Float64("read-ratio", 0.5, "fraction of the operations which are reads")
+	keys := flag.Int64("keys", 100000, "number of distinct partition keys")
+	timeout := flag.Duration("timeout", 10*time.Second, "request timeout")
+	flag.Parse()
+
+	cluster := gocql.NewCluster(strings.Split(*hosts, ",")...)
+	cluster.ProtoVersion = *proto
+	cluster.Timeout = *timeout
+	cluster.Consistency = gocql.Quorum
+	cluster.NumConns = 2
+
+	session, err := cluster.CreateSession()
+	if err != nil {
+		fmt.Fprintf(os.Stderr, "failed to connect: %v\n", err)
+		os.Exit(1)
+	}
+	for _, stmt := range []string{
+		"CREATE KEYSPACE IF NOT EXISTS matrix_load WITH replication = {'class': 'SimpleStrategy', 'replication_factor': 3}",
+		"CREATE TABLE IF NOT EXISTS matrix_load.kv (k bigint PRIMARY KEY, v blob)",
+	} {
+		if err := session.Query(stmt).Exec(); err != nil {
+			fmt.Fprintf(os.Stderr, "failed to create the schema: %v\n", err)
+			os.Exit(1)
+		}
+	}
+
+	var (
+		reads, writes, failures uint64
+		firstError              atomic.Value
+		wg                      sync.WaitGroup
+	)
+	histograms := make([]*histogram, *concurrency)
+	deadline := time.Now().Add(*duration)
+	start := time.Now()
+	for worker := 0; worker < *concurrency; worker++ {
+		histograms[worker] = newHistogram()
+		wg.Add(1)
+		go func(h *histogram, rng *rand.Rand) {
+			defer wg.Done()
+			value := make([]byte, *payload)
+			rng.Read(value)
+			var read []byte
+			for time.Now().Before(deadline) {
+				key := rng.Int63n(*keys)
+				begin := time.Now()
+				var err error
+				if rng.Float64() < *readRatio {
+					err = session.Query("SELECT v FROM matrix_load.kv WHERE k = ?", key).Scan(&read)
+					if errors.Is(err, gocql.ErrNotFound) {
+						err = nil
+					}
+					atomic.AddUint64(&reads, 1)
+				} else {
+					err = session.Query("INSERT INTO matrix_load.kv (k, v) VALUES (?, ?)", key, value).Exec()
+					atomic.AddUint64(&writes, 1)
+				}
+				h.record(time.Since(begin))
+				if err != nil {
+					atomic.AddUint64(&failures, 1)
+					firstError.CompareAndSwap(nil, err.Error())
+				}
+			}
+		}(histograms[worker], rand.New(rand.NewSource(int64(worker))))
+	}
+	wg.Wait()
+	elapsed := time.Since(start)
+	session.Close()
+
+	merged := newHistogram()
+	for _, h := range histograms {
+		merged.merge(h)
+	}
+	total := merged.total()
+	res := result{
+		Operations:      total,
+		Reads:           reads,
+		Writes:          writes,
+		Errors:          failures,
+		DurationSeconds: elapsed.Seconds(),
+		OpsPerSecond:    float64(total) / elapsed.Seconds(),
+		LatencyUs: map[string]float64{
+			"p50":  float64(merged.percentile(50)) / 1e3,
+			"p99":  float64(merged.percentile(99)) / 1e3,
+			"p999": float64(merged.percentile(99.9)) / 1e3,
+			"max":  float64(merged.percentile(100)) / 1e3,
+		},
+		Histogram: merged.buckets(),
+	}
+	if err, ok := firstError.Load().(string); ok {
+		res.FirstError = err
+	}
+	if err := json.NewEncoder(os.Stdout).Encode(res); err != nil {
+		os.Exit(1)
+	}
+}
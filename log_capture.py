@@ -0,0 +1,233 @@
+"""Compressed, seekable capture of the go test output and the node logs, indexed by test.
+
+Logs are written as a sequence of independently compressed frames (zstd when the `zstandard` module is installed,
+gzip members otherwise), with a table mapping uncompressed to compressed offsets.  Reading the lines logged while
+a test ran only decompresses the frames overlapping it.
+
+The go test output is captured by running this module as a filter in the `go test | go-junit-report` pipeline:
+
+    go test -v ... 2>&1 | python3 log_capture.py stamp <capture dir> | go-junit-report ...
+
+Extract the output and node logs of a test from a capture directory:
+
+    python3 log_capture.py extract <capture dir> TestName
+"""
+import argparse
+import bisect
+import gzip
+import json
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+INDEX_FILE = "index.json"
+GO_TEST_LOG = "go-test.log"
+FRAME_SIZE = 1024 * 1024
+# "=== RUN   TestName", "--- FAIL: TestName (0.12s)"; sub-tests are indented
+_TEST_START = re.compile(rb"^=== RUN\s+(\S+)")
+_TEST_END = re.compile(rb"^\s*--- (PASS|FAIL|SKIP): (\S+)")
+# "INFO  2024-05-01 10:00:00,123 [shard 0] ..." in Scylla's log, ccm's log uses the same date format
+_LOG_TIMESTAMP = re.compile(rb"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(?:[,.](\d{3}))?")
+
+
+def compression() -> str:
+    return "zstd" if zstandard else "gzip"
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if not zstandard:
+            raise RuntimeError("The capture is zstd compressed, install the 'zstandard' module to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _extension(codec: str) -> str:
+    return ".zst" if codec == "zstd" else ".gz"
+
+
+class FramedWriter:
+    """Compresses everything written in frames of about FRAME_SIZE uncompressed bytes."""
+
+    def __init__(self, path: Path, codec: str, frame_size: int = FRAME_SIZE) -> None:
+        self._file: BinaryIO = path.open("wb")
+        self._codec = codec
+        self._frame_size = frame_size
+        self._buffer = bytearray()
+        self._offset = 0
+        # [uncompressed offset, compressed offset] of every frame
+        self.frames: List[List[int]] = []
+
+    def tell(self) -> int:
+        """Uncompressed offset of the next written byte."""
+        return self._offset + len(self._buffer)
+
+    def write(self, data: bytes) -> None:
+        self._buffer += data
+        if len(self._buffer) >= self._frame_size:
+            self._flush_frame()
+
+    def _flush_frame(self) -> None:
+        if not self._buffer:
+            return
+        self.frames.append([self._offset, self._file.tell()])
+        self._file.write(_compress(bytes(self._buffer), self._codec))
+        self._offset += len(self._buffer)
+        self._buffer.clear()
+
+    def close(self) -> List[List[int]]:
+        self._flush_frame()
+        self._file.close()
+        return self.frames
+
+
+def read_range(path: Path, codec: str, frames: List[List[int]], start: int, end: Optional[int] = None) -> bytes:
+    """Uncompressed bytes [start, end) of a framed file, decompressing only the frames overlapping the range."""
+    if not frames:
+        return b""
+    first = max(bisect.bisect_right([frame[0] for frame in frames], start) - 1, 0)
+    chunks = []
+    with path.open("rb") as file:
+        for index in range(first, len(frames)):
+            uncompressed_offset, compressed_offset = frames[index]
+            if end is not None and uncompressed_offset >= end:
+                break
+            file.seek(compressed_offset)
+            size = frames[index + 1][1] - compressed_offset if index + 1 < len(frames) else -1
+            chunks.append(_decompress(file.read(size), codec))
+    data = b"".join(chunks)
+    base = frames[first][0]
+    return data[start - base:None if end is None else end - base]
+
+
+def _read_index(capture_dir: Path) -> Dict:
+    index_file = capture_dir / INDEX_FILE
+    return json.loads(index_file.read_text()) if index_file.is_file() else {"files": {}, "tests": {}}
+
+
+def _write_index(capture_dir: Path, index: Dict) -> None:
+    tmp_file = capture_dir / f".{INDEX_FILE}.tmp"
+    tmp_file.write_text(json.dumps(index))
+    tmp_file.replace(capture_dir / INDEX_FILE)
+
+
+def stamp(capture_dir: Path, source: BinaryIO, sink: BinaryIO, clock: Callable[[], datetime] = datetime.now) -> Dict:
+    """Copy the go test output from *source* to *sink*, capturing it with the start/end time and offsets of every test."""
+    capture_dir.mkdir(parents=True, exist_ok=True)
+    codec = compression()
+    file_name = GO_TEST_LOG + _extension(codec)
+    writer = FramedWriter(capture_dir / file_name, codec)
+    tests: Dict[str, Dict] = {}
+    now = clock().isoformat(timespec="milliseconds")
+    for line in iter(source.readline, b""):
+        sink.write(line)
+        sink.flush()
+        now = clock().isoformat(timespec="milliseconds")
+        start_match = _TEST_START.match(line)
+        if start_match:
+            name = start_match.group(1).decode(errors="replace")
+            tests.setdefault(name, {"start": now, GO_TEST_LOG: [writer.tell(), None]})
+        writer.write(line)
+        end_match = _TEST_END.match(line)
+        if end_match:
+            name = end_match.group(2).decode(errors="replace")
+            test = tests.setdefault(name, {"start": now, GO_TEST_LOG: [writer.tell() - len(line), None]})
+            test.update(end=now, status=end_match.group(1).decode())
+            test[GO_TEST_LOG][1] = writer.tell()
+    index = _read_index(capture_dir)
+    index["files"][GO_TEST_LOG] = {"path": file_name, "compression": codec, "frames": writer.close()}
+    # Tests still running when the output ended (e.g. a panic or the -timeout) span to the end of it
+    for test in tests.values():
+        test.setdefault("end", now)
+        test.setdefault("status", "UNFINISHED")
+        if test[GO_TEST_LOG][1] is None:
+            test[GO_TEST_LOG][1] = writer.tell()
+    index["tests"].update(tests)
+    _write_index(capture_dir, index)
+    return index
+
+
+def _parse_log_timestamp(line: bytes) -> Optional[datetime]:
+    match = _LOG_TIMESTAMP.search(line, 0, 64)
+    if not match:
+        return None
+    seconds, millis = match.groups()
+    try:
+        timestamp = datetime.strptime(seconds.decode(), "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+    return timestamp.replace(microsecond=int(millis or 0) * 1000)
+
+
+def capture_log(capture_dir: Path, name: str, log_file: Path) -> None:
+    """Compress a node log into the capture, indexing the byte range logged while each captured test ran."""
+    capture_dir.mkdir(parents=True, exist_ok=True)
+    codec = compression()
+    file_name = name + _extension(codec)
+    writer = FramedWriter(capture_dir / file_name, codec)
+    timestamps: List[datetime] = []
+    offsets: List[int] = []
+    with log_file.open("rb") as log:
+        for line in log:
+            timestamp = _parse_log_timestamp(line)
+            # Lines without a timestamp (e.g. backtraces) belong to the previous entry
+            if timestamp and (not timestamps or timestamp >= timestamps[-1]):
+                timestamps.append(timestamp)
+                offsets.append(writer.tell())
+            writer.write(line)
+    size = writer.tell()
+    index = _read_index(capture_dir)
+    index["files"][name] = {"path": file_name, "compression": codec, "frames": writer.close()}
+    for test in index["tests"].values():
+        start = bisect.bisect_left(timestamps, datetime.fromisoformat(test["start"]))
+        end = bisect.bisect_right(timestamps, datetime.fromisoformat(test["end"]))
+        test[name] = [offsets[start] if start < len(offsets) else size, offsets[end] if end < len(offsets) else size]
+    _write_index(capture_dir, index)
+
+
+def extract(capture_dir: Path, test_name: str) -> Dict[str, bytes]:
+    """The captured output and node log lines of one test, by log name."""
+    index = _read_index(capture_dir)
+    test = index["tests"].get(test_name)
+    if test is None:
+        raise KeyError(f"Test '{test_name}' isn't in the capture index of '{capture_dir}'")
+    result = {}
+    for name, log in index["files"].items():
+        if name in test:
+            start, end = test[name]
+            result[name] = read_range(capture_dir / log["path"], log["compression"], log["frames"], start, end)
+    return result
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    stamp_parser = commands.add_parser("stamp", help="capture the go test output read from stdin, copying it to stdout")
+    stamp_parser.add_argument("capture_dir", type=Path)
+    extract_parser = commands.add_parser("extract", help="print the captured output and node logs of a test")
+    extract_parser.add_argument("capture_dir", type=Path)
+    extract_parser.add_argument("test_name")
+    arguments = parser.parse_args()
+    if arguments.command == "stamp":
+        stamp(arguments.capture_dir, sys.stdin.buffer, sys.stdout.buffer)
+    else:
+        for name, data in extract(arguments.capture_dir, arguments.test_name).items():
+            sys.stdout.buffer.write(f"==== {name} ====\n".encode() + data)
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    _main()
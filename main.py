@@ -1,71 +1,309 @@
 import sys
 import argparse
+import itertools
+import json
 import logging
 import os
-import subprocess
-from typing import List
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 import traceback
 
+from packaging.version import InvalidVersion, Version
+
+from cluster import CLUSTER_BACKENDS, join_cluster_reapers, scylla_binaries_cached
+from commands import format_summary, run_command, summarize as summarize_commands, telemetry as command_telemetry
+from coordinator import Coordinator
+from configurations import COMPRESSORS, DriverOptions, LoadConfiguration, RacePolicy
+from result_cache import ResultCache
 from run import Run
 from email_sender import create_report, get_driver_origin_remote, send_mail
+from gobench import compare_benchmarks, format_comparison
+from planner import CellPlan, duration_history, estimate, format_plan, lpt_schedule
+from result_history import (COMPARE_RUNS, HISTORY_DIR, HistoryComparison, RunHistory, compare, format_history,
+                            history_files, load_runs, new_run_id, prune)
 
 logging.basicConfig(level=logging.INFO)
 
 
-def main(arguments: argparse.Namespace):
-    status = 0
-    results = dict()
-    driver_type = get_driver_type(arguments.gocql_driver_git)
-    for driver_version in arguments.versions:
-        for protocol in arguments.protocols:
-            logging.info('=== GOCQL DRIVER VERSION %s, PROTOCOL v%s ===', driver_version, protocol)
-            runner = Run(gocql_driver_git=arguments.gocql_driver_git,
-                             driver_type=driver_type,
-                             tag=driver_version,
-                             protocol=protocol,
-                             tests=arguments.tests,
-                             scylla_version=arguments.scylla_version
-                             )
-            try:
-                result = runner.run()
-
-                logging.info("=== (%s:%s) GOCQL DRIVER MATRIX RESULTS FOR PROTOCOL v%s ===",
-                             driver_type, driver_version, protocol)
-                logging.info(", ".join(f"{key}: {value}" for key, value in result.summary.items()))
-                if result.is_failed:
-                    if not result.summary.get("tests"):
-                        logging.error("The run is failed because of one or more steps in the setup are failed")
-                    else:
-                        logging.error("Please check the report because there were failed tests")
-                    status = 1
-                results[(driver_version, protocol)] = result.summary
-            except Exception:
-                logging.exception(f"{driver_version} failed")
-                status = 1
-                exc_type, exc_value, exc_traceback = sys.exc_info()
-                failure_reason = traceback.format_exception(exc_type, exc_value, exc_traceback)
-                results[(driver_version, protocol)] = dict(exception=failure_reason)
-                runner.create_metadata_for_failure(reason="\n".join(failure_reason))
+# Matrix cell: (driver version, protocol, driver options label, Scylla version)
+Cell = Tuple[str, str, str, str]
+
 
+@dataclass
+class MatrixResult:
+    status: int = 0
+    results: Dict[Cell, Dict] = field(default_factory=dict)
+    durations: Dict[Cell, Dict[str, float]] = field(default_factory=dict)
+    load_results: Dict[Cell, Dict] = field(default_factory=dict)
+    junit_files: Dict[Cell, Path] = field(default_factory=dict)
+    benchmark_results: Dict[Cell, Dict] = field(default_factory=dict)
+    benchmark_comparisons: List[Dict] = field(default_factory=list)
+    commands: Dict = field(default_factory=dict)
+
+
+def main(arguments: argparse.Namespace):
+    if arguments.plan:
+        plans, schedule = plan_matrix(arguments)
+        logging.info("=== MATRIX PLAN ===\n%s", format_plan(plans, schedule))
+        quit(0)
+    matrix = run_distributed(arguments) if arguments.workers else run_matrix(arguments)
+    history = record_history(matrix, arguments.history_max_runs) if arguments.history_max_runs else None
     if arguments.recipients:
-        email_report = create_report(results=results, scylla_version=arguments.scylla_version)
+        email_report = create_report(results=matrix.results, scylla_version=", ".join(arguments.scylla_versions),
+                                     benchmarks=matrix.benchmark_comparisons, load_results=matrix.load_results,
+                                     durations=matrix.durations, history=history)
         email_report['driver_remote'] = get_driver_origin_remote(arguments.gocql_driver_git)
-        email_report['status'] = "SUCCESS" if status == 0 else "FAILED"
+        email_report['status'] = "SUCCESS" if matrix.status == 0 else "FAILED"
         send_mail(arguments.recipients, email_report)
 
-    quit(status)
+    join_cluster_reapers()
+    quit(matrix.status)
+
+
+# Compressors the tests of every driver version handle, the others are looked up in the tag's common_test.go
+_BUILTIN_COMPRESSORS = ("none", "snappy")
+# (driver checkout, tag, compressor) -> whether the tests of the tag support the compressor
+_compressor_support: Dict[Tuple[str, str, str], bool] = {}
+
+
+def compressor_supported(gocql_driver_git: str, driver_version: str, compressor: str) -> bool:
+    """Whether the tests of a driver tag run with a compressor; common_test.go panics on a -compressor it doesn't know"""
+    if compressor in _BUILTIN_COMPRESSORS:
+        return True
+    key = (str(gocql_driver_git), driver_version, compressor)
+    if key not in _compressor_support:
+        result = run_command(["git", "show", f"tags/{driver_version}:common_test.go"], cwd=gocql_driver_git,
+                             capture_stdout=True, text=True, timeout=60)
+        # Without the file (or with DRY_RUN) there is nothing to check, the cell runs
+        _compressor_support[key] = result.returncode != 0 or not result.stdout or f'"{compressor}"' in result.stdout
+        if not _compressor_support[key]:
+            logging.warning("Skipping the '%s' compressor for driver version '%s', its tests don't support it",
+                            compressor, driver_version)
+    return _compressor_support[key]
+
+
+def matrix_cells(arguments: argparse.Namespace) -> Iterator[Tuple[Cell, DriverOptions]]:
+    # The driver version is the outermost dimension, so its checkout and patches are prepared once for all its cells
+    for driver_version, scylla_version, protocol, driver_options in itertools.product(
+            arguments.versions, arguments.scylla_versions, arguments.protocols, arguments.driver_options):
+        if not compressor_supported(arguments.gocql_driver_git, driver_version, driver_options.compressor):
+            continue
+        yield (driver_version, protocol, driver_options.label, scylla_version), driver_options
+
+
+def _result_cache(arguments: argparse.Namespace) -> Optional[ResultCache]:
+    if not arguments.result_cache_max_entries:
+        return None
+    return ResultCache(ttl_seconds=int(arguments.result_cache_ttl_days * 24 * 3600),
+                       max_entries=arguments.result_cache_max_entries)
+
+
+def create_runner(arguments: argparse.Namespace, cell: Cell, driver_options: DriverOptions, driver_type: str,
+                  result_cache: Optional[ResultCache]) -> Run:
+    load_configuration = None
+    if arguments.load_duration:
+        load_configuration = LoadConfiguration(concurrency=arguments.load_concurrency,
+                                               duration_seconds=arguments.load_duration,
+                                               payload_bytes=arguments.load_payload_size,
+                                               read_ratio=arguments.load_read_ratio)
+    driver_version, protocol, _, scylla_version = cell
+    return Run(gocql_driver_git=arguments.gocql_driver_git,
+               driver_type=driver_type,
+               tag=driver_version,
+               protocol=protocol,
+               tests=arguments.tests,
+               scylla_version=scylla_version,
+               cluster_backend=arguments.cluster_backend,
+               result_cache=result_cache,
+               force=arguments.force,
+               load_configuration=load_configuration,
+               driver_options=driver_options,
+               metrics_interval=arguments.metrics_interval,
+               resource_interval=arguments.resource_interval,
+               watchdog_interval=arguments.watchdog_interval,
+               race_policy=arguments.race_policy,
+               label_scylla_version=arguments.label_scylla_version or len(arguments.scylla_versions) > 1,
+               run_selection=arguments.run,
+               )
+
+
+def run_matrix(arguments: argparse.Namespace) -> MatrixResult:
+    """Run every cell of the matrix described by the parsed arguments"""
+    matrix = MatrixResult()
+    commands_mark = command_telemetry.mark()
+    driver_type = get_driver_type(arguments.gocql_driver_git)
+    result_cache = _result_cache(arguments)
+    for cell, driver_options in matrix_cells(arguments):
+        driver_version, protocol, _, scylla_version = cell
+        logging.info('=== GOCQL DRIVER VERSION %s, PROTOCOL v%s %sSCYLLA %s ===', driver_version, protocol,
+                     f"{driver_options.label} " if driver_options.label else "", scylla_version)
+        runner = create_runner(arguments, cell, driver_options, driver_type, result_cache)
+        try:
+            result = runner.run()
+
+            logging.info("=== (%s:%s) GOCQL DRIVER MATRIX RESULTS FOR PROTOCOL v%s %sSCYLLA %s ===",
+                         driver_type, driver_version, protocol,
+                         f"{driver_options.label} " if driver_options.label else "", scylla_version)
+            logging.info(", ".join(f"{key}: {value}" for key, value in result.summary.items()))
+            if runner.infra_failures:
+                logging.error("The run is failed because of a cluster failure while the tests ran: %s",
+                              ", ".join(f"{tag}: {failure['reason']}" for tag, failure in runner.infra_failures.items()))
+                matrix.status = 1
+            elif result.is_failed:
+                if not result.summary.get("tests"):
+                    logging.error("The run is failed because of one or more steps in the setup are failed")
+                else:
+                    logging.error("Please check the report because there were failed tests")
+                matrix.status = 1
+            matrix.results[cell] = result.summary
+            if runner.infra_failures:
+                matrix.results[cell] = dict(result.summary, infra_failures=runner.infra_failures)
+            matrix.durations[cell] = runner.durations
+            matrix.junit_files[cell] = runner.xunit_file
+            if runner.benchmark_results:
+                matrix.benchmark_results[cell] = runner.benchmark_results
+            if runner.load_results:
+                matrix.load_results[cell] = runner.load_results
+        except Exception:
+            logging.exception(f"{driver_version} failed")
+            matrix.status = 1
+            exc_type, exc_value, exc_traceback = sys.exc_info()
+            failure_reason = traceback.format_exception(exc_type, exc_value, exc_traceback)
+            matrix.results[cell] = dict(exception=failure_reason)
+            runner.create_metadata_for_failure(reason="\n".join(failure_reason))
+
+    matrix.benchmark_comparisons = compare_benchmark_results(matrix.benchmark_results)
+    matrix.commands = summarize_commands(command_telemetry.since(commands_mark))
+    logging.info("=== MOST EXPENSIVE COMMANDS ===\n%s", format_summary(matrix.commands))
+    xunit_dir = Path(os.path.dirname(__file__)) / "xunit"
+    xunit_dir.mkdir(exist_ok=True)
+    (xunit_dir / "commands.json").write_text(json.dumps(matrix.commands, indent=2))
+    return matrix
+
+
+def run_distributed(arguments: argparse.Namespace) -> MatrixResult:
+    """Run every cell of the matrix as a job of one of the worker daemons of arguments.workers"""
+    matrix = MatrixResult()
+    cells = {}
+    for cell, driver_options in matrix_cells(arguments):
+        driver_version, protocol, _, scylla_version = cell
+        # The later options override the ones of the coordinator's command line
+        cells[cell] = [*arguments.argv, "--versions", driver_version, "--protocols", protocol,
+                       "--scylla-version", scylla_version, "--compressors", driver_options.compressor,
+                       "--gocql-timeouts", driver_options.timeout, "--autowaits", driver_options.autowait,
+                       "--workers", ""]
+        if len(arguments.scylla_versions) > 1:
+            cells[cell].append("--label-scylla-version")
+    try:
+        # Longest first, as the --plan schedules them
+        estimates = {plan.cell: plan.estimate_seconds for plan in plan_matrix(arguments)[0]}
+        cells = dict(sorted(cells.items(), key=lambda item: estimates.get(item[0], 0), reverse=True))
+    except Exception:
+        logging.exception("Failed to estimate the durations of the cells, they run in the matrix order")
+    logging.info("Running %d cells on the workers %s", len(cells), ", ".join(arguments.workers))
+    results = Coordinator(arguments.workers, Path(os.path.dirname(__file__)) / "xunit").run(cells)
+    for cell in cells:
+        result = results[cell]
+        if result["status"] == "error":
+            logging.error("Cell %s failed: %s", cell, result["error"])
+            matrix.status = 1
+            matrix.results[cell] = dict(exception=[result["error"]])
+            continue
+        if result["status"] == "failed":
+            matrix.status = 1
+        matrix.results[cell] = result["summary"]
+        matrix.durations[cell] = result["durations"] or {}
+        if result.get("junit_file"):
+            matrix.junit_files[cell] = result["junit_file"]
+        if result.get("benchmarks"):
+            matrix.benchmark_results[cell] = result["benchmarks"]
+        if result.get("load"):
+            matrix.load_results[cell] = result["load"]
+    matrix.benchmark_comparisons = compare_benchmark_results(matrix.benchmark_results)
+    return matrix
+
+
+def record_history(matrix: MatrixResult, max_runs: int, directory: Path = HISTORY_DIR) -> HistoryComparison:
+    """Store the per-test results of the run in the result history, and compare them against the previous runs"""
+    run = RunHistory.from_junit_files(new_run_id(), matrix.junit_files)
+    comparison = compare(run, load_runs(history_files(directory)[-COMPARE_RUNS:]))
+    logging.info("=== TEST RESULTS VS PREVIOUS RUNS ===\n%s", format_history(comparison))
+    logging.info("Test results stored in the result history '%s'", run.save(directory))
+    prune(directory, max_runs)
+    return comparison
+
+
+def plan_matrix(arguments: argparse.Namespace) -> Tuple[List[CellPlan], List[List[CellPlan]]]:
+    """Expand the matrix without running it: the cells, their expected durations and cache hits, and their schedule"""
+    driver_type = get_driver_type(arguments.gocql_driver_git)
+    result_cache = _result_cache(arguments)
+    plans = []
+    for cell, driver_options in matrix_cells(arguments):
+        runner = create_runner(arguments, cell, driver_options, driver_type, result_cache)
+        try:
+            plan = runner.plan()
+        except ValueError as exc:
+            plans.append(CellPlan(cell=cell, name=runner.xunit_file_name.replace(".xml", ""), version_folder=None,
+                                  test_passes=[], error=str(exc)))
+            continue
+        plans.append(CellPlan(cell=cell, **plan,
+                              binaries_cached=scylla_binaries_cached(cell[3], arguments.cluster_backend)))
+    metadata_files = list((Path(os.path.dirname(__file__)) / "xunit").glob("*/metadata_*.json"))
+    if result_cache:
+        metadata_files += [path for entry in result_cache.entries() for path in entry.glob("metadata_*.json")]
+    estimate(plans, duration_history(metadata_files))
+    return plans, lpt_schedule(plans, arguments.plan_parallelism or len(arguments.workers) or 1)
+
+
+def _version_sort_key(driver_version: str):
+    try:
+        return 0, Version(driver_version)
+    except InvalidVersion:
+        # Non-semver identifiers (e.g. "master") are newer than every tag
+        return 1, driver_version
+
+
+def compare_benchmark_results(benchmark_results: Dict[Tuple[str, str, str, str], Dict]) -> List[Dict]:
+    """
+    Compare the benchmarks of every driver version against the previous tested tag (per protocol, driver options and
+    Scylla version), and the benchmarks of non-default driver options against the default ones (per driver version,
+    protocol and Scylla version).
+    """
+    comparisons = []
+    name_scylla_versions = len({cell[3] for cell in benchmark_results}) > 1
+
+    def _name(version, label, scylla_version):
+        return " ".join(part for part in (version, label, scylla_version if name_scylla_versions else "") if part)
+
+    def _compare(baseline_cell, cell):
+        rows = compare_benchmarks(benchmark_results[baseline_cell], benchmark_results[cell])
+        baseline_name, name = _name(baseline_cell[0], *baseline_cell[2:]), _name(cell[0], *cell[2:])
+        logging.info("=== BENCHMARKS %s VS %s, PROTOCOL v%s ===\n%s", name, baseline_name, cell[1],
+                     format_comparison(rows))
+        comparisons.append(dict(version=name, baseline=baseline_name, protocol=cell[1], rows=rows))
+
+    for dimensions in sorted({cell[1:] for cell in benchmark_results}):
+        versions = sorted((cell[0] for cell in benchmark_results if cell[1:] == dimensions), key=_version_sort_key)
+        for baseline, version in zip(versions, versions[1:]):
+            _compare((baseline, *dimensions), (version, *dimensions))
+    for version, protocol, label, scylla_version in sorted(benchmark_results):
+        if label and (version, protocol, "", scylla_version) in benchmark_results:
+            _compare((version, protocol, "", scylla_version), (version, protocol, label, scylla_version))
+    return comparisons
 
 
 def extract_n_latest_repo_tags(repo_directory: str, latest_tags_size: int = 2) -> List[str]:
     commands = [
-        f"cd {repo_directory}",
         "git checkout .",
         "git fetch -p --all",
         f"git tag --sort=-creatordate | grep '^v[0-9]*\.[0-9]*\.[0-9]*$'"
     ]
     major_tags = set()
     tags = []
-    for repo_tag in subprocess.check_output(" && ".join(commands), shell=True).decode().splitlines():
+    output = run_command(" && ".join(commands), cwd=repo_directory, capture_stdout=True, text=True, check=True,
+                         timeout=10 * 60).stdout
+    for repo_tag in output.splitlines():
         if "." in repo_tag and not ("-" in repo_tag and not repo_tag.endswith("-scylla")):
             major_tag = tuple(repo_tag.split(".", maxsplit=2)[:2])
             if major_tag not in major_tags:
@@ -81,7 +319,25 @@ def extract_n_latest_repo_tags(repo_directory: str, latest_tags_size: int = 2) -
 def get_driver_type(gocql_driver_git):
     return "scylla" if "scylladb" in get_driver_origin_remote(gocql_driver_git) else "upstream"
 
-def get_arguments() -> argparse.Namespace:
+
+def resolve_driver_versions(arguments: argparse.Namespace) -> None:
+    """Turn --versions into the list of driver tags; a number of latest tags is looked up in the driver checkout"""
+    driver_versions = str(arguments.versions).replace(" ", "")
+    if driver_versions.isdigit():
+        arguments.versions = extract_n_latest_repo_tags(
+            repo_directory=arguments.gocql_driver_git,
+            latest_tags_size=int(driver_versions)
+        )
+    else:
+        arguments.versions = driver_versions.split(",")
+
+
+def get_arguments(argv: Optional[List[str]] = None, resolve_versions: bool = True) -> argparse.Namespace:
+    """
+    Parse the main.py arguments.
+    :param resolve_versions: look the --versions up (see resolve_driver_versions) already, otherwise they are left as
+     given, e.g. until the driver checkout can be used
+    """
     default_protocols = ['3', '4']
     parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
     parser.add_argument('gocql_driver_git', help='folder with git repository of gocql-driver', default="/gocql")
@@ -90,26 +346,103 @@ def get_arguments() -> argparse.Namespace:
                              "The value can be number or str with comma (example: 'v1.8.0,v1.7.3').\n"
                              "default=2 - take the two latest driver's tags.")
     parser.add_argument('--tests', default=['integration', 'auth'],
-                        help='"tags" to pass to go test command, default=integration auth', nargs='+', choices=['integration', 'auth', 'ccm'])
+                        help='"tags" to pass to go test command, default=integration auth', nargs='+', choices=['integration', 'auth', 'ccm', 'bench'])
     parser.add_argument('--protocols', default=default_protocols,
                         help='cqlsh native protocol, default={}'.format(','.join(default_protocols)))
-    parser.add_argument('--scylla-version', help="relocatable scylla version to use",
+    parser.add_argument('--scylla-version', help="relocatable scylla versions to use, each one is a matrix dimension\n"
+                                                 "The value is str with comma (example: 'release:2025.1,release:2026.1').",
                         default=os.environ.get('SCYLLA_VERSION', None)),
+    parser.add_argument('--compressors', default='snappy',
+                        help="compressors the driver tests run with, each one is a matrix dimension, default=snappy\n"
+                             f"The value is str with comma (example: 'none,snappy,lz4'), supported: {','.join(COMPRESSORS)}.")
+    parser.add_argument('--gocql-timeouts', default='60s',
+                        help="values of the tests' -gocql.timeout, each one is a matrix dimension, default=60s")
+    parser.add_argument('--autowaits', default='2000ms',
+                        help="values of the tests' -autowait, each one is a matrix dimension, default=2000ms")
+    parser.add_argument('--race-protocols', default=None,
+                        help="protocols getting a separate race detector (-race) pass of the integration and ccm tags,\n"
+                             "while every protocol runs them without -race (example: '4'); 'none' disables the race\n"
+                             "detector. By default every run uses -race.")
+    parser.add_argument('--race-run', default='',
+                        help="regex of the tests of the separate race detector pass (go test -run), default: all tests;\n"
+                             "without --race-protocols the race pass is done for every protocol")
+    parser.add_argument('--run', default='',
+                        help="regex of the tests to run (go test -run), default: all tests; the tags selecting their own\n"
+                             "tests (auth, bench) aren't narrowed down. Set by the PR workflow to the tests affected by\n"
+                             "the changes of a version folder.")
+    parser.add_argument('--metrics-interval', type=float, default=10,
+                        help="seconds between scrapes of the nodes' Prometheus metrics while the tests run, 0 disables\n"
+                             "the scraping; per-tag aggregates are added to the metadata JSON, default=10")
+    parser.add_argument('--resource-interval', type=float, default=5,
+                        help="seconds between psutil samples of the Scylla node processes (CPU, peak RSS, I/O, context\n"
+                             "switches), 0 disables them; the go test pipeline is always accounted, default=5")
+    parser.add_argument('--watchdog-interval', type=float, default=5,
+                        help="seconds between the checks of the node processes and CQL responsiveness while the tests\n"
+                             "run; after 3 failed checks in a row the go test is killed and the cell is reported as an\n"
+                             "infrastructure failure. Not used for the 'ccm' tag, 0 disables it, default=5")
+    parser.add_argument('--cluster-backend', default='ccm', choices=sorted(CLUSTER_BACKENDS),
+                        help="cluster backend to run the tests against, default=ccm\n"
+                             "'fake' binds the Scylla ports and answers the CQL handshake without real Scylla binaries,\n"
+                             "for testing the matrix orchestration itself.")
+    parser.add_argument('--force', action='store_true',
+                        help="re-run all the matrix cells, even when a cached result with the same inputs exists")
+    parser.add_argument('--result-cache-ttl-days', type=float, default=7,
+                        help="days a cached result of a passing matrix cell is reused, default=7")
+    parser.add_argument('--result-cache-max-entries', type=int, default=200,
+                        help="cached results to keep, least recently used ones are evicted, 0 disables the cache, "
+                             "default=200")
+    parser.add_argument('--history-max-runs', type=int, default=50,
+                        help="runs whose per-test results are kept in the result history (~/.ccm/matrix-history), the\n"
+                             "tests newly failing, fixed or slowed down since the previous runs are reported, 0 disables\n"
+                             "the history, default=50")
+    parser.add_argument('--load-duration', type=int, default=0,
+                        help="seconds of sustained read/write load to drive through every driver version and protocol\n"
+                             "after the tests, recording ops/s and p50/p99/p999 latencies, default=0 (disabled)")
+    parser.add_argument('--load-concurrency', type=int, default=32, help="concurrent requests of the load test, default=32")
+    parser.add_argument('--load-payload-size', type=int, default=256,
+                        help="bytes written per request of the load test, default=256")
+    parser.add_argument('--load-read-ratio', type=float, default=0.5,
+                        help="fraction of reads in the load test, default=0.5")
+    parser.add_argument('--workers', default='',
+                        help="coordinate the matrix over worker daemons (daemon.py --port) instead of running it locally\n"
+                             "The value is str with comma (example: 'http://host1:8765,http://host2:8765').")
+    parser.add_argument('--plan', action='store_true',
+                        help="print the cells, their expected durations from the previous runs, the result cache and\n"
+                             "Scylla download cache hits, and the schedule of the cells, without running anything")
+    parser.add_argument('--plan-parallelism', type=int, default=0,
+                        help="runners the --plan schedules the cells on, default: the number of --workers, or 1")
+    # Set by the coordinator, so a worker running one Scylla version names its files like the whole matrix does
+    parser.add_argument('--label-scylla-version', action='store_true', help=argparse.SUPPRESS)
     parser.add_argument('--recipients', help="whom to send mail at the end of the run",  nargs='+', default=None)
-    arguments = parser.parse_args()
+    arguments = parser.parse_args(argv)
+    arguments.argv = list(sys.argv[1:] if argv is None else argv)
     if not arguments.scylla_version:
         logging.error("Error: --scylla-version is required if SCYLLA_VERSION is not set in the environment.")
         sys.exit(1)
-    driver_versions = str(arguments.versions).replace(" ", "")
-    if driver_versions.isdigit():
-        arguments.versions = extract_n_latest_repo_tags(
-            repo_directory=arguments.gocql_driver_git,
-            latest_tags_size=int(driver_versions)
-        )
-    else:
-        arguments.versions = driver_versions.split(",")
+    arguments.scylla_versions = arguments.scylla_version.replace(" ", "").split(",")
+    arguments.workers = [worker for worker in arguments.workers.replace(" ", "").split(",") if worker]
+    if resolve_versions:
+        resolve_driver_versions(arguments)
     if not isinstance(arguments.protocols, list):
         arguments.protocols = arguments.protocols.split(",")
+    compressors = arguments.compressors.replace(" ", "").split(",")
+    unsupported = set(compressors) - set(COMPRESSORS)
+    if unsupported:
+        parser.error(f"unsupported compressors: {','.join(sorted(unsupported))}")
+    race_protocols = None
+    if arguments.race_protocols == 'none':
+        race_protocols = ()
+    elif arguments.race_protocols:
+        race_protocols = tuple(int(protocol) for protocol in arguments.race_protocols.replace(" ", "").split(","))
+    arguments.race_policy = RacePolicy(protocols=race_protocols, run=arguments.race_run)
+    arguments.driver_options = [
+        DriverOptions(compressor=compressor, timeout=timeout, autowait=autowait)
+        for compressor, timeout, autowait in itertools.product(
+            compressors,
+            arguments.gocql_timeouts.replace(" ", "").split(","),
+            arguments.autowaits.replace(" ", "").split(","),
+        )
+    ]
     return arguments
 
 
@@ -0,0 +1,140 @@
+import gzip
+import json
+import logging
+import re
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = 9180
+# Counters sampled from every node, summed over shards and other labels
+COUNTERS = {
+    "cql_requests": "scylla_transport_requests_served",
+    "cql_errors": "scylla_transport_cql_errors_total",
+    "read_timeouts": "scylla_storage_proxy_coordinator_read_timeouts",
+    "write_timeouts": "scylla_storage_proxy_coordinator_write_timeouts",
+    "reactor_stalls": "scylla_reactor_stalls_count",
+}
+# Latency histograms (microseconds) sampled from every node, buckets summed over shards
+HISTOGRAMS = {
+    "read_latency": "scylla_storage_proxy_coordinator_read_latency",
+    "write_latency": "scylla_storage_proxy_coordinator_write_latency",
+}
+_SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})?\s+(\S+)')
+_LE_LABEL = re.compile(r'le="([^"]+)"')
+
+
+def parse_prometheus_text(text: str) -> Tuple[Dict[str, float], Dict[str, Dict[float, float]]]:
+    """Extract the sampled counters and cumulative histogram buckets from the Prometheus text format."""
+    counters = {name: 0.0 for name in COUNTERS}
+    histograms = {name: {} for name in HISTOGRAMS}
+    counter_names = {metric: name for name, metric in COUNTERS.items()}
+    bucket_names = {f"{metric}_bucket": name for name, metric in HISTOGRAMS.items()}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE_LINE.match(line)
+        if not match:
+            continue
+        metric, labels, value = match.groups()
+        try:
+            value = float(value)
+        except ValueError:
+            continue
+        if metric in counter_names:
+            counters[counter_names[metric]] += value
+        elif metric in bucket_names:
+            le = _LE_LABEL.search(labels or "")
+            if le:
+                buckets = histograms[bucket_names[metric]]
+                upper_bound = float(le.group(1))
+                buckets[upper_bound] = buckets.get(upper_bound, 0.0) + value
+    return counters, histograms
+
+
+def _increase(values: List[float]) -> float:
+    """Total increase of a counter over the samples, tolerating resets (e.g. a node restarted by the ccm tests)."""
+    total = 0.0
+    for previous, current in zip(values, values[1:]):
+        total += current - previous if current >= previous else current
+    return total
+
+
+def _histogram_percentile(buckets: Dict[float, float], percentile: float) -> Optional[float]:
+    """Upper bound of the cumulative bucket holding the percentile, as Prometheus' histogram_quantile does."""
+    bounds = sorted(buckets)
+    if not bounds or not buckets[bounds[-1]]:
+        return None
+    target = buckets[bounds[-1]] * percentile / 100
+    for bound in bounds:
+        if buckets[bound] >= target:
+            return bound
+    return bounds[-1]
+
+
+class MetricsSampler(threading.Thread):
+    """Scrapes the Prometheus endpoint of every node at a fixed interval while the tests run.
+
+    Samples are stored compactly: per node a list of rows ``[timestamp, <counter values in COUNTERS order>]``, and the
+    histogram buckets only at the first and last successful scrape, which is all the per-cell aggregates need.
+    """
+
+    def __init__(self, node_ips: List[str], interval: float, output_file: Optional[Path] = None) -> None:
+        super().__init__(name="metrics-sampler", daemon=True)
+        self._node_ips = node_ips
+        self._interval = interval
+        self._output_file = output_file
+        self._stop_event = threading.Event()
+        self._samples: Dict[str, List[List[float]]] = {ip: [] for ip in node_ips}
+        self._first_histograms: Dict[str, Dict] = {}
+        self._last_histograms: Dict[str, Dict] = {}
+        self.scrape_errors = 0
+
+    def _scrape(self) -> None:
+        for ip in self._node_ips:
+            try:
+                with urllib.request.urlopen(f"http://{ip}:{METRICS_PORT}/metrics", timeout=2) as response:
+                    counters, histograms = parse_prometheus_text(response.read().decode(errors="replace"))
+            except OSError:
+                self.scrape_errors += 1
+                continue
+            self._samples[ip].append([round(time.time(), 3), *(counters[name] for name in COUNTERS)])
+            self._first_histograms.setdefault(ip, histograms)
+            self._last_histograms[ip] = histograms
+
+    def start(self) -> None:
+        # The baseline is scraped synchronously, so requests sent right after start() are counted
+        self._scrape()
+        super().start()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            self._scrape()
+
+    def stop(self) -> Dict:
+        """Stop sampling after a final scrape, save the samples and return the aggregates."""
+        self._stop_event.set()
+        self.join()
+        self._scrape()
+        if self._output_file:
+            with gzip.open(self._output_file, mode="wt", encoding="utf-8") as file:
+                json.dump({"columns": ["timestamp", *COUNTERS], "samples": self._samples,
+                           "histograms": {"first": self._first_histograms, "last": self._last_histograms}}, file)
+        return self.aggregates()
+
+    def aggregates(self) -> Dict:
+        result = {"nodes": len(self._node_ips), "scrape_errors": self.scrape_errors}
+        for index, name in enumerate(COUNTERS, start=1):
+            result[name] = sum(_increase([sample[index] for sample in samples]) for samples in self._samples.values())
+        for name in HISTOGRAMS:
+            delta: Dict[float, float] = {}
+            for ip, last in self._last_histograms.items():
+                first = self._first_histograms[ip][name]
+                for bound, count in last[name].items():
+                    delta[bound] = delta.get(bound, 0.0) + max(count - first.get(bound, 0.0), 0.0)
+            result[f"{name}_p99_us"] = _histogram_percentile(delta, 99)
+        return result
@@ -0,0 +1,122 @@
+"""Plan of a matrix run: its cells, their expected durations and cache hits, and a schedule over parallel runners.
+
+Nothing is run.  The expected duration of a cell comes from the durations recorded in the metadata of its previous
+runs (the local xunit/ folder and the result cache entries); a cell without history is expected to take the median
+of the known cells, and a cell whose result is cached takes no time.
+"""
+import heapq
+import json
+import statistics
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+Cell = Tuple[str, str, str, str]
+
+
+@dataclass
+class CellPlan:
+    cell: Cell
+    name: str
+    version_folder: Optional[Path]
+    test_passes: List[str]
+    ignored: Dict[str, int] = field(default_factory=dict)
+    result_cached: bool = False
+    binaries_cached: Optional[bool] = None
+    estimate_seconds: float = 0
+    # "cache", "history", "median", "unknown" or "error"
+    estimate_source: str = "unknown"
+    # Why the cell can't run, e.g. no version folder matches its driver version
+    error: str = ""
+
+
+def duration_history(metadata_files: Iterable[Path]) -> Dict[str, float]:
+    """Total test duration of the last recorded run of every cell, by cell name."""
+    history: Dict[str, Tuple[float, float]] = {}
+    for metadata_file in metadata_files:
+        try:
+            metadata = json.loads(metadata_file.read_text())
+            mtime = metadata_file.stat().st_mtime
+        except (OSError, ValueError):
+            continue
+        durations = metadata.get("durations")
+        if not durations or metadata.get("driver_name") is None:
+            continue
+        name = metadata["driver_name"]
+        if name not in history or history[name][0] < mtime:
+            history[name] = (mtime, sum(durations.values()))
+    return {name: total for name, (_, total) in history.items()}
+
+
+def estimate(plans: List[CellPlan], history: Dict[str, float]) -> None:
+    """Set the expected duration of every planned cell."""
+    known = [history[plan.name] for plan in plans if plan.name in history] or list(history.values())
+    median = statistics.median(known) if known else 0
+    for plan in plans:
+        if plan.error:
+            plan.estimate_seconds, plan.estimate_source = 0, "error"
+        elif plan.result_cached:
+            plan.estimate_seconds, plan.estimate_source = 0, "cache"
+        elif plan.name in history:
+            plan.estimate_seconds, plan.estimate_source = history[plan.name], "history"
+        elif known:
+            plan.estimate_seconds, plan.estimate_source = median, "median"
+
+
+def lpt_schedule(plans: List[CellPlan], parallelism: int) -> List[List[CellPlan]]:
+    """
+    Longest processing time first: every cell goes to the runner that is free first (with the fewest cells).
+    The coordinator hands the cells out in the same order (see main.run_distributed).
+    """
+    runners: List[List[CellPlan]] = [[] for _ in range(max(parallelism, 1))]
+    free_at = [(0.0, 0, index) for index in range(len(runners))]
+    for plan in sorted(plans, key=lambda plan: plan.estimate_seconds, reverse=True):
+        busy_until, cells, index = heapq.heappop(free_at)
+        runners[index].append(plan)
+        heapq.heappush(free_at, (busy_until + plan.estimate_seconds, cells + 1, index))
+    return runners
+
+
+def summarize(plans: List[CellPlan], schedule: List[List[CellPlan]]) -> Dict:
+    return {
+        "cells": len(plans),
+        "parallelism": len(schedule),
+        "serial_seconds": round(sum(plan.estimate_seconds for plan in plans), 1),
+        "makespan_seconds": round(max((sum(plan.estimate_seconds for plan in runner) for runner in schedule), default=0), 1),
+        # The cells are independent, the longest one bounds the makespan whatever the parallelism
+        "critical_path_seconds": round(max((plan.estimate_seconds for plan in plans), default=0), 1),
+        "result_cache_hits": sum(plan.result_cached for plan in plans),
+        "unestimated_cells": sum(plan.estimate_source == "unknown" for plan in plans),
+        "failed_cells": sum(bool(plan.error) for plan in plans),
+    }
+
+
+def _duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes // 60}h{minutes % 60:02d}m" if minutes >= 60 else f"{minutes}m{seconds:02d}s"
+
+
+def format_plan(plans: List[CellPlan], schedule: List[List[CellPlan]]) -> str:
+    lines = [f"{'cell':<58} {'passes':<24} {'ignored i/s/f':<14} {'estimate':>9} {'source':<8} {'binaries':<8}"]
+    for plan in plans:
+        ignored = "/".join(str(plan.ignored.get(kind, 0)) for kind in ("ignore", "skip", "flaky"))
+        binaries = {True: "cached", False: "download", None: "-"}[plan.binaries_cached]
+        lines.append(f"{plan.name:<58} {','.join(plan.test_passes):<24} {ignored:<14} "
+                     f"{_duration(plan.estimate_seconds):>9} {plan.estimate_source:<8} {binaries:<8}")
+        if plan.error:
+            lines.append(f"  error: {plan.error}")
+    lines.append("")
+    for index, runner in enumerate(schedule, start=1):
+        total = sum(plan.estimate_seconds for plan in runner)
+        lines.append(f"runner {index} ({_duration(total)}): {', '.join(plan.name for plan in runner) or '-'}")
+    summary = summarize(plans, schedule)
+    lines.append("")
+    lines.append(f"{summary['cells']} cells, {summary['result_cache_hits']} from the result cache; "
+                 f"serial {_duration(summary['serial_seconds'])}, "
+                 f"makespan {_duration(summary['makespan_seconds'])} on {summary['parallelism']} runner(s), "
+                 f"critical path {_duration(summary['critical_path_seconds'])}")
+    if summary["failed_cells"]:
+        lines.append(f"{summary['failed_cells']} cells can't run")
+    if summary["unestimated_cells"]:
+        lines.append(f"{summary['unestimated_cells']} cells have no recorded duration to estimate them from")
+    return "\n".join(lines)
@@ -1,9 +1,22 @@
 from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Dict, Union, Iterable
+from typing import Dict, Iterable, Tuple, Union
 from xml.dom import minidom
 from xml.etree import ElementTree
 
+# Suffix of the names of the test cases of a separate race detector pass
+RACE_SUFFIX = " [race]"
+# Printed by the testing package when the race detector found a data race while a test ran
+RACE_DETECTED = "race detected during execution of test"
+# Messages of the test cases whose result is changed by the analysis
+XFAILED_MESSAGE = "This test marked as 'xfailed' because it contains '@unittest.expectedFailure' mark -" \
+                  " Please remove this mark from the test"
+IGNORED_MESSAGE = "This test marked as 'skipped' because it appears in the YAML file as 'ignore' test"
+FLAKY_MESSAGE = "This test marked as 'skipped' because it appears in the YAML file as 'flaky' test"
+# Final outcome of a test case in the XML file after the analysis, by the tag and message of its result element
+_FINAL_OUTCOMES = {("failure", XFAILED_MESSAGE): "xfailed", ("skipped", IGNORED_MESSAGE): "ignored",
+                   ("skipped", FLAKY_MESSAGE): "flaky", "failure": "failed", "error": "error", "skipped": "skipped"}
+
 
 class ProcessJUnit:
 
@@ -11,10 +24,22 @@ class ProcessJUnit:
         self._xunit_file = xunit_file
         self._ignore_set = {key: set(value) if value else set() for key, value in ignore_set.items()}
         self._summary = {"tests": 0, "errors": 0, "failures": 0, "skipped": 0, "xpassed": 0, "xfailed": 0,
-                         "passed": 0, "ignored_in_analysis": 0, "flaky": 0}
+                         "passed": 0, "ignored_in_analysis": 0, "flaky": 0, "races": 0}
         self._summary_full_details = {}
+        # Set when the tests were narrowed down with a -run selection, which may not match any test of the run
+        self.empty_selection_allowed = False
 
 
+    @classmethod
+    def from_summary(cls, xunit_file: Path, summary: Dict[str, int]) -> "ProcessJUnit":
+        """
+        Create an already analyzed result (e.g. restored from the result cache) without parsing the XML file.
+        """
+        junit = cls(xunit_file, {})
+        # Prime the cached property, so the analysis of the (already post-processed) XML never runs
+        junit.__dict__["summary"] = dict(summary)
+        return junit
+
     @lru_cache(maxsize=None)
     def _analysis(self) -> None:
         """
@@ -25,8 +50,9 @@ class ProcessJUnit:
         tree = ElementTree.parse(self._xunit_file).find("testsuite")
         for element in tree.iter("testcase"):
             test_full_name = element.attrib['name']
-            is_ignore_test = test_full_name in self._ignore_set.get("ignore", [])
-            is_flaky_test = test_full_name in self._ignore_set.get("flaky", [])
+            test_name = test_full_name.removesuffix(RACE_SUFFIX)
+            is_ignore_test = test_name in self._ignore_set.get("ignore", [])
+            is_flaky_test = test_name in self._ignore_set.get("flaky", [])
             if len(element):
                 element_test_details = list(element.iter())[1]
                 category_type = element_test_details.tag
@@ -45,6 +71,9 @@ class ProcessJUnit:
                 elif is_flaky_test:
                     category_type = "flaky"
                 elif category_type == "error" or category_type == "failure":
+                    if RACE_DETECTED in (element_test_details.text or ""):
+                        self._summary_full_details.setdefault("races", set()).add(test_full_name)
+                        self._summary["races"] += 1
                     category_type += "s"
             else:
                 category_type = "passed"
@@ -70,12 +99,14 @@ class ProcessJUnit:
     def _merge_part_results(self, driver_module: str):
         """
         Merge the part files into one XML file.
+        The test cases of the race detector pass parts are added with the RACE_SUFFIX, next to the regular ones.
         """
         test_cases = {}
         time_taken = 0
         timestamp = ""
         part_files = sorted(self._xunit_file.parent.glob(f"{self._xunit_file.name}_part_*"))
-        for part in part_files:
+        race_part_files = sorted(self._xunit_file.parent.glob(f"{self._xunit_file.name}_race_part_*"))
+        for part in part_files + race_part_files:
             tree = ElementTree.parse(part)
             part_testsuites = tree.find(f"testsuite[@name='{driver_module}']")
             if part_testsuites is None:
@@ -87,6 +118,9 @@ class ProcessJUnit:
                 name = elem.attrib.get('name')
                 if not name:
                     continue
+                if part in race_part_files:
+                    name += RACE_SUFFIX
+                    elem.attrib['name'] = name
                 # skipping update of given test case if it already exists in the dict and contains error or failure
                 if test_cases.get(name) and [elem for elem in test_cases.get(name) if elem.tag in ('failure', 'error')]:
                     continue
@@ -102,7 +136,8 @@ class ProcessJUnit:
         tree.write(self._xunit_file, encoding='utf-8', xml_declaration=True)
 
     @lru_cache(maxsize=None)
-    def save_after_analysis(self, driver_version: str, protocol: int, gocql_driver_type: str, driver_module: str) -> None:
+    def save_after_analysis(self, driver_version: str, protocol: int, gocql_driver_type: str, driver_module: str,
+                            cell_label: str = "") -> None:
         """
         Create a new XML file with the correct run results after filtering the names of the tests marked as "skip" in
         the YAML file.
@@ -112,6 +147,7 @@ class ProcessJUnit:
         :param protocol: The cqlsh native protocol number
         :param gocql_driver_type: The driver type - can be "scylla" or "upstream"
         :param driver_module: The Go module name extracted from go.mod
+        :param cell_label: The non-default matrix dimensions of the run (Example: compressor-lz4), if any
         """
         self._merge_part_results(driver_module=driver_module)
         tree = ElementTree.parse(self._xunit_file).find(f"testsuite[@name='{driver_module}']")
@@ -119,6 +155,8 @@ class ProcessJUnit:
         _ = [tree.attrib.__setitem__(key, str(value)) for key, value in self.summary.items()]
         xunit_child = ElementTree.SubElement(new_tree, "testsuite", attrib=tree.attrib)
         new_test_prefix = f"{gocql_driver_type}_version_{driver_version}_v{protocol}_"
+        if cell_label:
+            new_test_prefix += f"{cell_label}_"
 
         for element in tree.iter("testcase"):
             test_full_name = element.attrib['name']
@@ -132,15 +170,14 @@ class ProcessJUnit:
                               " Please remove this mark from the test"
                     tag_name = "failure"
                 elif test_full_name in self.summary_full_details.get("xfailed", {}):
-                    message = "This test marked as 'xfailed' because it contains '@unittest.expectedFailure' mark -" \
-                              " Please remove this mark from the test"
+                    message = XFAILED_MESSAGE
                     tag_name = "failure"
                 elif test_full_name in self.summary_full_details.get("ignored_in_analysis", {}):
-                    message = "This test marked as 'skipped' because it appears in the YAML file as 'ignore' test"
+                    message = IGNORED_MESSAGE
                     tag_name = "skipped"
                     element_test_details.attrib["type"] = "xunit.fail"
                 elif test_full_name in self.summary_full_details.get("flaky", {}):
-                    message = "This test marked as 'skipped' because it appears in the YAML file as 'flaky' test"
+                    message = FLAKY_MESSAGE
                     tag_name = "skipped"
                     element_test_details.attrib["type"] = "xunit.fail"
                 else:
@@ -159,8 +196,26 @@ class ProcessJUnit:
                 ElementTree.tostring(element=new_tree, encoding="utf-8")).toprettyxml(
                 indent="  "))
 
+    @cached_property
+    def test_results(self) -> Dict[str, Tuple[str, float]]:
+        """
+        Final outcome ("passed", "failed", "error", "skipped", "ignored", "flaky" or "xfailed") and duration in seconds
+        of every test case, read from the XML file written by save_after_analysis (or restored from the result cache).
+        """
+        results = {}
+        for element in ElementTree.parse(self._xunit_file).iter("testcase"):
+            details = next((child for child in element if child.tag != "system-out"), None)
+            outcome = "passed"
+            if details is not None:
+                outcome = _FINAL_OUTCOMES.get((details.tag, details.attrib.get("message")),
+                                              _FINAL_OUTCOMES.get(details.tag, details.tag))
+            results[element.attrib["name"]] = (outcome, float(element.attrib.get("time") or 0))
+        return results
+
     @cached_property
     def is_failed(self) -> bool:
+        if not self.summary["tests"] and self.empty_selection_allowed:
+            return False
         return not (self.summary["tests"] and self.summary["tests"] ==
                     self.summary["passed"] + self.summary["skipped"] + self.summary["ignored_in_analysis"] +
                     self.summary["flaky"] + self.summary["xpassed"] + self.summary["xfailed"])
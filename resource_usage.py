@@ -0,0 +1,124 @@
+import logging
+import resource
+import threading
+from typing import Callable, Dict, Iterable, Optional, Set
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# Keys of the per-process counters that only grow during a process' lifetime
+_CUMULATIVE = ("cpu_seconds", "read_bytes", "write_bytes", "voluntary_context_switches", "involuntary_context_switches")
+
+
+def read_process_stats(pid: int) -> Optional[Dict[str, float]]:
+    """CPU time, RSS, I/O bytes and context switches of a process, None if it's gone."""
+    try:
+        process = psutil.Process(pid)
+        with process.oneshot():
+            cpu_times = process.cpu_times()
+            context_switches = process.num_ctx_switches()
+            stats = {
+                "cpu_seconds": cpu_times.user + cpu_times.system,
+                "rss_bytes": process.memory_info().rss,
+                "voluntary_context_switches": context_switches.voluntary,
+                "involuntary_context_switches": context_switches.involuntary,
+                "read_bytes": 0,
+                "write_bytes": 0,
+            }
+            try:
+                io_counters = process.io_counters()
+                stats["read_bytes"] = io_counters.read_bytes
+                stats["write_bytes"] = io_counters.write_bytes
+            except psutil.AccessDenied:
+                # The I/O counters aren't readable for processes of other users
+                pass
+    except (psutil.NoSuchProcess, psutil.ZombieProcess, psutil.AccessDenied):
+        return None
+    return stats
+
+
+def pids_with_argument(fragment: str) -> Set[int]:
+    """Pids of the processes whose command line contains *fragment*, e.g. the directory of a ccm cluster."""
+    return {
+        process.pid for process in psutil.process_iter(["cmdline"])
+        if any(fragment in argument for argument in process.info["cmdline"] or ())
+    }
+
+
+def process_tree(root_pids: Iterable[int]) -> Set[int]:
+    """The given processes and all their descendants."""
+    tree = set()
+    for pid in root_pids:
+        tree.add(pid)
+        try:
+            tree.update(child.pid for child in psutil.Process(pid).children(recursive=True))
+        except psutil.NoSuchProcess:
+            continue
+    return tree
+
+
+def rusage_summary(usage: resource.struct_rusage) -> Dict[str, float]:
+    return {
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+        # ru_maxrss is in kilobytes on Linux, the block counters in 512 byte units
+        "peak_rss_bytes": usage.ru_maxrss * 1024,
+        "read_bytes": usage.ru_inblock * 512,
+        "write_bytes": usage.ru_oublock * 512,
+        "voluntary_context_switches": usage.ru_nvcsw,
+        "involuntary_context_switches": usage.ru_nivcsw,
+    }
+
+
+class ProcessTreeSampler(threading.Thread):
+    """Samples the process trees returned by *root_pids* at a fixed interval.
+
+    Cumulative counters are taken from the last sample of every process seen, so processes exiting between samples
+    (e.g. nodes restarted by the ccm tests) keep what they used up to their last sample.  The peak RSS is the
+    largest sum of the resident sets of the tree seen in one sample.
+    """
+
+    def __init__(self, root_pids: Callable[[], Iterable[int]], interval: float) -> None:
+        super().__init__(name="resource-sampler", daemon=True)
+        self._root_pids = root_pids
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._last: Dict[int, Dict[str, float]] = {}
+        self._peak_rss_bytes = 0
+
+    def _sample(self) -> None:
+        try:
+            tree = process_tree(self._root_pids())
+        except (OSError, psutil.Error):
+            logger.exception("Failed to list the sampled processes")
+            return
+        rss = 0
+        for pid in tree:
+            stats = read_process_stats(pid)
+            if stats is None:
+                continue
+            self._last[pid] = stats
+            rss += stats["rss_bytes"]
+        self._peak_rss_bytes = max(self._peak_rss_bytes, rss)
+
+    def start(self) -> None:
+        self._sample()
+        super().start()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            self._sample()
+
+    def stop(self) -> Dict[str, float]:
+        """Stop sampling after a final sample and return the totals."""
+        self._stop_event.set()
+        self.join()
+        self._sample()
+        return self.aggregates()
+
+    def aggregates(self) -> Dict[str, float]:
+        result = {name: sum(stats[name] for stats in self._last.values()) for name in _CUMULATIVE}
+        result["cpu_seconds"] = round(result["cpu_seconds"], 3)
+        result["peak_rss_bytes"] = self._peak_rss_bytes
+        result["processes"] = len(self._last)
+        return result
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# ~/.cache is a tmpfs in the docker runs, ~/.ccm is mounted from the host.
+CACHE_DIR = Path(os.environ.get("GOCQL_MATRIX_CACHE_DIR", Path.home() / ".ccm" / "matrix-result-cache"))
+MATRIX_ROOT = Path(os.path.dirname(__file__))
+
+_SUMMARY_FILE = "summary.json"
+
+
+def hash_files(paths: Iterable[Path]) -> str:
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def matrix_code_hash() -> str:
+    """Hash of the matrix code that affects how a cell is run and post-processed, including the load test harness."""
+    return hash_files([*MATRIX_ROOT.glob("*.py"), *MATRIX_ROOT.glob("load/*.go")])
+
+
+class ResultCache:
+    """Stores the final JUnit XML, summary and metadata of matrix cells, keyed by a hash of all their inputs.
+
+    Entries expire after *ttl_seconds* and the least recently used entries are evicted above *max_entries*.
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR, ttl_seconds: int = 7 * 24 * 3600, max_entries: int = 200) -> None:
+        self._directory = Path(directory)
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+
+    @staticmethod
+    def key(**inputs) -> str:
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def _is_expired(self, entry: Path) -> bool:
+        return time.time() - (entry / _SUMMARY_FILE).stat().st_mtime > self._ttl_seconds
+
+    def load(self, key: str) -> Optional[Path]:
+        """Return the entry directory of a valid cached result, or None."""
+        entry = self._directory / key
+        if not (entry / _SUMMARY_FILE).is_file():
+            return None
+        if self._is_expired(entry):
+            logging.info("Cached result '%s' is expired", key)
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        # Refresh the access time that the LRU eviction is based on
+        os.utime(entry)
+        return entry
+
+    def peek(self, key: str) -> Optional[Path]:
+        """Like load(), without refreshing or expiring the entry, e.g. to plan a run."""
+        entry = self._directory / key
+        if not (entry / _SUMMARY_FILE).is_file() or self._is_expired(entry):
+            return None
+        return entry
+
+    def entries(self) -> List[Path]:
+        """The entry directories of the valid cached results."""
+        if not self._directory.is_dir():
+            return []
+        return [entry for entry in self._directory.iterdir()
+                if not entry.name.startswith(".") and (entry / _SUMMARY_FILE).is_file() and not self._is_expired(entry)]
+
+    def summary(self, entry: Path) -> Dict[str, int]:
+        return json.loads((entry / _SUMMARY_FILE).read_text())
+
+    def store(self, key: str, summary: Dict[str, int], files: Iterable[Path]) -> Optional[Path]:
+        """Cache a result; caching is best-effort, a failure (e.g. a concurrent store of the same key) is only logged."""
+        tmp_entry = self._directory / f".{key}.{os.getpid()}.tmp"
+        old_entry = self._directory / f".{key}.{os.getpid()}.old"
+        entry = self._directory / key
+        try:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            tmp_entry.mkdir()
+            for file_path in files:
+                shutil.copy2(file_path, tmp_entry / file_path.name)
+            (tmp_entry / _SUMMARY_FILE).write_text(json.dumps(summary))
+            # Renamed out of the way rather than removed in place, so a concurrent store can't refill it meanwhile
+            try:
+                os.replace(entry, old_entry)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_entry, entry)
+            self.prune()
+        except OSError:
+            logging.warning("Failed to cache the result '%s'", key, exc_info=True)
+            return None
+        finally:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            shutil.rmtree(old_entry, ignore_errors=True)
+        return entry
+
+    def prune(self) -> None:
+        entries = []
+        for entry in self._directory.iterdir():
+            if entry.name.startswith(".") or not (entry / _SUMMARY_FILE).is_file():
+                continue
+            if self._is_expired(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entries.append(entry)
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in entries[self._max_entries:]:
+            logging.info("Evicting cached result '%s'", entry.name)
+            shutil.rmtree(entry, ignore_errors=True)
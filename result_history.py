@@ -0,0 +1,222 @@
+"""History of the per-test results of the matrix runs, and their comparison across runs and matrix cells.
+
+Every run is stored as one gzipped JSON file of columns: the run's cells and test names are listed once, and every
+test result is a row of the integer columns cell, test, outcome and milliseconds.  Loading a run is a single
+json.loads, whatever the number of cells, so the comparison reads the previous runs quickly.
+
+A run is compared against the previous runs:
+
+* newly failing tests failed or errored in a cell, while they didn't fail in the last previous run of that cell
+* fixed tests passed in a cell, while they failed in the last previous run of that cell
+* slowed-down tests passed in a cell, taking much longer than the median of their passing durations in the cell
+
+The matrix diff lists the outcomes of every test failing in some cell of the run across all its cells, so a test failing
+only in one driver version, protocol or Scylla version stands out.
+"""
+import gzip
+import json
+import logging
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from processjunit import ProcessJUnit
+
+# ~/.cache is a tmpfs in the docker runs, ~/.ccm is mounted from the host.
+HISTORY_DIR = Path(os.environ.get("GOCQL_MATRIX_HISTORY_DIR", Path.home() / ".ccm" / "matrix-history"))
+
+_FORMAT = 1
+OUTCOMES = ("passed", "failed", "error", "skipped", "ignored", "flaky", "xfailed")
+FAILING = frozenset(("failed", "error"))
+# Previous runs a run is compared against
+COMPARE_RUNS = 5
+# A passing test slowed down when it took this many times its median duration, and at least SLOWDOWN_MIN_SECONDS more
+SLOWDOWN_RATIO = 1.5
+SLOWDOWN_MIN_SECONDS = 1.0
+
+# Matrix cell: (driver version, protocol, driver options label, Scylla version)
+Cell = Tuple[str, str, str, str]
+
+
+@dataclass
+class RunHistory:
+    run_id: str
+    cells: List[Cell] = field(default_factory=list)
+    tests: List[str] = field(default_factory=list)
+    # One row per test result: indexes into cells, tests and OUTCOMES, and the duration
+    cell: List[int] = field(default_factory=list)
+    test: List[int] = field(default_factory=list)
+    outcome: List[int] = field(default_factory=list)
+    milliseconds: List[int] = field(default_factory=list)
+
+    @classmethod
+    def from_junit_files(cls, run_id: str, junit_files: Dict[Cell, Path]) -> "RunHistory":
+        """The final test results of the cells, from their post-processed JUnit XML files."""
+        run = cls(run_id)
+        test_indexes: Dict[str, int] = {}
+        for cell, junit_file in sorted(junit_files.items()):
+            try:
+                test_results = ProcessJUnit(Path(junit_file), {}).test_results
+            except (OSError, SyntaxError):
+                # ParseError is a SyntaxError; a cell failed before writing its report has no test results
+                logging.warning("No test results of the cell %s in '%s'", cell, junit_file)
+                continue
+            run.cells.append(tuple(cell))
+            for name, (outcome, seconds) in sorted(test_results.items()):
+                if name not in test_indexes:
+                    test_indexes[name] = len(run.tests)
+                    run.tests.append(name)
+                run.cell.append(len(run.cells) - 1)
+                run.test.append(test_indexes[name])
+                run.outcome.append(OUTCOMES.index(outcome) if outcome in OUTCOMES else OUTCOMES.index("error"))
+                run.milliseconds.append(int(round(seconds * 1000)))
+        return run
+
+    def results(self) -> Dict[Tuple[Cell, str], Tuple[str, float]]:
+        """Outcome and duration in seconds of every test result, by cell and test name."""
+        return {
+            (self.cells[cell], self.tests[test]): (OUTCOMES[outcome], milliseconds / 1000)
+            for cell, test, outcome, milliseconds in zip(self.cell, self.test, self.outcome, self.milliseconds)
+        }
+
+    def save(self, directory: Path = HISTORY_DIR) -> Path:
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.run_id}.json.gz"
+        data = {"format": _FORMAT, "run_id": self.run_id, "cells": self.cells, "tests": self.tests,
+                "outcomes": OUTCOMES, "columns": {"cell": self.cell, "test": self.test, "outcome": self.outcome,
+                                                  "milliseconds": self.milliseconds}}
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as file:
+            json.dump(data, file, separators=(",", ":"))
+        tmp_path.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> "RunHistory":
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("format") != _FORMAT:
+            raise ValueError(f"unsupported history format {data.get('format')} of '{path}'")
+        # The outcome indexes are stored against the outcome names of the run that wrote them
+        outcome_map = [OUTCOMES.index(name) if name in OUTCOMES else OUTCOMES.index("error")
+                       for name in data["outcomes"]]
+        columns = data["columns"]
+        return cls(run_id=data["run_id"], cells=[tuple(cell) for cell in data["cells"]], tests=data["tests"],
+                   cell=columns["cell"], test=columns["test"], outcome=[outcome_map[index] for index in columns["outcome"]],
+                   milliseconds=columns["milliseconds"])
+
+
+def new_run_id() -> str:
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + f"-{os.getpid()}"
+
+
+def history_files(directory: Path = HISTORY_DIR) -> List[Path]:
+    """The stored runs, oldest first (the run ids start with their UTC start time)."""
+    return sorted(directory.glob("*.json.gz")) if directory.is_dir() else []
+
+
+def load_runs(paths: Iterable[Path]) -> List[RunHistory]:
+    runs = []
+    for path in paths:
+        try:
+            runs.append(RunHistory.load(path))
+        except (OSError, ValueError, KeyError):
+            logging.warning("Skipping the unreadable result history '%s'", path, exc_info=True)
+    return runs
+
+
+def prune(directory: Path = HISTORY_DIR, max_runs: int = 50) -> None:
+    """Remove the oldest stored runs above *max_runs*."""
+    for path in history_files(directory)[:-max_runs or None]:
+        path.unlink(missing_ok=True)
+
+
+@dataclass
+class ResultChange:
+    cell: Cell
+    test: str
+    outcome: str
+    seconds: float
+    baseline_outcome: str
+    baseline_seconds: float
+    # Id of the previous run the test is compared against
+    baseline_run: str
+
+
+@dataclass
+class HistoryComparison:
+    run_id: str
+    baseline_runs: List[str] = field(default_factory=list)
+    newly_failing: List[ResultChange] = field(default_factory=list)
+    fixed: List[ResultChange] = field(default_factory=list)
+    slowed_down: List[ResultChange] = field(default_factory=list)
+    # Cells of the run, and the outcomes (None: not run) across them of every test failing in some cell
+    cells: List[Cell] = field(default_factory=list)
+    matrix: Dict[str, List[Optional[str]]] = field(default_factory=dict)
+
+
+def matrix_diff(run: RunHistory) -> Dict[str, List[Optional[str]]]:
+    """Outcomes across all the cells of the run of every test failing in some cell."""
+    failing_tests = {run.test[row] for row, outcome in enumerate(run.outcome) if OUTCOMES[outcome] in FAILING}
+    matrix = {run.tests[test]: [None] * len(run.cells) for test in sorted(failing_tests)}
+    for cell, test, outcome in zip(run.cell, run.test, run.outcome):
+        if test in failing_tests:
+            matrix[run.tests[test]][cell] = OUTCOMES[outcome]
+    return dict(sorted(matrix.items()))
+
+
+def compare(run: RunHistory, previous_runs: List[RunHistory]) -> HistoryComparison:
+    """Compare a run against the previous runs, oldest first."""
+    comparison = HistoryComparison(run_id=run.run_id, baseline_runs=[previous.run_id for previous in previous_runs],
+                                   cells=list(run.cells), matrix=matrix_diff(run))
+    last: Dict[Tuple[Cell, str], Tuple[str, float, str]] = {}
+    passing_seconds: Dict[Tuple[Cell, str], List[float]] = {}
+    for previous in previous_runs:
+        for key, (outcome, seconds) in previous.results().items():
+            last[key] = (outcome, seconds, previous.run_id)
+            if outcome == "passed":
+                passing_seconds.setdefault(key, []).append(seconds)
+
+    for (cell, test), (outcome, seconds) in sorted(run.results().items()):
+        if (cell, test) not in last:
+            continue
+        baseline_outcome, baseline_seconds, baseline_run = last[(cell, test)]
+        if outcome in FAILING and baseline_outcome not in FAILING:
+            comparison.newly_failing.append(ResultChange(cell, test, outcome, seconds, baseline_outcome,
+                                                       baseline_seconds, baseline_run))
+        elif outcome == "passed" and baseline_outcome in FAILING:
+            comparison.fixed.append(ResultChange(cell, test, outcome, seconds, baseline_outcome, baseline_seconds,
+                                               baseline_run))
+        elif outcome == "passed" and (cell, test) in passing_seconds:
+            median = statistics.median(passing_seconds[(cell, test)])
+            if seconds >= median * SLOWDOWN_RATIO and seconds - median >= SLOWDOWN_MIN_SECONDS:
+                comparison.slowed_down.append(ResultChange(cell, test, outcome, seconds, "passed", median, baseline_run))
+    comparison.slowed_down.sort(key=lambda change: change.seconds - change.baseline_seconds, reverse=True)
+    return comparison
+
+
+def cell_name(cell: Cell) -> str:
+    driver_version, protocol, label, scylla_version = cell
+    return " ".join(part for part in (driver_version, f"v{protocol}", label, scylla_version) if part)
+
+
+def format_history(comparison: HistoryComparison) -> str:
+    lines = [f"Compared against {len(comparison.baseline_runs)} previous runs: {len(comparison.newly_failing)} newly "
+             f"failing, {len(comparison.fixed)} fixed, {len(comparison.slowed_down)} slowed-down tests"]
+    for title, changes in (("Newly failing", comparison.newly_failing), ("Fixed", comparison.fixed)):
+        for change in changes:
+            lines.append(f"{title}: {change.test} in {cell_name(change.cell)} ({change.baseline_outcome} in "
+                         f"{change.baseline_run}, now {change.outcome})")
+    for change in comparison.slowed_down:
+        lines.append(f"Slowed down: {change.test} in {cell_name(change.cell)} "
+                     f"({change.baseline_seconds:.1f}s -> {change.seconds:.1f}s)")
+    if comparison.matrix:
+        lines.append("")
+        lines.append("Failing tests across the cells: " + "; ".join(
+            f"{index}: {cell_name(cell)}" for index, cell in enumerate(comparison.cells, start=1)))
+        for test, outcomes in comparison.matrix.items():
+            lines.append(f"{test:<60} " + " ".join(f"{outcome or '-':<7}" for outcome in outcomes))
+    return "\n".join(lines)
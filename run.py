@@ -1,23 +1,46 @@
+import hashlib
 import logging
 import os
 import re
+import shlex
+import shutil
 import subprocess
+import sys
 import json
 import time
+from dataclasses import asdict
 from functools import cached_property
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 import yaml
 from packaging.version import Version, InvalidVersion
 
-from cluster import TestCluster
-from configurations import test_config_map, TestConfiguration
+import log_capture
+from cluster import open_cluster
+from cluster_watchdog import ClusterWatchdog
+from commands import CommandTimeout, run_command, summarize as summarize_commands, telemetry as command_telemetry
+from configurations import test_config_map, DriverOptions, LoadConfiguration, RacePolicy, TestConfiguration
+from gobench import parse_benchmark_output
 from processjunit import ProcessJUnit
+from result_cache import ResultCache, hash_files, matrix_code_hash
+
+LOG_CAPTURE_SCRIPT = Path(log_capture.__file__).resolve()
+# Timeouts of the external commands, their whole process group is killed after them
+_GIT_TIMEOUT_SECONDS = 10 * 60
+# Above the -timeout of every tag, plus building the tests
+_GO_TEST_TIMEOUT_SECONDS = 2 * 60 * 60
+# Driver checkouts prepared by this process: directory -> (tag, hash of the version folder, hash of the worktree)
+_prepared_drivers: Dict[Path, Tuple[str, str, str]] = {}
 
 
 class Run:
-    def __init__(self, gocql_driver_git, driver_type, tag, tests, scylla_version, protocol):
+    def __init__(self, gocql_driver_git, driver_type, tag, tests, scylla_version, protocol, cluster_backend="ccm",
+                 result_cache: Optional[ResultCache] = None, force: bool = False,
+                 load_configuration: Optional[LoadConfiguration] = None,
+                 driver_options: DriverOptions = DriverOptions(), metrics_interval: float = 0,
+                 resource_interval: float = 0, watchdog_interval: float = 0, race_policy: RacePolicy = RacePolicy(),
+                 label_scylla_version: bool = False, run_selection: str = ""):
         self.driver_version = tag
         self._full_driver_version = tag
         self._gocql_driver_git = Path(gocql_driver_git)
@@ -26,6 +49,21 @@ class Run:
         self._driver_type = driver_type
         self._cversion = "3.11.4"
         self._test_tags = tests
+        self._cluster_backend = cluster_backend
+        self._result_cache = result_cache
+        self._force = force
+        self._load_configuration = load_configuration
+        self._driver_options = driver_options
+        self.durations: Dict[str, float] = {}
+        self._metrics_interval = metrics_interval
+        self._resource_interval = resource_interval
+        self._watchdog_interval = watchdog_interval
+        self._race_policy = race_policy
+        self._label_scylla_version = label_scylla_version
+        self._run_selection = run_selection
+        self.infra_failures: Dict[str, Dict] = {}
+        self.benchmark_results: Optional[Dict[str, Dict[str, List[float]]]] = None
+        self.load_results: Optional[Dict] = None
 
     @cached_property
     def version_folder(self) -> Path:
@@ -56,11 +94,38 @@ class Run:
     def xunit_dir(self) -> Path:
         return Path(os.path.dirname(__file__)) / "xunit" / self.driver_version
     @property
+    def cell_label(self) -> str:
+        """Distinguishes the cells of the same driver version and protocol, empty for the default dimensions"""
+        scylla_label = ""
+        if self._label_scylla_version:
+            scylla_label = "scylla-" + re.sub(r"[^A-Za-z0-9.-]", "-", self._scylla_version)
+        return ".".join(label for label in (self._driver_options.label, scylla_label) if label)
+    @property
+    def _cell_suffix(self) -> str:
+        return f".{self.cell_label}" if self.cell_label else ""
+    @property
     def xunit_file_name(self) -> str:
-        return f'xunit.{self._driver_type}.v{self._protocol}.{self.driver_version}.xml'
+        return f'xunit.{self._driver_type}.v{self._protocol}.{self.driver_version}{self._cell_suffix}.xml'
     @property
     def metadata_file_name(self) -> str:
-        return f'metadata_{self._driver_type}_v{self._protocol}_{self.driver_version}.json'
+        return f'metadata_{self._driver_type}_v{self._protocol}_{self.driver_version}{self._cell_suffix.replace(".", "_")}.json'
+    @property
+    def benchmark_file_name(self) -> str:
+        return f'bench.{self._driver_type}.v{self._protocol}.{self.driver_version}{self._cell_suffix}.json'
+    @property
+    def load_file_name(self) -> str:
+        return f'load.{self._driver_type}.v{self._protocol}.{self.driver_version}{self._cell_suffix}.json'
+
+    def log_capture_dir(self, test: str) -> Path:
+        return self.xunit_dir / f'logs.{self._driver_type}.v{self._protocol}.{self.driver_version}{self._cell_suffix}.{test}'
+
+    def clear_log_captures(self) -> None:
+        """Remove the log captures of a previous run of the cell, whose index and infra failure would be merged in"""
+        for name, _, _ in self._test_passes():
+            shutil.rmtree(self.log_capture_dir(name), ignore_errors=True)
+
+    def metrics_file_name(self, test: str) -> str:
+        return f'metrics.{self._driver_type}.v{self._protocol}.{self.driver_version}{self._cell_suffix}.{test}.json.gz'
 
     @cached_property
     def ignore_tests(self) -> Dict[str, List[str]]:
@@ -101,12 +166,9 @@ class Run:
         return self._scylla_version.split("~", maxsplit=1)[0].removeprefix("release:")
 
     def _run_command_in_shell(self, cmd: str):
-        logging.debug("Execute the cmd '%s'", cmd)
-        with subprocess.Popen(cmd, shell=True, executable="/bin/bash", env=self.environment,
-                              cwd=self._gocql_driver_git, stderr=subprocess.PIPE) as proc:
-            stderr = proc.communicate()
-            status_code = proc.returncode
-        assert status_code == 0, stderr
+        result = run_command(cmd, env=self.environment, cwd=self._gocql_driver_git, capture_stderr=True,
+                             timeout=_GIT_TIMEOUT_SECONDS)
+        assert result.returncode == 0, result.stderr
 
     def _apply_patch_files(self) -> bool:
         for file_path in self.version_folder.iterdir():
@@ -140,6 +202,29 @@ class Run:
             logging.error("Failed to branch for version '%s', with: '%s'", self.driver_version, str(exc))
             return False
 
+    def _worktree_hash(self) -> str:
+        # The test clusters live in the driver's ccm directory
+        state = run_command("git rev-parse HEAD && git diff HEAD --binary && "
+                            "git ls-files --others --exclude-standard -- . ':(exclude)ccm'",
+                            cwd=self._gocql_driver_git, capture_stdout=True, check=True,
+                            timeout=_GIT_TIMEOUT_SECONDS).stdout
+        return hashlib.sha256(state).hexdigest()
+
+    def _prepare_driver(self) -> bool:
+        """
+        Check out the driver tag and apply its patches, unless the checkout is still as the previous cell of the same
+        tag left it (e.g. the cells of other protocols and Scylla versions).
+        """
+        prepared_as = (self._full_driver_version, hash_files(path for path in self.version_folder.iterdir() if path.is_file()))
+        prepared = _prepared_drivers.get(self._gocql_driver_git)
+        if prepared and prepared[:2] == prepared_as and prepared[2] == self._worktree_hash():
+            logging.info("Driver version '%s' is already checked out and patched", self.driver_version)
+            return True
+        if not (self._checkout_branch() and self._apply_patch_files()):
+            return False
+        _prepared_drivers[self._gocql_driver_git] = (*prepared_as, self._worktree_hash())
+        return True
+
     def create_metadata_for_failure(self, reason: str) -> None:
         metadata_file = self.xunit_dir / self.metadata_file_name
         if not self.xunit_dir.exists():
@@ -151,22 +236,144 @@ class Run:
         }
         metadata_file.write_text(json.dumps(metadata))
 
+    def _test_passes(self) -> List[Tuple[str, str, bool]]:
+        """(name, tag, race) of the go test runs of the cell; a separate race pass of a tag is named '<tag>-race'"""
+        passes = []
+        for test in self._test_tags:
+            race = test_config_map[test].race
+            passes.append((test, test, race and not self._race_policy.separate_pass))
+            if race and self._race_policy.race_pass(self._protocol):
+                passes.append((f"{test}-race", test, True))
+        return passes
+
+    def _result_cache_key(self) -> Optional[str]:
+        """Hash of everything the cell's result depends on, or None if the driver tag can't be resolved."""
+        try:
+            driver_commit = run_command(
+                ["git", "rev-parse", f"tags/{self._full_driver_version}^{{commit}}"], cwd=self._gocql_driver_git,
+                capture_stdout=True, capture_stderr=True, text=True, check=True, timeout=_GIT_TIMEOUT_SECONDS).stdout.strip()
+        except subprocess.CalledProcessError:
+            logging.warning("Cannot resolve the commit of '%s', the result cache is not used", self._full_driver_version)
+            return None
+        return ResultCache.key(
+            driver_type=self._driver_type,
+            driver_commit=driver_commit,
+            version_folder=hash_files(path for path in self.version_folder.iterdir() if path.is_file()),
+            scylla_version=self._scylla_version,
+            protocol=self._protocol,
+            tests=self._test_tags,
+            cluster_backend=self._cluster_backend,
+            load=asdict(self._load_configuration) if self._load_configuration else None,
+            driver_options=asdict(self._driver_options),
+            # The names of the stored files, and the classnames in the JUnit file, depend on it
+            cell_label=self.cell_label,
+            test_passes=self._test_passes(),
+            race_run=self._race_policy.run,
+            run_selection=self._run_selection,
+            matrix_code=matrix_code_hash(),
+        )
+
+    def plan(self) -> Dict:
+        """What running the cell involves, without running anything (see planner.py)."""
+        cache_key = self._result_cache_key() if self._result_cache and not self._force else None
+        return {
+            "name": self.xunit_file_name.replace(".xml", ""),
+            "version_folder": self.version_folder,
+            "ignored": {kind: len(tests or ()) for kind, tests in self.ignore_tests.items()},
+            "test_passes": [name for name, _, _ in self._test_passes()],
+            "result_cached": bool(cache_key and self._result_cache.peek(cache_key)),
+        }
+
+    def _restore_cached_result(self, entry: Path, cache_key: str) -> ProcessJUnit:
+        logging.info("Reusing the cached result '%s' for version '%s' and protocol v%d",
+                     cache_key, self.driver_version, self._protocol)
+        shutil.copy2(entry / self.xunit_file_name, self.xunit_file)
+        if (entry / self.benchmark_file_name).is_file():
+            shutil.copy2(entry / self.benchmark_file_name, self.xunit_dir / self.benchmark_file_name)
+            self.benchmark_results = json.loads((entry / self.benchmark_file_name).read_text())
+        metadata = json.loads((entry / self.metadata_file_name).read_text())
+        if (entry / self.load_file_name).is_file():
+            shutil.copy2(entry / self.load_file_name, self.xunit_dir / self.load_file_name)
+            self.load_results = metadata.get("load")
+        metadata["result_cache_key"] = cache_key
+        self.durations = metadata.get("durations", {})
+        (self.xunit_dir / self.metadata_file_name).write_text(json.dumps(metadata))
+        junit = ProcessJUnit.from_summary(self.xunit_file, self._result_cache.summary(entry))
+        # Only results which didn't fail are cached
+        junit.empty_selection_allowed = bool(self._run_selection)
+        return junit
+
+    def _save_benchmark_results(self, benchmark_outputs: List[Path]) -> Dict[str, Dict[str, List[float]]]:
+        results = {}
+        for output in benchmark_outputs:
+            for name, samples in parse_benchmark_output(output.read_text(errors="replace")).items():
+                for unit, values in samples.items():
+                    results.setdefault(name, {}).setdefault(unit, []).extend(values)
+        logging.info("Parsed %d benchmarks for version '%s' and protocol v%d",
+                     len(results), self.driver_version, self._protocol)
+        (self.xunit_dir / self.benchmark_file_name).write_text(json.dumps(results, indent=2))
+        return results
+
+    def _run_load_test(self, driver_module: str) -> Dict:
+        """
+        Drive the sustained workload of load/main.go through the checked-out driver against a fresh cluster.
+
+        :return: Ops/s, error counts and latency percentiles, the full histogram is kept in the load result file.
+        """
+        (self.xunit_dir / self.load_file_name).unlink(missing_ok=True)
+        load_dir = self._gocql_driver_git / "matrix_load"
+        load_dir.mkdir(exist_ok=True)
+        source = (Path(os.path.dirname(__file__)) / "load" / "main.go").read_text()
+        (load_dir / "main.go").write_text(source.replace('"github.com/gocql/gocql"', f'"{driver_module}"'))
+        try:
+            with open_cluster(self._gocql_driver_git, self._scylla_version, configuration={},
+                              backend=self._cluster_backend) as cluster:
+                cluster.start()
+                load_cmd = (f"go run ./{load_dir.name} -hosts={cluster.ip_addresses} -proto={self._protocol} "
+                            f"{self._load_configuration.command_args}")
+                output = run_command(load_cmd, env=self.environment, cwd=self._gocql_driver_git, capture_stdout=True,
+                                     text=True, check=True,
+                                     timeout=self._load_configuration.duration_seconds + _GO_TEST_TIMEOUT_SECONDS).stdout
+        finally:
+            shutil.rmtree(load_dir, ignore_errors=True)
+        result = json.loads(output.strip().splitlines()[-1])
+        (self.xunit_dir / self.load_file_name).write_text(json.dumps(result))
+        summary = {key: value for key, value in result.items() if key != "histogram_ns"}
+        logging.info("Load test results for version '%s' and protocol v%d: %s",
+                     self.driver_version, self._protocol, summary)
+        return summary
+
     def run(self) -> ProcessJUnit:
+        self.clear_log_captures()
+        cache_key = self._result_cache_key() if self._result_cache else None
+        if cache_key and not self._force:
+            cached_entry = self._result_cache.load(cache_key)
+            if cached_entry:
+                return self._restore_cached_result(cached_entry, cache_key)
+
+        commands_mark = command_telemetry.mark()
         metadata_file = self.xunit_dir / self.metadata_file_name
         metadata = {
             "driver_name": self.xunit_file_name.replace(".xml", ""),
             "driver_type": "gocql",
             "junit_result": f"./{self.xunit_file.name}",
         }
+        if self._run_selection:
+            metadata["run_selection"] = self._run_selection
         junit = ProcessJUnit(self.xunit_file, self.ignore_tests)
         logging.info("Changing the current working directory to the '%s' path", self._gocql_driver_git)
         os.chdir(self._gocql_driver_git)
-        if self._checkout_branch() and self._apply_patch_files():
+        timed_out = False
+        if self._prepare_driver():
             driver_module = self._get_driver_module()
-            for idx, test in enumerate(self._test_tags):
+            for idx, (name, test, race) in enumerate(self._test_passes()):
                 test_config: TestConfiguration = test_config_map[test]
+                race_pass = name != test
                 skip_tests = f'-skip "{"|".join(self.ignore_tests["skip"]) if self.ignore_tests.get("skip") else ""}"'
-                with TestCluster(self._gocql_driver_git, self._scylla_version, configuration=test_config.cluster_configuration) as cluster:
+                with open_cluster(self._gocql_driver_git, self._scylla_version, configuration=test_config.cluster_configuration,
+                                  backend=self._cluster_backend, metrics_interval=self._metrics_interval,
+                                  metrics_file=self.xunit_dir / self.metrics_file_name(name),
+                                  resource_interval=self._resource_interval) as cluster:
                     cluster_params = cluster.start()
                     if test_config.startup_delay_seconds:
                         logging.info(
@@ -190,18 +397,82 @@ class Run:
                         current_path = self.environment.get('PATH', os.environ.get('PATH', ''))
                         if local_bin not in current_path.split(os.pathsep):
                             self.environment['PATH'] = local_bin + os.pathsep + current_path
-                    logging.info("Run tests for tag '%s'", test)
+                    logging.info("Run tests for tag '%s'%s", test, " with the race detector" if race else "")
                     cversion = self._gocql_cversion()
-                    args = f"-gocql.timeout=60s -proto={self._protocol} -autowait=2000ms -compressor=snappy -gocql.cversion={cversion}"
+                    args = f"{self._driver_options.test_args} -proto={self._protocol} -gocql.cversion={cversion}"
                     if self._driver_type == 'scylla' and Version(self._full_driver_version.lstrip('v')) >= Version('1.16.1'):
                         args += " -distribution=scylla"
-                    go_test_cmd = f'go test -v {test_config.test_command_args} {cluster_params} {skip_tests} {args} ./...  2>&1 | go-junit-report -iocopy -out {self.xunit_file}_part_{idx}'
-                    logging.info("Running the command '%s'", go_test_cmd)
-                    subprocess.call(f"{go_test_cmd}", shell=True, executable="/bin/bash",
-                                    env=self.environment, cwd=self._gocql_driver_git)
+                    if race:
+                        args += " -race"
+                    run_selection = self._race_policy.run if race_pass and self._race_policy.run else self._run_selection
+                    # Tags selecting their own tests (auth, bench) aren't narrowed down
+                    if run_selection and "-run" not in test_config.test_command_args:
+                        args += f" -run {shlex.quote(run_selection)}"
+                    tee_output = f"| tee {self.xunit_file}_bench_{idx}.txt " if test_config.benchmark else ""
+                    log_capture_dir = self.log_capture_dir(name)
+                    stamp_output = f"| {sys.executable} {LOG_CAPTURE_SCRIPT} stamp {log_capture_dir} "
+                    go_test_cmd = f'go test -v {test_config.test_command_args} {cluster_params} {skip_tests} {args} ./...  2>&1 {tee_output}{stamp_output}| go-junit-report -iocopy -out {self.xunit_file}_{"race_" if race_pass else ""}part_{idx}'
+                    watchdog = None
+                    # The ccm-tagged tests stop and restart the nodes themselves
+                    if self._watchdog_interval and test != 'ccm':
+                        watchdog = ClusterWatchdog(cluster, self._watchdog_interval,
+                                                   diagnostics_file=log_capture_dir / "infra-failure.json")
+                        watchdog.start()
+                    started = time.monotonic()
+                    try:
+                        go_test_usage = run_command(go_test_cmd, env=self.environment, cwd=self._gocql_driver_git,
+                                                    timeout=_GO_TEST_TIMEOUT_SECONDS,
+                                                    on_start=watchdog.watch if watchdog else None).record.usage
+                    except CommandTimeout:
+                        # go-junit-report was killed too, the tag's report is missing and counted as a failure
+                        logging.exception("Tests for tag '%s' timed out", name)
+                        go_test_usage = {}
+                        timed_out = True
+                    if watchdog and watchdog.stop():
+                        logging.error("Tests for tag '%s' were aborted because of an infrastructure failure: %s",
+                                      name, watchdog.failure["reason"])
+                        self.infra_failures[name] = watchdog.failure
+                        metadata["infra_failures"] = self.infra_failures
+                    self.durations[name] = round(time.monotonic() - started, 3)
+                    logging.info("Tests for tag '%s' took %.1f seconds", name, self.durations[name])
+                    cluster.stop_samplers()
+                    try:
+                        cluster.capture_node_logs(log_capture_dir)
+                        metadata.setdefault("logs", {})[name] = f"./{log_capture_dir.name}"
+                    except OSError:
+                        logging.exception("Failed to capture the node logs of tag '%s'", name)
+                    if cluster.metrics_summary:
+                        metadata.setdefault("metrics", {})[name] = cluster.metrics_summary
+                    metadata.setdefault("resources", {})[name] = {"go_test": go_test_usage,
+                                                                  "scylla": cluster.resource_summary}
+            metadata["durations"] = self.durations
+            if self._load_configuration:
+                try:
+                    self.load_results = self._run_load_test(driver_module)
+                    metadata["load"] = self.load_results
+                    metadata["load_result"] = f"./{self.load_file_name}"
+                except Exception as exc:
+                    logging.exception("Load test failed for version '%s'", self.driver_version)
+                    self.load_results = {"error": str(exc)}
+                    metadata["load"] = self.load_results
             junit.save_after_analysis(driver_version=self.driver_version, protocol=self._protocol,
-                                      gocql_driver_type=self._driver_type, driver_module=driver_module)
+                                      gocql_driver_type=self._driver_type, driver_module=driver_module,
+                                      cell_label=self.cell_label)
+            # A --run selection may match none of the tests of the version, e.g. ones built with other tags
+            junit.empty_selection_allowed = bool(self._run_selection) and not timed_out
+            result_files = [self.xunit_file, metadata_file]
+            if (self.xunit_dir / self.load_file_name).is_file():
+                result_files.append(self.xunit_dir / self.load_file_name)
+            benchmark_outputs = sorted(self.xunit_dir.glob(f"{self.xunit_file_name}_bench_*.txt"))
+            if benchmark_outputs:
+                self.benchmark_results = self._save_benchmark_results(benchmark_outputs)
+                metadata["benchmark_result"] = f"./{self.benchmark_file_name}"
+                result_files.append(self.xunit_dir / self.benchmark_file_name)
+            metadata["commands"] = summarize_commands(command_telemetry.since(commands_mark), top=5)
             metadata_file.write_text(json.dumps(metadata))
+            # Failed cells are always re-run, a failure may be caused by the infrastructure
+            if cache_key and not junit.is_failed and not self.infra_failures and not (self.load_results or {}).get("error"):
+                self._result_cache.store(cache_key, junit.summary, result_files)
         return junit
    
     
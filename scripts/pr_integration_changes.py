@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import json
+import re
+import subprocess
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Optional
 
 
 REPOSITORIES = {
@@ -22,7 +24,15 @@ RUNNER_PATHS = {
 }
 
 
+# Hunk headers carry the enclosing Go function, e.g. "@@ -10,6 +10,7 @@ func TestFoo(t *testing.T) {"
+_HUNK_HEADER = re.compile(r"^@@ [^@]* @@ ?(.*)$")
+_GO_TEST_FUNCTION = re.compile(r"\bfunc (Test\w+)\(")
+
+
 def is_runner_path(filename: str) -> bool:
+    # The matrix' own unit tests don't change how the driver tests run
+    if filename.startswith("tests/"):
+        return False
     return filename.endswith(".py") or filename in RUNNER_PATHS
 
 
@@ -32,31 +42,123 @@ def driver_ref_for_version(version: str) -> str:
     return f"v{version}"
 
 
-def detect_changes(changed_files: Iterable[str], repo_root: Path = Path(".")) -> dict[str, str]:
+def read_base_file(repo_root: Path, base_ref: str, filename: str) -> Optional[str]:
+    """Content of a file at the PR's base commit, None if it didn't exist there."""
+    try:
+        return subprocess.check_output(["git", "show", f"{base_ref}:{filename}"], cwd=repo_root, text=True,
+                                       stderr=subprocess.DEVNULL)
+    except subprocess.CalledProcessError:
+        return None
+
+
+def ignored_tests(content: Optional[str]) -> set[tuple[str, str, str]]:
+    """(protocol section, list, test) entries of an ignore.yaml."""
+    # Imported here, detecting the changed paths doesn't need PyYAML
+    import yaml
+
+    entries = set()
+    for section, lists in (yaml.safe_load(content or "") or {}).items():
+        for list_name, tests in (lists or {}).items():
+            entries.update((section, list_name, test) for test in tests or ())
+    return entries
+
+
+def patch_hunks(content: Optional[str]) -> set[tuple[str, str]]:
+    """(patched file, hunk text without its line numbers) of every hunk of a patch."""
+    hunks = set()
+    filename, hunk = None, None
+    for line in (content or "").splitlines():
+        if line.startswith("diff --git "):
+            if hunk is not None:
+                hunks.add((filename, "\n".join(hunk)))
+            filename, hunk = line.rsplit(" b/", 1)[-1], None
+            continue
+        header = _HUNK_HEADER.match(line)
+        if header and filename:
+            if hunk is not None:
+                hunks.add((filename, "\n".join(hunk)))
+            hunk = [header.group(1)]
+        elif hunk is not None:
+            hunk.append(line)
+    if hunk is not None:
+        hunks.add((filename, "\n".join(hunk)))
+    return hunks
+
+
+def affected_tests(changed_files: Iterable[str], repo_root: Path, base_ref: str) -> Optional[set[str]]:
+    """
+    Go tests affected by the changes of one version folder, None when the full suite has to run.
+
+    Added (except to a skip list) or removed ignore.yaml entries select their tests.  Patch hunks which differ from the base's patch select
+    the tests they touch in `_test.go` files; a hunk changing driver code, which every test of the package may
+    depend on, requires the full suite.  So does a file missing at the base, e.g. of a new version folder, whose
+    whole suite wasn't validated yet.
+    """
+    tests = set()
+    for filename in changed_files:
+        path = repo_root / filename
+        current = path.read_text(encoding="utf-8") if path.is_file() else None
+        base = read_base_file(repo_root, base_ref, filename)
+        if base is None:
+            return None
+        if path.name == "ignore.yaml":
+            current_entries, base_entries = ignored_tests(current), ignored_tests(base)
+            # A test only added to a skip list doesn't run any more, selecting it would run nothing
+            added = {entry for entry in current_entries - base_entries if entry[1] != "skip"}
+            tests.update(test.split("/")[0] for _, _, test in added | (base_entries - current_entries))
+        elif path.name == "patch":
+            for patched_file, hunk in patch_hunks(current) ^ patch_hunks(base):
+                if not patched_file.endswith("_test.go"):
+                    return None
+                hunk_tests = set(_GO_TEST_FUNCTION.findall(hunk))
+                if not hunk_tests:
+                    # Helpers of the tests
+                    return None
+                tests.update(hunk_tests)
+        else:
+            return None
+    # Nothing could be narrowed down, e.g. only comments changed
+    return tests or None
+
+
+def run_selection(tests: Optional[set[str]]) -> str:
+    """The `go test -run` regex of the affected tests, empty for the full suite."""
+    if not tests:
+        return ""
+    return f"^({'|'.join(sorted(tests))})$"
+
+
+def detect_changes(changed_files: Iterable[str], repo_root: Path = Path("."),
+                   base_ref: Optional[str] = None) -> dict[str, str]:
+    """
+    Outputs of the PR change detection. With *base_ref*, the PR's base commit, each changed driver version only runs
+    the tests affected by its changes (the `run` regex of its matrix entry).
+    """
     repo_root = Path(repo_root)
     changed_files = list(changed_files)
 
-    version_dirs = set()
+    version_dirs: dict[tuple[str, str], list[str]] = {}
     for filename in changed_files:
         parts = filename.split("/")
         if len(parts) >= 3 and parts[0] == "versions":
             path = repo_root / parts[0] / parts[1] / parts[2]
             if path.is_dir():
-                version_dirs.add((parts[1], parts[2]))
+                version_dirs.setdefault((parts[1], parts[2]), []).append(filename)
 
     version_matrix = []
-    for driver_type, version in sorted(version_dirs):
+    for (driver_type, version), version_files in sorted(version_dirs.items()):
         repository = REPOSITORIES.get(driver_type)
         if repository is None:
             raise SystemExit(f"Unsupported driver type in versions/{driver_type}/{version}")
-        version_matrix.append(
-            {
-                "driver_type": driver_type,
-                "driver_repository": repository,
-                "driver_version": version,
-                "driver_ref": driver_ref_for_version(version),
-            }
-        )
+        entry = {
+            "driver_type": driver_type,
+            "driver_repository": repository,
+            "driver_version": version,
+            "driver_ref": driver_ref_for_version(version),
+        }
+        if base_ref:
+            entry["run"] = run_selection(affected_tests(version_files, repo_root, base_ref))
+        version_matrix.append(entry)
 
     runner_changed = any(is_runner_path(filename) for filename in changed_files)
     scripts_image_source_changed = any(filename in IMAGE_SOURCE_PATHS for filename in changed_files)
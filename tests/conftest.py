@@ -0,0 +1,32 @@
+import time
+from pathlib import Path
+
+import pytest
+
+import ip_prefix
+from ip_prefix import IpPrefixAllocator
+
+
+@pytest.fixture
+def isolated_leases(monkeypatch, tmp_path):
+    """The clusters of the test lease their IP prefixes apart from the ones of the host's real runs"""
+    monkeypatch.setattr(ip_prefix, "_allocator", IpPrefixAllocator(lease_dir=tmp_path / "leases"))
+
+
+def _is_killed(pid: int, timeout: float = 5) -> bool:
+    """The process is gone, or a killed orphan not reaped yet by the init process (a zombie)"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()[0] in ("Z", "X"):
+                return True
+        except FileNotFoundError:
+            return True
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def is_killed():
+    return _is_killed
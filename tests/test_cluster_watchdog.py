@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import cluster as cluster_module
+from cluster_watchdog import ClusterWatchdog
+from commands import run_command
+from resource_usage import process_tree
+
+
+pytestmark = pytest.mark.usefixtures("isolated_leases")
+
+
+def test_node_failure_aborts_go_test(tmp_path, is_killed):
+    # A stand-in for `go test`: `./go test` runs the "test" script, which starts a child like a test binary
+    (tmp_path / "go").symlink_to(sys.executable)
+    (tmp_path / "test").write_text("import subprocess, time\nsubprocess.Popen(['sleep', '60'])\ntime.sleep(60)\n")
+    diagnostics_file = tmp_path / "logs" / "infra-failure.json"
+    with cluster_module.TestCluster(tmp_path, "release:2026.2.0", configuration={}, backend="fake") as cluster:
+        cluster.start()
+        watchdog = ClusterWatchdog(cluster, interval=0.05, diagnostics_file=diagnostics_file, failures_threshold=2)
+        watchdog.start()
+
+        def fail_node_once_tests_run(process):
+            # The pipeline, go test, its test binary and the binary's child are up
+            while len(process_tree([process.pid])) < 4:
+                time.sleep(0.01)
+            cluster._cluster.nodes["node2"].stop()
+            watchdog.watch(process)
+
+        started = time.monotonic()
+        run_command("./go test | cat", cwd=tmp_path, on_start=fail_node_once_tests_run)
+        failure = watchdog.stop()
+
+    cluster_module.join_cluster_reapers()
+    assert time.monotonic() - started < 30
+    assert failure["nodes"] == {"node2": "process isn't running"}
+    assert len(set(failure["killed_pids"])) == 2
+    assert all(is_killed(pid) for pid in failure["killed_pids"])
+    diagnostics = json.loads(diagnostics_file.read_text())
+    assert diagnostics["reason"] == "node2: process isn't running"
+    assert "listening for CQL clients" in "".join(diagnostics["log_tails"]["node1"])
+
+
+def test_healthy_cluster_is_left_alone(tmp_path):
+    with cluster_module.TestCluster(tmp_path, "release:2026.2.0", configuration={}, backend="fake") as cluster:
+        cluster.start()
+        watchdog = ClusterWatchdog(cluster, interval=0.05, diagnostics_file=tmp_path / "infra-failure.json",
+                                   failures_threshold=2)
+        watchdog.start()
+        result = run_command("sleep 0.3", on_start=watchdog.watch)
+
+        assert result.returncode == 0
+        assert watchdog.stop() is None
+    cluster_module.join_cluster_reapers()
+
+
+def test_abort_does_not_reap_the_pipeline_waited_for_by_the_runner(tmp_path):
+    watchdog = ClusterWatchdog(None, interval=1, diagnostics_file=tmp_path / "infra-failure.json")
+    watchdog.failure = {"killed_pids": []}
+    process = subprocess.Popen(["true"])
+    watchdog.watch(process)
+    while (Path("/proc") / str(process.pid) / "stat").read_text().rsplit(")", 1)[1].split()[0] != "Z":
+        time.sleep(0.01)
+
+    watchdog._abort()
+
+    # The exit status is still there for the runner's wait4()
+    assert os.waitpid(process.pid, 0)[1] == 0
+    process.returncode = 0
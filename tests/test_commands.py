@@ -0,0 +1,52 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import commands
+from commands import CommandTimeout, run_command, summarize
+
+
+def test_run_command_records_the_resources_and_output_of_the_child_tree():
+    mark = commands.telemetry.mark()
+    # The grandchild allocates ~64MB and is waited for by the shell, so its usage is included
+    result = run_command(f"{sys.executable} -c 'data = bytearray(64 * 1024 * 1024); sum(range(10 ** 6))'; "
+                         f"echo out; echo error >&2; exit 3", capture_stdout=True, capture_stderr=True, text=True)
+
+    assert (result.returncode, result.stdout, result.stderr) == (3, "out\n", "error\n")
+    record = result.record
+    assert record.peak_rss_bytes > 64 * 1024 * 1024
+    assert record.cpu_seconds > 0
+    assert (record.stdout_bytes, record.stderr_bytes) == (4, 6)
+    assert commands.telemetry.since(mark) == [record]
+
+
+def test_timeout_kills_the_whole_process_group(tmp_path, is_killed):
+    pid_file = tmp_path / "pid"
+    started = time.monotonic()
+
+    with pytest.raises(CommandTimeout):
+        run_command(f"sleep 60 & echo $! > {pid_file}; wait", timeout=0.5)
+
+    assert time.monotonic() - started < 10
+    assert is_killed(int(pid_file.read_text()))
+
+
+def test_dry_run_only_records_the_commands(monkeypatch, tmp_path):
+    monkeypatch.setenv("DRY_RUN", "true")
+
+    result = run_command(["touch", str(tmp_path / "file")], capture_stdout=True, check=True)
+
+    assert result.returncode == 0 and result.stdout == b""
+    assert not (tmp_path / "file").exists()
+
+
+def test_summary_lists_the_most_expensive_commands_first():
+    records = [commands.CommandRecord(command=f"cmd {seconds}", exit_code=int(seconds == 3), wall_seconds=seconds)
+               for seconds in (1, 3, 2)]
+
+    summary = summarize(records, top=2)
+
+    assert [record["command"] for record in summary["most_expensive"]] == ["cmd 3", "cmd 2"]
+    assert (summary["commands"], summary["wall_seconds"], summary["failed"]) == (3, 6, 1)
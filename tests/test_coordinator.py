@@ -0,0 +1,67 @@
+import socket
+import threading
+
+import pytest
+
+import daemon
+from coordinator import Coordinator
+from main import MatrixResult
+
+
+@pytest.fixture
+def workers(tmp_path, monkeypatch):
+    def run_matrix(arguments):
+        cell = (arguments.versions[0], arguments.protocols[0], "", arguments.scylla_versions[0])
+        junit_file = tmp_path / threading.current_thread().name / f"xunit.scylla.v{cell[1]}.{cell[0]}.xml"
+        junit_file.parent.mkdir(exist_ok=True)
+        junit_file.write_text(f"<testsuites name='{cell[0]} v{cell[1]}'/>")
+        return MatrixResult(status=int(cell[1] == "3"), results={cell: {"tests": 1}}, junit_files={cell: junit_file},
+                            durations={cell: {"integration": 1.5}})
+
+    monkeypatch.setattr(daemon, "run_matrix", run_matrix)
+    servers = []
+    for _ in range(2):
+        matrix_daemon = daemon.MatrixDaemon(max_idle_clusters=0)
+        server = daemon.serve(matrix_daemon, port=0)
+        matrix_daemon.start()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append((server, matrix_daemon))
+    yield [f"http://127.0.0.1:{server.server_address[1]}" for server, _ in servers]
+    for server, matrix_daemon in servers:
+        server.shutdown()
+        server.server_close()
+        matrix_daemon.shutdown()
+
+
+def _unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_coordinator_spreads_the_cells_over_the_workers_and_collects_their_results(workers, tmp_path):
+    cells = {
+        (version, protocol, "", "release:2026.2.0"): [".", "--versions", version, "--protocols", protocol,
+                                                      "--scylla-version", "release:2026.2.0"]
+        for version in ("v1.18.2", "v1.18.3") for protocol in ("3", "4")
+    }
+    # A worker that is down is dropped, its cells go to the other workers
+    dead_worker = f"http://127.0.0.1:{_unused_port()}"
+
+    results = Coordinator([dead_worker, *workers], tmp_path / "xunit").run(cells)
+
+    assert set(results) == set(cells)
+    for (version, protocol, _, _), result in results.items():
+        assert result["status"] == ("failed" if protocol == "3" else "passed")
+        assert result["summary"] == {"tests": 1}
+        assert result["durations"] == {"integration": 1.5}
+        assert result["junit_file"] == tmp_path / "xunit" / version / f"xunit.scylla.v{protocol}.{version}.xml"
+        assert result["junit_file"].read_text() == f"<testsuites name='{version} v{protocol}'/>"
+
+
+def test_coordinator_reports_the_cells_left_without_workers(tmp_path):
+    cell = ("v1.18.3", "4", "", "release:2026.2.0")
+
+    results = Coordinator([f"http://127.0.0.1:{_unused_port()}"], tmp_path).run({cell: ["."]})
+
+    assert results[cell] == dict(status="error", error="no worker left to run the cell")
@@ -0,0 +1,127 @@
+import http.client
+import json
+import logging
+import socket
+import threading
+import time
+
+import pytest
+
+import daemon
+from main import MatrixResult
+
+ARGS = [".", "--versions", "v1.18.3", "--protocols", "4", "--scylla-version", "release:2026.2.0"]
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("matrix")
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str(self._path))
+
+
+def _request(socket_path, method, path, body=None):
+    connection = _UnixConnection(socket_path)
+    connection.request(method, path, body=json.dumps(body) if body is not None else None)
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def _wait_until_done(job):
+    with job.updated:
+        job.updated.wait_for(lambda: job.done, timeout=10)
+
+
+@pytest.fixture
+def matrix_daemon(tmp_path, monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
+    junit_file = tmp_path / "xunit.scylla.v4.v1.18.3.xml"
+    junit_file.write_text("<testsuites/>")
+    cell = ("v1.18.3", "4", "", "release:2026.2.0")
+
+    def run_matrix(arguments):
+        logging.getLogger("run").info("Running %s", ", ".join(arguments.versions))
+        return MatrixResult(status=1, results={cell: {"failures": 1}}, junit_files={cell: junit_file})
+
+    monkeypatch.setattr(daemon, "run_matrix", run_matrix)
+    matrix_daemon = daemon.MatrixDaemon(max_idle_clusters=0)
+    server = daemon.serve(matrix_daemon, socket_path=tmp_path / "daemon.sock")
+    matrix_daemon.start()
+    server_thread = daemon.threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    yield tmp_path / "daemon.sock"
+    server.shutdown()
+    server.server_close()
+    matrix_daemon.shutdown()
+
+
+def test_daemon_runs_a_submitted_job_and_serves_its_results(matrix_daemon):
+    status, body = _request(matrix_daemon, "POST", "/jobs", {"args": ARGS})
+    assert status == 201
+    job_id = json.loads(body)["id"]
+
+    # The log response ends when the job is done
+    status, log = _request(matrix_daemon, "GET", f"/jobs/{job_id}/log")
+    assert status == 200
+    assert b"Running v1.18.3" in log
+
+    status, body = _request(matrix_daemon, "GET", f"/jobs/{job_id}")
+    job = json.loads(body)
+    assert job["status"] == "failed"
+    assert job["cells"][0]["summary"] == {"failures": 1}
+    assert job["junit"] == ["xunit.scylla.v4.v1.18.3.xml"]
+    assert _request(matrix_daemon, "GET", f"/jobs/{job_id}/junit/xunit.scylla.v4.v1.18.3.xml") == (200, b"<testsuites/>")
+    # The next run of the cell replaces the files in xunit/, the job keeps its own
+    (matrix_daemon.parent / "xunit.scylla.v4.v1.18.3.xml").unlink()
+    assert _request(matrix_daemon, "GET", f"/jobs/{job_id}/junit/xunit.scylla.v4.v1.18.3.xml") == (200, b"<testsuites/>")
+
+
+def test_daemon_rejects_invalid_arguments(matrix_daemon):
+    status, _ = _request(matrix_daemon, "POST", "/jobs", {"args": ["--no-such-option"]})
+
+    assert status == 400
+    assert _request(matrix_daemon, "GET", "/jobs/1")[0] == 404
+
+
+def test_daemon_looks_the_driver_tags_up_in_its_own_checkout_when_the_job_runs(tmp_path, monkeypatch):
+    lookups = []
+    monkeypatch.setattr(daemon, "resolve_driver_versions",
+                        lambda arguments: lookups.append(arguments.gocql_driver_git))
+    matrix_daemon = daemon.MatrixDaemon(max_idle_clusters=0, gocql_driver_git=tmp_path / "gocql-worker")
+
+    job = matrix_daemon.submit(["../gocql-scylla", "--versions", "2", "--scylla-version", "release:2026.2.0"])
+
+    # Nothing touched the checkout yet, it may be in use by the running job
+    assert lookups == []
+    assert job.arguments.gocql_driver_git == str(tmp_path / "gocql-worker")
+    monkeypatch.setattr(daemon, "run_matrix", lambda arguments: MatrixResult())
+    matrix_daemon.start()
+    _wait_until_done(job)
+    matrix_daemon.shutdown()
+    assert lookups == [str(tmp_path / "gocql-worker")]
+    assert job.status == "passed"
+
+
+def test_shutdown_cancels_the_queued_jobs(tmp_path, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(daemon, "run_matrix", lambda arguments: release.wait(10) and MatrixResult())
+    matrix_daemon = daemon.MatrixDaemon(max_idle_clusters=0, jobs_dir=tmp_path / "jobs")
+    matrix_daemon.start()
+    running = matrix_daemon.submit(ARGS)
+    queued = matrix_daemon.submit(ARGS)
+    while running.status != "running":
+        time.sleep(0.01)
+
+    stopping = threading.Thread(target=matrix_daemon.shutdown)
+    stopping.start()
+    _wait_until_done(queued)
+    release.set()
+    stopping.join()
+
+    assert queued.status == "cancelled"
+    assert running.status == "passed"
+    with pytest.raises(ValueError):
+        matrix_daemon.submit(ARGS)
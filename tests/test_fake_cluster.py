@@ -0,0 +1,87 @@
+import socket
+import struct
+import time
+
+import pytest
+
+import cluster as cluster_module
+from ip_prefix import is_port_bound
+
+
+pytestmark = pytest.mark.usefixtures("isolated_leases")
+
+
+def _cql_request(ip: str, opcode: int, protocol: int = 4) -> tuple:
+    with socket.create_connection((ip, 9042), timeout=2) as sock:
+        sock.sendall(struct.pack(">BBhBI", protocol, 0, 1, opcode, 0))
+        version, _, stream, response_opcode, length = struct.unpack(">BBhBI", sock.recv(9))
+        body = sock.recv(length) if length else b""
+    return version, stream, response_opcode, body
+
+
+def test_fake_cluster_answers_cql_handshake_on_every_node(tmp_path):
+    with cluster_module.TestCluster(tmp_path, "release:2026.2.0", configuration={}, backend="fake") as cluster:
+        cluster_params = cluster.start()
+        node_ips = cluster.ip_addresses.split(",")
+
+        assert f"-cluster={cluster.ip_addresses}" in cluster_params
+        assert len(node_ips) == 3
+        for ip in node_ips:
+            assert _cql_request(ip, opcode=0x05)[:3] == (0x84, 1, 0x06)
+            assert _cql_request(ip, opcode=0x01)[:3] == (0x84, 1, 0x02)
+
+    cluster_module.join_cluster_reapers()
+    assert not any(is_port_bound(ip, 9042) for ip in node_ips)
+
+
+def test_fake_cluster_rejects_unsupported_protocol(tmp_path):
+    with cluster_module.TestCluster(tmp_path, "release:2026.2.0", configuration={}, backend="fake") as cluster:
+        cluster.start()
+        ip = cluster.ip_addresses.split(",")[0]
+
+        _, _, opcode, body = _cql_request(ip, opcode=0x05, protocol=66)
+
+    cluster_module.join_cluster_reapers()
+    assert opcode == 0x00
+    assert struct.unpack(">i", body[:4])[0] == 0x000A
+
+
+def test_metrics_are_sampled_while_the_cluster_is_used(tmp_path):
+    metrics_file = tmp_path / "metrics.json.gz"
+    with cluster_module.TestCluster(tmp_path, "release:2026.2.0", configuration={}, backend="fake",
+                                    metrics_interval=0.05, metrics_file=metrics_file) as cluster:
+        cluster.start()
+        for ip in cluster.ip_addresses.split(","):
+            _cql_request(ip, opcode=0x05)
+            _cql_request(ip, opcode=0x01)
+
+    cluster_module.join_cluster_reapers()
+    assert cluster.metrics_summary["cql_requests"] == 6
+    assert cluster.metrics_summary["scrape_errors"] == 0
+    assert metrics_file.is_file()
+
+
+def test_cluster_pool_hands_out_a_pre_booted_cluster(tmp_path, monkeypatch):
+    pool = cluster_module.ClusterPool(max_idle=1)
+    monkeypatch.setattr(cluster_module, "cluster_pool", pool)
+    pool.preboot(tmp_path, "release:2026.2.0", {}, "fake")
+    for _ in range(100):
+        if pool._idle:
+            break
+        time.sleep(0.05)
+
+    with cluster_module.open_cluster(tmp_path, "release:2026.2.0", {}, backend="fake") as cluster:
+        # The nodes already answer before the cell starts the cluster
+        node_ips = cluster.ip_addresses.split(",")
+        assert all(is_port_bound(ip, 9042) for ip in node_ips)
+        assert f"-cluster={cluster.ip_addresses}" in cluster.start()
+        # The replacement booting in the background doesn't become the ccm CLI's current cluster
+        for _ in range(100):
+            if pool._idle:
+                break
+            time.sleep(0.05)
+        assert pool._idle
+        assert (tmp_path / "ccm" / "CURRENT").read_text() == f"{cluster._cluster.name}\n"
+    pool.close()
+    cluster_module.join_cluster_reapers()
+    assert not any(is_port_bound(ip, 9042) for ip in node_ips)
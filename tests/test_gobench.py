@@ -0,0 +1,36 @@
+from gobench import compare_benchmarks, mann_whitney_p_value, parse_benchmark_output
+
+
+BENCH_OUTPUT = """goos: linux
+goarch: amd64
+pkg: github.com/gocql/gocql
+BenchmarkSingleConn-8     	   12345	     95123 ns/op	    2040 B/op	      35 allocs/op
+BenchmarkSingleConn-8     	   12001	     96001 ns/op	    2040 B/op	      35 allocs/op
+BenchmarkRoundRobinPolicy/hosts_10-8 	 1000000	        12.5 ns/op
+PASS
+ok  	github.com/gocql/gocql	12.345s
+"""
+
+
+def test_parse_benchmark_output_collects_samples_per_unit():
+    results = parse_benchmark_output(BENCH_OUTPUT)
+
+    assert results == {
+        "BenchmarkSingleConn": {"ns/op": [95123.0, 96001.0], "B/op": [2040.0, 2040.0], "allocs/op": [35.0, 35.0]},
+        "BenchmarkRoundRobinPolicy/hosts_10": {"ns/op": [12.5]},
+    }
+
+
+def test_mann_whitney_exact_p_value():
+    assert round(mann_whitney_p_value([10, 11, 12, 13, 14], [1, 2, 3, 4, 5]), 4) == round(2 / 252, 4)
+    assert round(mann_whitney_p_value([1, 3, 5, 7, 9], [2, 4, 6, 8, 10]), 3) == 0.690
+
+
+def test_compare_reports_only_significant_changes():
+    baseline = {"BenchmarkQuery": {"ns/op": [100, 101, 102, 103, 104], "allocs/op": [10, 10, 10, 10, 10]}}
+    current = {"BenchmarkQuery": {"ns/op": [120, 121, 122, 123, 124], "allocs/op": [10, 10, 10, 10, 10]}}
+
+    rows = {row["unit"]: row for row in compare_benchmarks(baseline, current)}
+
+    assert rows["ns/op"]["significant"] and rows["ns/op"]["delta_percent"] == 19.61
+    assert not rows["allocs/op"]["significant"]
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from ip_prefix import IpPrefixAllocator
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_leases_are_unique_and_released_prefixes_are_reused_last(tmp_path):
+    allocator = IpPrefixAllocator(lease_dir=tmp_path, size=3)
+
+    first = allocator.acquire()
+    second = allocator.acquire()
+    assert first.ip_prefix != second.ip_prefix
+
+    first.release()
+    third = allocator.acquire()
+    fourth = allocator.acquire()
+
+    assert third.index not in (first.index, second.index)
+    assert fourth.index == first.index
+
+
+def test_prefix_is_unlocked_before_it_goes_back_on_the_free_list(tmp_path, monkeypatch):
+    allocator = IpPrefixAllocator(lease_dir=tmp_path, size=3)
+    lease = allocator.acquire()
+    lockable = []
+
+    def release(released):
+        lease_file = allocator._try_lock(released.index)
+        lockable.append(lease_file is not None)
+        lease_file.close()
+
+    monkeypatch.setattr(allocator, "release", release)
+    lease.release()
+
+    assert lockable == [True]
+
+
+def test_lease_records_owner_pid(tmp_path):
+    allocator = IpPrefixAllocator(lease_dir=tmp_path, size=3)
+
+    lease = allocator.acquire()
+
+    assert allocator.owner(lease.index) == os.getpid()
+    lease.release()
+    assert allocator.owner(lease.index) is None
+
+
+def test_leases_of_dead_owners_are_reclaimed(tmp_path):
+    script = (
+        "import os, sys\n"
+        f"sys.path.insert(0, {str(REPO_ROOT)!r})\n"
+        "from ip_prefix import IpPrefixAllocator\n"
+        f"IpPrefixAllocator(lease_dir={str(tmp_path)!r}, size=1).acquire()\n"
+        "os._exit(0)\n"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+    lease = IpPrefixAllocator(lease_dir=tmp_path, size=1).acquire()
+
+    assert lease.ip_prefix == "127.0.1."
@@ -0,0 +1,40 @@
+import io
+from datetime import datetime, timedelta
+
+import log_capture
+from log_capture import FramedWriter, capture_log, extract, read_range, stamp
+
+
+def test_ranges_are_read_across_frames(tmp_path):
+    data = b"".join(f"line {number}\n".encode() for number in range(1000))
+    writer = FramedWriter(tmp_path / "log", log_capture.compression(), frame_size=100)
+    for line in io.BytesIO(data):
+        writer.write(line)
+    frames = writer.close()
+
+    assert len(frames) > 10
+    assert read_range(tmp_path / "log", log_capture.compression(), frames, 5000, 5500) == data[5000:5500]
+    assert read_range(tmp_path / "log", log_capture.compression(), frames, 9000) == data[9000:]
+
+
+def test_node_log_lines_are_indexed_by_test(tmp_path):
+    started = datetime(2026, 5, 1, 10, 0, 0)
+    clock = iter(started + timedelta(seconds=second) for second in range(100))
+    output = (b"=== RUN   TestFirst\n--- PASS: TestFirst (1.00s)\n"
+              b"=== RUN   TestSecond\nsecond_test.go:10: oops\n--- FAIL: TestSecond (2.00s)\nFAIL\n")
+    sink = io.BytesIO()
+    stamp(tmp_path, io.BytesIO(output), sink, clock=lambda: next(clock))
+    node_log = tmp_path / "system.log"
+    node_log.write_text("INFO  2026-05-01 09:59:59,000 [shard 0] before\n"
+                        "INFO  2026-05-01 10:00:01,500 [shard 0] during the first test\n"
+                        "WARN  2026-05-01 10:00:04,000 [shard 0] during the second test\n"
+                        "  backtrace line\n"
+                        "INFO  2026-05-01 10:00:09,000 [shard 0] after\n")
+    capture_log(tmp_path, "node1.system.log", node_log)
+
+    assert sink.getvalue() == output
+    first, second = extract(tmp_path, "TestFirst"), extract(tmp_path, "TestSecond")
+    assert first["go-test.log"] == b"=== RUN   TestFirst\n--- PASS: TestFirst (1.00s)\n"
+    assert first["node1.system.log"] == b"INFO  2026-05-01 10:00:01,500 [shard 0] during the first test\n"
+    assert second["node1.system.log"] == (b"WARN  2026-05-01 10:00:04,000 [shard 0] during the second test\n"
+                                          b"  backtrace line\n")
@@ -0,0 +1,24 @@
+from metrics import _increase, parse_prometheus_text
+
+
+METRICS = """# HELP scylla_transport_requests_served Counts a number of served requests.
+# TYPE scylla_transport_requests_served counter
+scylla_transport_requests_served{shard="0"} 100
+scylla_transport_requests_served{shard="1"} 50
+scylla_storage_proxy_coordinator_read_latency_bucket{scheduling_group_name="statement",shard="0",le="640.000000"} 10
+scylla_storage_proxy_coordinator_read_latency_bucket{scheduling_group_name="statement",shard="1",le="640.000000"} 5
+scylla_storage_proxy_coordinator_read_latency_bucket{scheduling_group_name="statement",shard="0",le="+Inf"} 12
+scylla_reactor_utilization{shard="0"} 3.5
+"""
+
+
+def test_counters_and_buckets_are_summed_over_shards():
+    counters, histograms = parse_prometheus_text(METRICS)
+
+    assert counters["cql_requests"] == 150
+    assert counters["cql_errors"] == 0
+    assert histograms["read_latency"] == {640.0: 15, float("inf"): 12}
+
+
+def test_counter_increase_tolerates_node_restarts():
+    assert _increase([10, 20, 5, 15]) == 10 + 5 + 10
@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+
+from planner import CellPlan, duration_history, estimate, format_plan, lpt_schedule, summarize
+
+
+def _plan(name: str, result_cached: bool = False) -> CellPlan:
+    return CellPlan(cell=(name, "4", "", "release:2026.2.0"), name=name, version_folder=Path("versions"),
+                    test_passes=["integration"], result_cached=result_cached)
+
+
+def test_estimates_come_from_the_last_recorded_run_of_the_cell(tmp_path):
+    for index, (name, durations) in enumerate([("a", {"integration": 100}), ("a", {"integration": 300, "auth": 20}),
+                                               ("b", {"integration": 60})]):
+        metadata_file = tmp_path / f"metadata_{index}.json"
+        metadata_file.write_text(json.dumps({"driver_name": name, "durations": durations}))
+    plans = [_plan("a"), _plan("b"), _plan("c"), _plan("d", result_cached=True)]
+
+    estimate(plans, duration_history(sorted(tmp_path.iterdir())))
+
+    assert [(plan.estimate_seconds, plan.estimate_source) for plan in plans] == [
+        (320, "history"), (60, "history"), (190, "median"), (0, "cache")]
+
+
+def test_lpt_schedule_balances_the_runners():
+    plans = [_plan(name) for name in "abcde"]
+    for plan, seconds in zip(plans, [50, 40, 30, 30, 20]):
+        plan.estimate_seconds = seconds
+
+    schedule = lpt_schedule(plans, parallelism=2)
+
+    assert [[plan.name for plan in runner] for runner in schedule] == [["a", "d"], ["b", "c", "e"]]
+    summary = summarize(plans, schedule)
+    assert (summary["serial_seconds"], summary["makespan_seconds"], summary["critical_path_seconds"]) == (170, 90, 50)
+    assert "makespan 1m30s on 2 runner(s), critical path 0m50s" in format_plan(plans, schedule)
+
+
+def test_cell_without_a_version_folder_is_reported_in_the_plan():
+    plans = [_plan("a"), CellPlan(cell=("b", "4", "", "release:2026.2.0"), name="b", version_folder=None,
+                                  test_passes=[], error="No version folder for 'b'")]
+
+    estimate(plans, {"a": 60})
+
+    assert [(plan.estimate_seconds, plan.estimate_source) for plan in plans] == [(60, "history"), (0, "error")]
+    text = format_plan(plans, lpt_schedule(plans, parallelism=1))
+    assert "  error: No version folder for 'b'" in text and "1 cells can't run" in text
@@ -1,4 +1,5 @@
 import json
+import subprocess
 import sys
 from pathlib import Path
 
@@ -93,5 +94,78 @@ def test_integration_workflow_uploads_reports_after_failures():
         assert len(step["uses"].removeprefix("actions/upload-artifact@")) == 40
 
     assert "xunit/" in reports["with"]["path"]
-    assert "driver/ccm/**/logs/**" in reports["with"]["path"]
+    # The nodes' logs of the driver's clusters are uploaded compressed, in the log captures under xunit/
+    assert "driver/ccm/**/logs/**" not in reports["with"]["path"] + ccm_logs["with"]["path"]
     assert "~/.ccm/*/node*/logs/**" in ccm_logs["with"]["path"]
+
+
+def test_matrix_unit_test_changes_are_not_runner_changes():
+    outputs = detect_changes(["tests/test_run.py"], repo_root=REPO_ROOT)
+
+    assert outputs["runner_changed"] == "false"
+
+
+PATCH = """diff --git a/session_test.go b/session_test.go
+--- a/session_test.go
++++ b/session_test.go
+@@ -10,3 +10,4 @@ func TestSessionAPI(t *testing.T) {
+ 	s := createSession(t)
++	defer s.Close()
+ }
+"""
+
+
+def _version_repo(tmp_path, ignore, patch):
+    version_dir = tmp_path / "versions" / "scylla" / "1.17.0"
+    version_dir.mkdir(parents=True)
+    (version_dir / "ignore.yaml").write_text(ignore)
+    (version_dir / "patch").write_text(patch)
+    for command in (["init", "-q"], ["add", "."], ["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "base"]):
+        subprocess.check_call(["git", *command], cwd=tmp_path)
+    return version_dir
+
+
+def _run_selection(outputs):
+    return json.loads(outputs["version_matrix"])["include"][0]["run"]
+
+
+def test_changed_ignore_entries_and_test_hunks_select_the_affected_tests(tmp_path):
+    version_dir = _version_repo(tmp_path, "tests:\n  ignore:\n  - TestUDF\n  flaky:\n", PATCH)
+    (version_dir / "ignore.yaml").write_text("tests:\n  ignore:\n  - TestUDF\n  flaky:\n  - TestWriteFailure/sub\n")
+    (version_dir / "patch").write_text(PATCH + PATCH.replace("TestSessionAPI", "TestBatch").replace("b/session_test", "b/batch_test"))
+
+    outputs = detect_changes(["versions/scylla/1.17.0/ignore.yaml", "versions/scylla/1.17.0/patch"],
+                             repo_root=tmp_path, base_ref="HEAD")
+
+    assert _run_selection(outputs) == "^(TestBatch|TestWriteFailure)$"
+
+
+def test_changed_driver_code_in_patch_selects_the_full_suite(tmp_path):
+    version_dir = _version_repo(tmp_path, "tests:\n", PATCH)
+    (version_dir / "patch").write_text(PATCH.replace("session_test.go", "session.go"))
+
+    outputs = detect_changes(["versions/scylla/1.17.0/patch"], repo_root=tmp_path, base_ref="HEAD")
+
+    assert _run_selection(outputs) == ""
+
+
+def test_new_version_folder_selects_the_full_suite(tmp_path):
+    _version_repo(tmp_path, "tests:\n", PATCH)
+    version_dir = tmp_path / "versions" / "scylla" / "1.99.0"
+    version_dir.mkdir()
+    (version_dir / "ignore.yaml").write_text("tests:\n  ignore:\n  - TestUDF\n")
+    (version_dir / "patch").write_text(PATCH)
+
+    outputs = detect_changes(["versions/scylla/1.99.0/ignore.yaml", "versions/scylla/1.99.0/patch"],
+                             repo_root=tmp_path, base_ref="HEAD")
+
+    assert _run_selection(outputs) == ""
+
+
+def test_tests_only_added_to_the_skip_list_are_not_selected(tmp_path):
+    version_dir = _version_repo(tmp_path, "tests:\n  ignore:\n  - TestUDF\n", PATCH)
+    (version_dir / "ignore.yaml").write_text("tests:\n  ignore:\n  - TestUDF\n  - TestBatch\n  skip:\n  - TestFlaky\n")
+
+    outputs = detect_changes(["versions/scylla/1.17.0/ignore.yaml"], repo_root=tmp_path, base_ref="HEAD")
+
+    assert _run_selection(outputs) == "^(TestBatch)$"
@@ -0,0 +1,46 @@
+from processjunit import RACE_SUFFIX, ProcessJUnit
+
+DRIVER_MODULE = "github.com/gocql/gocql"
+
+
+def _write_part(path, testcases):
+    path.write_text(f'<testsuites><testsuite name="{DRIVER_MODULE}" time="1" timestamp="">{testcases}'
+                    '</testsuite></testsuites>')
+
+
+def test_race_pass_is_reported_distinctly(tmp_path):
+    xunit_file = tmp_path / "xunit.scylla.v4.v1.18.3.xml"
+    _write_part(tmp_path / f"{xunit_file.name}_part_0",
+                f'<testcase classname="gocql" name="TestSession" time="1"></testcase>'
+                f'<testcase classname="gocql" name="TestFlaky" time="1"><failure message="Failed">boom</failure>'
+                f'</testcase>')
+    _write_part(tmp_path / f"{xunit_file.name}_race_part_1",
+                '<testcase classname="gocql" name="TestSession" time="1"><failure message="Failed">'
+                'WARNING: DATA RACE\ntesting.go:1465: race detected during execution of test</failure></testcase>'
+                '<testcase classname="gocql" name="TestFlaky" time="1"><failure message="Failed">boom</failure>'
+                '</testcase>')
+    junit = ProcessJUnit(xunit_file, {"flaky": ["TestFlaky"]})
+
+    junit.save_after_analysis(driver_version="v1.18.3", protocol=4, gocql_driver_type="scylla",
+                              driver_module=DRIVER_MODULE)
+
+    assert junit.summary_full_details["races"] == {f"TestSession{RACE_SUFFIX}"}
+    assert junit.summary["races"] == 1
+    assert junit.summary["failures"] == 1
+    assert junit.summary["flaky"] == 2
+    assert junit.summary["tests"] == 4
+
+
+def test_run_selection_matching_no_tests_isnt_a_failure(tmp_path):
+    xunit_file = tmp_path / "xunit.scylla.v4.v1.18.3.xml"
+    _write_part(tmp_path / f"{xunit_file.name}_part_0", "")
+    junit = ProcessJUnit(xunit_file, {})
+    junit.save_after_analysis(driver_version="v1.18.3", protocol=4, gocql_driver_type="scylla",
+                              driver_module=DRIVER_MODULE)
+    without_selection = ProcessJUnit(xunit_file, {})
+
+    junit.empty_selection_allowed = True
+
+    assert junit.summary["tests"] == 0
+    assert not junit.is_failed
+    assert without_selection.is_failed
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import time
+
+from resource_usage import ProcessTreeSampler, process_tree, read_process_stats
+
+
+def test_read_process_stats_of_the_current_process():
+    stats = read_process_stats(os.getpid())
+
+    assert stats["rss_bytes"] > 0
+    assert stats["voluntary_context_switches"] > 0
+    assert stats["cpu_seconds"] > 0
+
+
+def test_sampler_follows_the_descendants_of_the_roots():
+    shell = subprocess.Popen(["/bin/bash", "-c", "sleep 30 & wait"])
+    try:
+        while len(process_tree([shell.pid])) < 2:
+            time.sleep(0.01)
+        sampler = ProcessTreeSampler(lambda: [shell.pid], interval=0.05)
+        sampler.start()
+        summary = sampler.stop()
+        assert shell.pid in process_tree([os.getpid()])
+    finally:
+        shell.kill()
+        shell.wait()
+
+    assert summary["processes"] == 2
+    assert summary["peak_rss_bytes"] > 0
@@ -0,0 +1,99 @@
+import errno
+import os
+import time
+
+from processjunit import ProcessJUnit
+import result_cache
+from result_cache import ResultCache
+
+
+def _store(cache: ResultCache, tmp_path, key: str):
+    xunit_file = tmp_path / f"xunit.{key}.xml"
+    xunit_file.write_text("<testsuites/>")
+    return cache.store(key, {"tests": 2, "passed": 2}, [xunit_file])
+
+
+def test_key_changes_with_any_input():
+    inputs = dict(driver_commit="abc", version_folder="def", scylla_version="release:2026.2.0", protocol=4)
+
+    assert ResultCache.key(**inputs) == ResultCache.key(**dict(reversed(list(inputs.items()))))
+    assert ResultCache.key(**inputs) != ResultCache.key(**{**inputs, "protocol": 3})
+
+
+def test_stored_result_is_loaded_until_expired(tmp_path):
+    cache = ResultCache(directory=tmp_path / "cache", ttl_seconds=60)
+    _store(cache, tmp_path, "cell")
+
+    entry = cache.load("cell")
+    assert (entry / "xunit.cell.xml").read_text() == "<testsuites/>"
+    assert cache.summary(entry) == {"tests": 2, "passed": 2}
+
+    expired = time.time() - 120
+    os.utime(entry / "summary.json", (expired, expired))
+    assert cache.load("cell") is None
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    cache = ResultCache(directory=tmp_path / "cache", max_entries=2)
+    for index, key in enumerate(["first", "second"]):
+        entry = _store(cache, tmp_path, key)
+        os.utime(entry, (time.time() - 100 + index, time.time() - 100 + index))
+    cache.load("first")
+
+    _store(cache, tmp_path, "third")
+
+    assert cache.load("first") and cache.load("third")
+    assert cache.load("second") is None
+
+
+def test_junit_from_summary_doesnt_parse_the_xml(tmp_path):
+    junit = ProcessJUnit.from_summary(tmp_path / "missing.xml", {"tests": 2, "passed": 1, "skipped": 1, "errors": 0,
+                                                                  "failures": 0, "ignored_in_analysis": 0, "flaky": 0,
+                                                                  "xpassed": 0, "xfailed": 0})
+
+    assert junit.summary["tests"] == 2
+    assert not junit.is_failed
+
+
+def test_peek_doesnt_refresh_or_expire_entries(tmp_path):
+    cache = ResultCache(directory=tmp_path / "cache", ttl_seconds=60)
+    entry = _store(cache, tmp_path, "cell")
+    os.utime(entry, (1, 1))
+
+    assert cache.peek("cell") == entry
+    assert entry.stat().st_mtime == 1
+
+    expired = time.time() - 120
+    os.utime(entry / "summary.json", (expired, expired))
+    assert cache.peek("cell") is None
+    assert entry.is_dir()
+
+
+def test_matrix_code_hash_covers_the_load_harness(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "MATRIX_ROOT", tmp_path)
+    (tmp_path / "load").mkdir()
+    (tmp_path / "run.py").write_text("")
+    (tmp_path / "load" / "main.go").write_text("package main")
+    before = result_cache.matrix_code_hash()
+
+    (tmp_path / "load" / "main.go").write_text("package main // changed")
+
+    assert result_cache.matrix_code_hash() != before
+
+
+def test_storing_a_result_again_replaces_it_and_a_failed_store_is_only_logged(tmp_path, monkeypatch):
+    cache = ResultCache(directory=tmp_path / "cache")
+    _store(cache, tmp_path, "cell")
+    (tmp_path / "xunit.cell.xml").write_text("<testsuites><testsuite/></testsuites>")
+    entry = cache.store("cell", {"tests": 1}, [tmp_path / "xunit.cell.xml"])
+    assert cache.summary(entry) == {"tests": 1}
+
+    def replace(source, destination):
+        # A concurrent store filled the entry in meanwhile
+        raise OSError(errno.ENOTEMPTY, "Directory not empty")
+
+    monkeypatch.setattr(result_cache.os, "replace", replace)
+    assert _store(cache, tmp_path, "cell") is None
+    monkeypatch.undo()
+    assert cache.summary(cache.load("cell")) == {"tests": 1}
+    assert [path.name for path in (tmp_path / "cache").iterdir()] == ["cell"]
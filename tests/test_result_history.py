@@ -0,0 +1,80 @@
+import pytest
+
+from email_sender import render_report
+from processjunit import ProcessJUnit
+from result_history import RunHistory, compare, history_files, load_runs, prune
+
+DRIVER_MODULE = "github.com/gocql/gocql"
+CELL_V3 = ("v1.18.3", "3", "", "release:2026.2.0")
+CELL_V4 = ("v1.18.3", "4", "", "release:2026.2.0")
+
+
+def _junit_file(path, testcases, ignore_set=None):
+    """A JUnit file post-processed like the ones of the runs"""
+    xunit_file = path / f"xunit.{len(list(path.glob('xunit.*.xml')))}.xml"
+    (path / f"{xunit_file.name}_part_0").write_text(
+        f'<testsuites><testsuite name="{DRIVER_MODULE}" time="1" timestamp="">'
+        + "".join(f'<testcase classname="gocql" name="{name}" time="{seconds}">'
+                  + (f'<failure message="Failed">boom</failure>' if failed else "") + '</testcase>'
+                  for name, seconds, failed in testcases)
+        + '</testsuite></testsuites>')
+    ProcessJUnit(xunit_file, ignore_set or {}).save_after_analysis(
+        driver_version="v1.18.3", protocol=4, gocql_driver_type="scylla", driver_module=DRIVER_MODULE)
+    return xunit_file
+
+
+def test_test_results_are_the_final_outcomes_after_the_analysis(tmp_path):
+    xunit_file = _junit_file(tmp_path, [("TestSession", 1.5, False), ("TestFlaky", 2, True),
+                                        ("TestIgnored", 1, True), ("TestBroken", 3, True)],
+                             {"flaky": ["TestFlaky"], "ignore": ["TestIgnored"]})
+
+    assert ProcessJUnit(xunit_file, {}).test_results == {
+        "TestSession": ("passed", 1.5), "TestFlaky": ("flaky", 2.0), "TestIgnored": ("ignored", 1.0),
+        "TestBroken": ("failed", 3.0),
+    }
+
+
+@pytest.fixture
+def history_dir(tmp_path):
+    previous = tmp_path / "previous"
+    previous.mkdir()
+    for run_id, slow_seconds in (("20261017T000000Z-1", 2), ("20261018T000000Z-1", 3)):
+        RunHistory.from_junit_files(run_id, {
+            CELL_V4: _junit_file(previous, [("TestSession", 1, False), ("TestBroken", 1, True),
+                                            ("TestSlow", slow_seconds, False)]),
+            CELL_V3: _junit_file(previous, [("TestSession", 1, False), ("TestBroken", 1, False)]),
+        }).save(tmp_path / "history")
+    return tmp_path / "history"
+
+
+def test_run_is_compared_against_the_previous_runs_of_its_cells(history_dir, tmp_path):
+    current = tmp_path / "current"
+    current.mkdir()
+    run = RunHistory.from_junit_files("20261019T000000Z-1", {
+        CELL_V4: _junit_file(current, [("TestSession", 1, True), ("TestBroken", 1, False), ("TestSlow", 9, False)]),
+        CELL_V3: _junit_file(current, [("TestSession", 1, False), ("TestBroken", 1, False)]),
+        # A cell without a report, e.g. failed before running the tests
+        ("v1.18.3", "4", "compressor-lz4", "release:2026.2.0"): current / "missing.xml",
+    })
+
+    comparison = compare(run, load_runs(history_files(history_dir)))
+
+    assert comparison.baseline_runs == ["20261017T000000Z-1", "20261018T000000Z-1"]
+    assert [(change.test, change.cell, change.baseline_outcome) for change in comparison.newly_failing] == \
+           [("TestSession", CELL_V4, "passed")]
+    assert [(change.test, change.cell, change.baseline_outcome) for change in comparison.fixed] == \
+           [("TestBroken", CELL_V4, "failed")]
+    assert [(change.test, change.baseline_seconds, change.seconds) for change in comparison.slowed_down] == \
+           [("TestSlow", 2.5, 9.0)]
+    assert comparison.cells == [CELL_V3, CELL_V4]
+    assert comparison.matrix == {"TestSession": ["passed", "failed"]}
+
+    html = render_report(dict(results={}, history=comparison))
+    assert "Newly failing" in html and "Fixed" in html and "Slowed down" in html
+    assert "Failing tests across the matrix" in html
+
+
+def test_prune_keeps_the_latest_runs(history_dir):
+    prune(history_dir, max_runs=1)
+
+    assert [path.name for path in history_files(history_dir)] == ["20261018T000000Z-1.json.gz"]
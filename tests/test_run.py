@@ -1,7 +1,11 @@
+import subprocess
 import sys
+from types import SimpleNamespace
 
-from configurations import test_config_map
-from main import get_arguments
+from configurations import DriverOptions, test_config_map
+from main import compare_benchmark_results, get_arguments, matrix_cells
+import run
+from result_cache import ResultCache
 from run import Run
 
 
@@ -77,3 +81,136 @@ def test_gocql_cversion_strips_build_metadata():
     )
 
     assert runner._gocql_cversion() == "2026.2.0"
+
+
+def test_compressors_and_driver_options_are_matrix_dimensions(monkeypatch):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["main.py", ".", "--versions", "v1.18.3", "--scylla-version", "release:2026.2.0",
+         "--compressors", "none,snappy,lz4", "--gocql-timeouts", "60s,10s"],
+    )
+
+    arguments = get_arguments()
+
+    assert len(arguments.driver_options) == 6
+    assert [options.label for options in arguments.driver_options[:3]] == [
+        "compressor-none", "compressor-none.timeout-10s", ""]
+    assert arguments.driver_options[0].test_args == "-gocql.timeout=60s -autowait=2000ms -compressor="
+
+
+def test_non_default_driver_options_name_the_cell_files():
+    runner = Run(
+        gocql_driver_git=".",
+        driver_type="scylla",
+        tag="v1.18.3",
+        tests=["integration"],
+        scylla_version="release:2026.2.0",
+        protocol="4",
+        driver_options=DriverOptions(compressor="lz4"),
+    )
+
+    assert runner.xunit_file_name == "xunit.scylla.v4.v1.18.3.compressor-lz4.xml"
+    assert runner.metadata_file_name == "metadata_scylla_v4_v1.18.3_compressor-lz4.json"
+
+
+def test_race_detector_runs_with_every_run_by_default():
+    runner = Run(gocql_driver_git=".", driver_type="scylla", tag="v1.18.3", tests=["integration", "auth"],
+                 scylla_version=None, protocol="4")
+
+    assert runner._test_passes() == [("integration", "integration", True), ("auth", "auth", False)]
+
+
+def test_race_policy_adds_a_race_pass_on_the_chosen_protocol(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["main.py", ".", "--versions", "v1.18.3", "--scylla-version", "release:2026.2.0",
+                                      "--race-protocols", "4", "--race-run", "TestSession"])
+    policy = get_arguments().race_policy
+
+    passes = {protocol: Run(gocql_driver_git=".", driver_type="scylla", tag="v1.18.3", tests=["integration", "auth"],
+                            scylla_version=None, protocol=protocol, race_policy=policy)._test_passes()
+              for protocol in ("3", "4")}
+
+    assert passes["3"] == [("integration", "integration", False), ("auth", "auth", False)]
+    assert passes["4"] == [("integration", "integration", False), ("integration-race", "integration", True),
+                           ("auth", "auth", False)]
+
+
+def test_scylla_versions_are_a_matrix_dimension(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["main.py", ".", "--versions", "v1.18.3",
+                                      "--scylla-version", "release:2025.1.0,release:2026.2.0"])
+
+    scylla_versions = get_arguments().scylla_versions
+    runner = Run(gocql_driver_git=".", driver_type="scylla", tag="v1.18.3", tests=["integration"],
+                 scylla_version=scylla_versions[1], protocol="4", driver_options=DriverOptions(compressor="lz4"),
+                 label_scylla_version=True)
+
+    assert scylla_versions == ["release:2025.1.0", "release:2026.2.0"]
+    assert runner.xunit_file_name == "xunit.scylla.v4.v1.18.3.compressor-lz4.scylla-release-2026.2.0.xml"
+
+
+def test_benchmarks_are_compared_per_scylla_version():
+    samples = {"BenchmarkQuery": {"ns/op": [100.0, 101.0, 99.0]}}
+    cells = [(version, "4", "", scylla_version) for version in ("v1.18.2", "v1.18.3")
+             for scylla_version in ("release:2025.1.0", "release:2026.2.0")]
+
+    comparisons = compare_benchmark_results({cell: samples for cell in cells})
+
+    assert [(comparison["baseline"], comparison["version"]) for comparison in comparisons] == [
+        ("v1.18.2 release:2025.1.0", "v1.18.3 release:2025.1.0"),
+        ("v1.18.2 release:2026.2.0", "v1.18.3 release:2026.2.0"),
+    ]
+
+
+def test_log_captures_of_a_previous_run_of_the_cell_are_cleared(monkeypatch, tmp_path):
+    monkeypatch.setattr(Run, "xunit_dir", property(lambda self: tmp_path))
+    runner = Run(gocql_driver_git=".", driver_type="scylla", tag="v1.18.3", tests=["integration"],
+                 scylla_version=None, protocol="4")
+    other_cell = Run(gocql_driver_git=".", driver_type="scylla", tag="v1.18.3", tests=["integration"],
+                     scylla_version=None, protocol="4", driver_options=DriverOptions(compressor="lz4"))
+    for capture_dir in (runner.log_capture_dir("integration"), other_cell.log_capture_dir("integration")):
+        capture_dir.mkdir()
+        (capture_dir / "index.json").write_text("{}")
+        (capture_dir / "infra-failure.json").write_text("{}")
+
+    runner.clear_log_captures()
+
+    assert not runner.log_capture_dir("integration").exists()
+    assert (other_cell.log_capture_dir("integration") / "index.json").is_file()
+
+
+def test_cell_cached_without_the_scylla_version_label_isnt_restored_with_it(monkeypatch, tmp_path):
+    monkeypatch.setattr(run, "run_command", lambda *args, **kwargs: SimpleNamespace(stdout="abc\n"))
+    cache = ResultCache(directory=tmp_path / "cache")
+
+    def runner(label_scylla_version):
+        return Run(gocql_driver_git=".", driver_type="scylla", tag="v1.18.1", tests=["integration"],
+                   scylla_version="release:2026.1.0", protocol="4", result_cache=cache,
+                   label_scylla_version=label_scylla_version)
+
+    single_version = runner(False)
+    xunit_file = tmp_path / single_version.xunit_file_name
+    xunit_file.write_text("<testsuites/>")
+    cache.store(single_version._result_cache_key(), {"tests": 1, "passed": 1}, [xunit_file])
+
+    assert cache.load(single_version._result_cache_key())
+    assert cache.load(runner(True)._result_cache_key()) is None
+
+
+def test_lz4_cells_are_only_run_on_tags_whose_tests_support_it(tmp_path):
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init", "-q")
+    for tag, cases in (("v1.0.0", 'case "snappy":'), ("v1.1.0", 'case "snappy":\n\tcase "lz4":')):
+        (tmp_path / "common_test.go").write_text(f"switch *flagCompressTest {{\n\t{cases}\n}}\n")
+        git("add", "common_test.go")
+        git("-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "-q", "-m", tag)
+        git("tag", tag)
+    arguments = get_arguments([str(tmp_path), "--versions", "v1.0.0,v1.1.0", "--protocols", "4",
+                               "--scylla-version", "release:2026.2.0", "--compressors", "snappy,lz4"])
+
+    assert [cell for cell, _ in matrix_cells(arguments)] == [
+        ("v1.0.0", "4", "", "release:2026.2.0"),
+        ("v1.1.0", "4", "", "release:2026.2.0"),
+        ("v1.1.0", "4", "compressor-lz4", "release:2026.2.0"),
+    ]